@@ -0,0 +1,140 @@
+"""Benchmark the cold-start import time of the model_runner console scripts.
+
+Every element of a job array starts a new interpreter that imports
+model_dispatcher, so its import time is paid once per element. Each entry
+point is imported in a fresh interpreter with ``python -X importtime`` and
+the median over several runs is reported, together with the modules that
+take the most time to import.
+
+Usage::
+
+    python benchmarks/import_time.py --repeats 20
+    python benchmarks/import_time.py --max_dispatcher_ms 50
+
+With --max_dispatcher_ms or --max_runner_ms, the script exits with code 1 if
+the median import time of the entry point exceeds the limit, so it can be
+used to catch regressions.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ENTRY_POINTS = {
+    "model_dispatcher": "model_runner.dispatcher",
+    "model_runner": "model_runner.__main__",
+}
+
+# modules that must never be imported by the dispatcher
+DISPATCHER_FORBIDDEN = ("pydantic", "asyncio", "pandas", "numpy")
+
+_IMPORTTIME_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+_REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_once(module: str) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """Import a module in a fresh interpreter.
+
+    Returns the wall time of the interpreter in ms and the self and cumulative
+    import time in us of every imported module.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [_REPO_DIR] + [p for p in env.get("PYTHONPATH", "").split(os.pathsep) if p]
+    )
+    start_time = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall_time = (time.perf_counter() - start_time) * 1000
+
+    module_times = {}
+    for line in process.stderr.splitlines():
+        match = _IMPORTTIME_PATTERN.match(line)
+        if match is not None:
+            self_us, cumulative_us, _, name = match.groups()
+            module_times[name] = (int(self_us), int(cumulative_us))
+
+    return wall_time, module_times
+
+
+def benchmark_entry_point(module: str, repeats: int) -> Dict[str, object]:
+    """Import an entry point repeats times and summarize the import times."""
+    wall_times = []
+    import_times = []
+    runs = []
+    for _ in range(repeats):
+        wall_time, module_times = _import_once(module)
+        wall_times.append(wall_time)
+        import_times.append(module_times[module][1] / 1000)
+        runs.append(module_times)
+
+    median_run = runs[import_times.index(statistics.median_low(import_times))]
+    slowest = sorted(median_run.items(), key=lambda item: item[1][0], reverse=True)
+
+    return {
+        "import_ms": statistics.median(import_times),
+        "wall_ms": statistics.median(wall_times),
+        "modules": set(median_run),
+        "slowest": [(name, times[0] / 1000) for name, times in slowest[:10]],
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", help="number of imports", type=int, default=10)
+    parser.add_argument(
+        "--max_dispatcher_ms",
+        help="fail if the median import time of model_dispatcher exceeds it",
+        type=float,
+    )
+    parser.add_argument(
+        "--max_runner_ms",
+        help="fail if the median import time of model_runner exceeds it",
+        type=float,
+    )
+    args = parser.parse_args(argv)
+    limits = {
+        "model_dispatcher": args.max_dispatcher_ms,
+        "model_runner": args.max_runner_ms,
+    }
+
+    failed = False
+    for entry_point, module in ENTRY_POINTS.items():
+        result = benchmark_entry_point(module, args.repeats)
+        print(
+            f"{entry_point}: import {result['import_ms']:.1f} ms, "
+            f"interpreter start and import {result['wall_ms']:.1f} ms "
+            f"(median of {args.repeats})"
+        )
+        for name, self_ms in result["slowest"]:
+            print(f"    {self_ms:6.1f} ms  {name}")
+
+        limit = limits[entry_point]
+        if limit is not None and result["import_ms"] > limit:
+            print(f"{entry_point} exceeds the limit of {limit:.1f} ms")
+            failed = True
+        if entry_point == "model_dispatcher":
+            forbidden = [
+                name
+                for name in result["modules"]
+                if name.split(".")[0] in DISPATCHER_FORBIDDEN
+            ]
+            if forbidden:
+                print(f"model_dispatcher imports {', '.join(sorted(forbidden))}")
+                failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,420 @@
+"""Benchmark how the hot paths of model_runner scale with the size of the grid.
+
+For synthetic configs with 10 to 10M grid points, the following stages are
+measured for every runner_params_format:
+
+- create: materializing all runner parameters with _create_runner_params()
+  (only up to --max_materialized points, it holds the whole grid in memory)
+- write: writing the runner parameters store with _write_runner_params()
+- job_array: building the bsub command with _write_job_array()
+- lookup: reading the parameters of single jobs, as model_dispatcher does
+- concurrent: --dispatchers processes that start at the same time and each
+  read the parameters of --lookups random jobs from the same store
+
+Every measurement runs in a fresh interpreter, whose wall time and peak
+resident set size (minus that of an interpreter that only imports
+model_runner) are recorded. For the lookups, the bytes read per task are
+taken from /proc/self/io (Linux only). The results are written as JSON.
+
+Usage::
+
+    python benchmarks/scaling.py --sizes 10,1000,100000 --output scaling.json
+    python benchmarks/scaling.py --compare scaling.json --max_slowdown 1.5
+
+With --compare, the wall times are compared with an earlier result file and
+the script exits with code 1 if a stage got slower than --max_slowdown
+times its earlier wall time, so it can be used to catch regressions.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+FORMATS = ("indexed", "grid", "compact")
+
+_REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# axes of up to 10 values, so that the number of axes grows with the grid
+_AXIS_SIZE = 10
+
+
+def _synthetic_config(n_points: int, runner_params_format: str, work_dir: str):
+    """Build a config whose grid has n_points points."""
+    from model_runner.validator import ConfigModel
+
+    runner_parameters = {
+        # a long path that every job shares, as in most sweeps
+        "data": [
+            os.path.join(work_dir, "shared", "dataset", "with", "a", "long", "path")
+        ],
+    }
+    remaining = n_points
+    axis = 0
+    while remaining > 1:
+        size = _AXIS_SIZE if remaining % _AXIS_SIZE == 0 else remaining
+        runner_parameters[f"param_{axis}"] = [
+            round(0.1 * (i + 1), 3) for i in range(size)
+        ]
+        remaining //= size
+        axis += 1
+    os.makedirs(runner_parameters["data"][0], exist_ok=True)
+
+    return ConfigModel(
+        job_prefix=f"bench_{runner_params_format}_{n_points}",
+        runner=os.path.abspath(__file__),
+        output_base_dir=work_dir,
+        runner_params_format=runner_params_format,
+        job_parameters={
+            "logfile_dir": work_dir,
+            "memory": 4000,
+            "njobs_parallel": 100,
+            "processor_cores": 1,
+            "run_time": "1:00",
+            "scratch": 0,
+        },
+        runner_parameters=runner_parameters,
+    )
+
+
+def _bytes_read() -> Optional[int]:
+    """Get the number of bytes this process read with read() calls (Linux only)."""
+    try:
+        with open("/proc/self/io", "r") as f_io:
+            for line in f_io:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _run_stage(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a single stage of the benchmark in this process."""
+    sys.path.insert(0, _REPO_DIR)
+    from model_runner.params_store import count_job_params, read_job_params
+    from model_runner.utils import (
+        _create_runner_params,
+        _runner_params_path,
+        _write_job_array,
+        _write_runner_params,
+    )
+
+    stage = spec["stage"]
+    if stage == "baseline":
+        return {}
+
+    array_config = _synthetic_config(spec["n_points"], spec["format"], spec["work_dir"])
+    runner_params_path = _runner_params_path(array_config)
+
+    result = {}
+    start_time = time.perf_counter()
+    if stage == "create":
+        _create_runner_params(
+            array_config.runner_parameters,
+            job_prefix=array_config.job_prefix,
+            runner=array_config.runner,
+            output_base_dir=array_config.output_base_dir,
+        )
+    elif stage == "write":
+        _write_runner_params(array_config, runner_params_path)
+        result["file_bytes"] = sum(
+            os.path.getsize(os.path.join(spec["work_dir"], name))
+            for name in os.listdir(spec["work_dir"])
+            if name.startswith(os.path.basename(runner_params_path))
+        )
+    elif stage == "job_array":
+        _write_job_array(array_config, runner_params_path)
+    elif stage in ("lookup", "concurrent"):
+        # like model_dispatcher, the number of jobs is not looked up per job
+        n_jobs = count_job_params(runner_params_path)
+        # wait for the other dispatchers to start at the same time, the clock
+        # starts once they do
+        while time.time() < spec.get("start_at", 0):
+            time.sleep(0.001)
+        start_time = time.perf_counter()
+        rng = random.Random(spec["seed"])
+        latencies = []
+        bytes_before = _bytes_read()
+        for _ in range(spec["lookups"]):
+            lookup_start = time.perf_counter()
+            job_index = rng.randint(1, n_jobs)
+            read_job_params(runner_params_path, job_index)
+            latencies.append(time.perf_counter() - lookup_start)
+        bytes_after = _bytes_read()
+        result["latencies_s"] = latencies
+        if bytes_before is not None:
+            result["bytes_read_per_task"] = (bytes_after - bytes_before) / len(
+                latencies
+            )
+    else:
+        raise ValueError(f'"{stage}" is not a stage of the benchmark')
+    result["wall_s"] = time.perf_counter() - start_time
+
+    return result
+
+
+def _start_stage(spec: Dict[str, Any]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--_stage", json.dumps(spec)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+
+
+def _wait_stage(process: subprocess.Popen) -> Dict[str, Any]:
+    """Wait for a stage and add the peak resident set size of its interpreter."""
+    stdout = process.stdout.read()
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = (
+        os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"the stage failed with exit code {process.returncode}")
+
+    result = json.loads(stdout.splitlines()[-1])
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    result["peak_rss_mb"] = rusage.ru_maxrss / scale
+
+    return result
+
+
+def _measure(spec: Dict[str, Any], baseline_rss_mb: float) -> Dict[str, Any]:
+    result = _wait_stage(_start_stage(spec))
+    result["peak_rss_mb"] = max(0.0, result["peak_rss_mb"] - baseline_rss_mb)
+    latencies = result.pop("latencies_s", None)
+    if latencies is not None:
+        result["lookup_mean_ms"] = statistics.mean(latencies) * 1000
+    return result
+
+
+def _measure_concurrent(
+    spec: Dict[str, Any], n_dispatchers: int, baseline_rss_mb: float
+) -> Dict[str, Any]:
+    """Start n_dispatchers lookup stages that hit the same store at the same time."""
+    start_at = time.time() + 0.5 + 0.05 * n_dispatchers
+    processes = [
+        _start_stage({**spec, "seed": seed, "start_at": start_at})
+        for seed in range(n_dispatchers)
+    ]
+    results = [_wait_stage(process) for process in processes]
+
+    latencies = sorted(sum((r["latencies_s"] for r in results), []))
+    return {
+        "dispatchers": n_dispatchers,
+        "wall_s": max(r["wall_s"] for r in results),
+        "lookup_p50_ms": latencies[len(latencies) // 2] * 1000,
+        "lookup_p99_ms": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+        * 1000,
+        "peak_rss_mb": max(r["peak_rss_mb"] for r in results) - baseline_rss_mb,
+        "bytes_read_per_task": (
+            statistics.mean(r["bytes_read_per_task"] for r in results)
+            if all("bytes_read_per_task" in r for r in results)
+            else None
+        ),
+    }
+
+
+def run_benchmark(
+    sizes: List[int],
+    formats: List[str],
+    work_dir: str,
+    lookups: int = 200,
+    n_dispatchers: int = 8,
+    max_materialized: int = 1_000_000,
+) -> List[Dict[str, Any]]:
+    """Run all stages for every grid size and format.
+
+    Returns one record per measurement with the keys "stage", "n_points",
+    "format" and the measured values (e.g., "wall_s" and "peak_rss_mb").
+    """
+    baseline_rss_mb = _wait_stage(_start_stage({"stage": "baseline"}))["peak_rss_mb"]
+
+    records = []
+    for n_points in sizes:
+        for runner_params_format in formats:
+            spec = {
+                "n_points": n_points,
+                "format": runner_params_format,
+                "work_dir": work_dir,
+                "lookups": lookups,
+                "seed": 0,
+            }
+            stages = ["write", "job_array", "lookup"]
+            if runner_params_format == "indexed" and n_points <= max_materialized:
+                stages.insert(0, "create")
+            for stage in stages:
+                result = _measure({**spec, "stage": stage}, baseline_rss_mb)
+                records.append(
+                    {
+                        "stage": stage,
+                        "n_points": n_points,
+                        "format": runner_params_format,
+                        **result,
+                    }
+                )
+                print(_format_record(records[-1]), flush=True)
+            if n_dispatchers > 1:
+                result = _measure_concurrent(
+                    {**spec, "stage": "concurrent"}, n_dispatchers, baseline_rss_mb
+                )
+                records.append(
+                    {
+                        "stage": "concurrent",
+                        "n_points": n_points,
+                        "format": runner_params_format,
+                        **result,
+                    }
+                )
+                print(_format_record(records[-1]), flush=True)
+            for name in os.listdir(work_dir):
+                if name.startswith(f"bench_{runner_params_format}_{n_points}_"):
+                    os.remove(os.path.join(work_dir, name))
+
+    return records
+
+
+def _format_record(record: Dict[str, Any]) -> str:
+    text = (
+        f"{record['stage']:>10} {record['format']:>8} {record['n_points']:>9}: "
+        f"{record['wall_s']:8.3f} s, peak {record['peak_rss_mb']:7.1f} MB"
+    )
+    if "file_bytes" in record:
+        text += f", {record['file_bytes'] / 1e6:.2f} MB on disk"
+    if "lookup_mean_ms" in record:
+        text += f", {record['lookup_mean_ms']:.3f} ms per lookup"
+    if "lookup_p99_ms" in record:
+        text += (
+            f", {record['dispatchers']} dispatchers: p50 {record['lookup_p50_ms']:.3f} ms,"
+            f" p99 {record['lookup_p99_ms']:.3f} ms per lookup"
+        )
+    if record.get("bytes_read_per_task") is not None:
+        text += f", {record['bytes_read_per_task']:.0f} bytes read per task"
+    return text
+
+
+def compare_results(
+    records: List[Dict[str, Any]],
+    previous_records: List[Dict[str, Any]],
+    max_slowdown: float,
+) -> List[str]:
+    """Get the stages whose wall time grew by more than max_slowdown."""
+    previous = {
+        (r["stage"], r["n_points"], r["format"]): r["wall_s"] for r in previous_records
+    }
+    regressions = []
+    for record in records:
+        key = (record["stage"], record["n_points"], record["format"])
+        if key in previous and record["wall_s"] > max_slowdown * previous[key]:
+            regressions.append(
+                f"{record['stage']} {record['format']} {record['n_points']}: "
+                f"{previous[key]:.3f} s -> {record['wall_s']:.3f} s"
+            )
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        help="comma separated numbers of grid points",
+        type=str,
+        default="10,1000,100000",
+    )
+    parser.add_argument(
+        "--formats",
+        help="comma separated runner_params_formats",
+        type=str,
+        default=",".join(FORMATS),
+    )
+    parser.add_argument(
+        "--lookups", help="number of lookups per dispatcher", type=int, default=200
+    )
+    parser.add_argument(
+        "--dispatchers",
+        help="number of concurrent dispatchers that read the same store",
+        type=int,
+        default=8,
+    )
+    parser.add_argument(
+        "--max_materialized",
+        help="largest grid whose runner parameters are materialized in memory",
+        type=int,
+        default=1_000_000,
+    )
+    parser.add_argument(
+        "--work_dir",
+        help="directory on the disk to benchmark (default: a temporary directory)",
+        type=str,
+    )
+    parser.add_argument(
+        "--output",
+        help="path of the JSON result file",
+        type=str,
+        default="scaling.json",
+    )
+    parser.add_argument(
+        "--compare", help="JSON result file of an earlier run to compare with", type=str
+    )
+    parser.add_argument(
+        "--max_slowdown",
+        help="fail if a stage is slower than this factor times its earlier wall time",
+        type=float,
+        default=1.5,
+    )
+    parser.add_argument("--_stage", help=argparse.SUPPRESS, type=str)
+    args = parser.parse_args(argv)
+
+    if args._stage is not None:
+        print(json.dumps(_run_stage(json.loads(args._stage))))
+        return 0
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="model_runner_scaling_")
+    try:
+        records = run_benchmark(
+            sizes=[int(size) for size in args.sizes.split(",")],
+            formats=args.formats.split(","),
+            work_dir=os.path.abspath(work_dir) + os.path.sep,
+            lookups=args.lookups,
+            n_dispatchers=args.dispatchers,
+            max_materialized=args.max_materialized,
+        )
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, "w") as f_out:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "records": records,
+            },
+            f_out,
+            indent=4,
+        )
+    print(f"results written to {args.output}")
+
+    if args.compare is not None:
+        with open(args.compare, "r") as f_previous:
+            previous_records = json.load(f_previous)["records"]
+        regressions = compare_results(records, previous_records, args.max_slowdown)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,35 +1,275 @@
 import argparse
+import asyncio
 import os
+from functools import partial
+from typing import List, Optional
 
-from .utils import _write_job_array, _write_runner_params
-from .validator import _validation_func
+from .collect import (
+    collect_results,
+    format_results,
+    parse_condition,
+    rank_rows,
+    select_rows,
+    write_results_table,
+)
+from .early_stopping import clear_stop, is_stopped, read_stop, stop_path
+from .ledger import (
+    append_ledger_record,
+    completed_job_indices,
+    ledger_path,
+    pending_job_indices,
+    rotate_ledger,
+)
+from .params_store import count_job_params
+from .report import build_report, format_report
+from .submitter import (
+    FakeLSFBackend,
+    LocalBackend,
+    LSFBackend,
+    monitor_jobs,
+    submit_jobs,
+)
+from .successive_halving import submit_round
+from .utils import (
+    _restore_cached_results,
+    _runner_params_path,
+    _write_pipeline,
+    _write_runner_params,
+)
+from .validator import ConfigModel, _validation_func
 
 
 def _parse_args():
     parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "command",
+        help='"submit" (default) submits the sweep, "report" summarizes the resource usage of its jobs, '
+        '"collect" collects the metrics of its jobs into a results table',
+        nargs="?",
+        choices=["submit", "report", "collect"],
+        default="submit",
+    )
     parser.add_argument("--params", help="path to the job params file", type=str)
+    parser.add_argument(
+        "--resume",
+        help="only submit the jobs that are missing or failed in the ledger",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--halving_round",
+        help="round of the successive halving search to submit",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--backend",
+        help='batch system to submit to: "lsf", "local" (runs the job array on this '
+        'machine) or "fake_lsf" (local stand-in for LSF)',
+        choices=["lsf", "local", "fake_lsf"],
+        default="lsf",
+    )
+    parser.add_argument(
+        "--monitor",
+        help="wait for the submitted jobs and print the state changes of their elements",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--poll_interval",
+        help="initial interval in seconds between two job state queries when monitoring",
+        type=float,
+        default=30,
+    )
+    parser.add_argument(
+        "--margin",
+        help="factor by which the suggested run time and memory of the report exceed the measured usage",
+        type=float,
+        default=1.2,
+    )
+    parser.add_argument(
+        "--metrics_file",
+        help="name of the metrics file of each job to collect (default: the metrics_file of the search)",
+        type=str,
+    )
+    parser.add_argument(
+        "--sort_by",
+        help="metric by which the collected jobs are ranked (default: the metric of the search)",
+        type=str,
+    )
+    parser.add_argument(
+        "--mode",
+        help='"min" if lower values of the metric are better, "max" if higher values are better '
+        "(default: the mode of the search)",
+        choices=["min", "max"],
+    )
+    parser.add_argument(
+        "--top", help="number of collected jobs to print", type=int, default=10
+    )
+    parser.add_argument(
+        "--where",
+        help='only print the collected jobs with a parameter value, e.g., "batch_size=32" (can be repeated)',
+        type=parse_condition,
+        action="append",
+        default=[],
+    )
     args = parser.parse_args()
 
     return args
 
 
+def _submit(
+    bsub_commands: List[str],
+    args: argparse.Namespace,
+    early_stop_path: Optional[str] = None,
+) -> List[int]:
+    """Submit the bsub commands with the selected backend and optionally monitor them.
+
+    If early_stop_path is set, the job arrays that check the early stopping
+    rule are killed while monitoring them once the stop file exists.
+    """
+    if args.backend == "local":
+        backend = LocalBackend()
+    elif args.backend == "fake_lsf":
+        backend = FakeLSFBackend()
+    else:
+        backend = LSFBackend()
+
+    async def _submit_and_monitor():
+        job_ids = await submit_jobs(backend, bsub_commands)
+        stop_condition = None
+        stop_job_ids = None
+        if early_stop_path is not None:
+            stop_condition = partial(is_stopped, early_stop_path)
+            stop_job_ids = [
+                job_id
+                for job_id, command in zip(job_ids, bsub_commands)
+                if " --stop_metric " in command
+            ]
+        # local jobs only run as long as they are monitored
+        if args.monitor or args.backend != "lsf":
+            await monitor_jobs(
+                backend,
+                job_ids,
+                poll_interval=args.poll_interval,
+                stop_condition=stop_condition,
+                stop_job_ids=stop_job_ids,
+            )
+        return job_ids
+
+    try:
+        return asyncio.run(_submit_and_monitor())
+    finally:
+        backend.close()
+
+
+def _collect(array_config: ConfigModel, args: argparse.Namespace):
+    """Collect the results table of a sweep and print its best jobs."""
+    table = collect_results(array_config, metrics_file=args.metrics_file)
+    table_path = write_results_table(array_config, table)
+    print(f"collected {len(table['job_index'])} jobs into {table_path}")
+
+    where = {}
+    for condition in args.where:
+        where.update(condition)
+    rows = select_rows(table, where)
+    sort_by = args.sort_by or array_config.search.metric
+    if sort_by is not None and sort_by in table:
+        rows = rank_rows(
+            table, sort_by, mode=args.mode or array_config.search.mode, rows=rows
+        )
+    print(format_results(table, rows[: args.top]))
+
+
 def main():
     args = _parse_args()
     validated_parameters = _validation_func(args.params)
 
+    if args.command == "report":
+        print(format_report(build_report(validated_parameters, margin=args.margin)))
+        return
+    elif args.command == "collect":
+        _collect(validated_parameters, args)
+        return
+
+    if validated_parameters.search.strategy == "successive_halving":
+        # each round submits the promotion job that submits the next round
+        bsub_commands = submit_round(
+            validated_parameters,
+            config_path=os.path.abspath(args.params),
+            round_index=args.halving_round,
+        )
+        _submit(bsub_commands, args)
+        return
+
     # create and write the runner params
-    runner_params_fname = f"{validated_parameters.job_prefix}_runner_parameters.json"
-    runner_params_path = os.path.join(
-        validated_parameters.output_base_dir, runner_params_fname
+    runner_params_path = _runner_params_path(validated_parameters)
+    json_export_path = os.path.join(
+        validated_parameters.output_base_dir,
+        f"{validated_parameters.job_prefix}_runner_parameters.json",
     )
-    _write_runner_params(
-        array_config=validated_parameters, output_path=runner_params_path
+    if args.resume and os.path.exists(runner_params_path):
+        # a resumed sweep keeps its jobs, samples without a seed would be drawn anew
+        n_jobs = count_job_params(runner_params_path)
+    else:
+        n_jobs = _write_runner_params(
+            array_config=validated_parameters,
+            output_path=runner_params_path,
+            json_export_path=json_export_path,
+        )
+
+    # a new sweep starts with an empty ledger, a resumed sweep continues it
+    sweep_ledger_path = ledger_path(
+        validated_parameters.output_base_dir, validated_parameters.job_prefix
     )
+    if not args.resume:
+        rotate_ledger(sweep_ledger_path)
+
+    # a new sweep is not stopped, a resumed sweep stays stopped
+    early_stop_path = None
+    if validated_parameters.early_stopping is not None:
+        early_stop_path = stop_path(
+            validated_parameters.output_base_dir, validated_parameters.job_prefix
+        )
+        if not args.resume:
+            clear_stop(early_stop_path)
+        elif is_stopped(early_stop_path):
+            stop = read_stop(early_stop_path) or {}
+            print(
+                f"the sweep was stopped early by job {stop.get('job_index')}, "
+                f"delete {early_stop_path} to continue it"
+            )
+            return
+
+    # restore the results of jobs that were already run in an earlier sweep
+    cached_jobs = []
+    if validated_parameters.result_cache is not None:
+        completed_jobs = completed_job_indices(sweep_ledger_path)
+        cached_jobs = _restore_cached_results(
+            validated_parameters, runner_params_path, skip_jobs=completed_jobs
+        )
+        for job_index in cached_jobs:
+            append_ledger_record(
+                sweep_ledger_path, job_index, exit_code=0, duration=0, cached=True
+            )
+        print(f"restored {len(cached_jobs)} jobs from the result cache")
+
+    # only submit the job array elements that have jobs left to run
+    skip_completed = args.resume or len(cached_jobs) > 0
+    pending_jobs = None
+    if skip_completed:
+        pending_jobs = pending_job_indices(sweep_ledger_path, n_jobs)
+        if len(pending_jobs) == 0:
+            print("all jobs completed successfully, nothing to submit")
+            return
 
-    # build the submission command from parameters
-    job_array_command = _write_job_array(
-        array_config=validated_parameters, runner_params_path=runner_params_path
+    # build the submission commands from parameters, one job array per resource
+    # profile, followed by the pipeline stages that depend on them
+    job_array_commands = _write_pipeline(
+        array_config=validated_parameters,
+        runner_params_path=runner_params_path,
+        n_jobs=n_jobs,
+        pending_jobs=pending_jobs,
+        skip_completed=skip_completed,
     )
 
-    # submit the job
-    os.system(job_array_command)
+    # submit the jobs
+    _submit(job_array_commands, args, early_stop_path=early_stop_path)
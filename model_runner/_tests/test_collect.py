@@ -0,0 +1,195 @@
+import copy
+import csv
+import json
+import os
+
+import pytest
+
+from model_runner import collect
+from model_runner.collect import (
+    collect_results,
+    format_results,
+    parse_condition,
+    rank_rows,
+    select_rows,
+    write_results_table,
+)
+from model_runner.params_store import iter_job_params
+from model_runner.successive_halving import submit_round
+from model_runner.utils import _runner_params_path, _write_runner_params
+from model_runner.validator import ConfigModel
+
+
+def _write_metrics(output_dir, metrics):
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "metrics.json"), "w") as f_metrics:
+        json.dump(metrics, f_metrics)
+
+
+@pytest.fixture
+def finished_sweep(tmp_path, base_config):
+    config = copy.deepcopy(base_config)
+    config["output_base_dir"] = tmp_path.as_posix()
+    config_model = ConfigModel(**config)
+    runner_params_path = _runner_params_path(config_model)
+    _write_runner_params(config_model, runner_params_path)
+
+    # the loss falls with the batch size, job 12 failed without metrics
+    for params in iter_job_params(runner_params_path):
+        job_index = params["job_index"]
+        if job_index == 12:
+            continue
+        _write_metrics(
+            f"{config_model.output_base_dir}my_experiment{job_index}",
+            {"loss": 1 / params["batch_size"] + params["lr"], "epoch": 10},
+        )
+
+    return config_model
+
+
+def test_collect_results(finished_sweep):
+    table = collect_results(finished_sweep)
+
+    assert list(table) == [
+        "job_index",
+        "data",
+        "augment",
+        "batch_size",
+        "lr",
+        "loss",
+        "epoch",
+    ]
+    assert table["job_index"] == list(range(1, 13))
+    assert table["loss"][11] is None
+    assert table["epoch"][:11] == [10] * 11
+
+    rows = rank_rows(table, "loss", mode="min", top=4)
+    assert [table["batch_size"][row] for row in rows] == [32, 32, 32, 16]
+    assert [table["lr"][row] for row in rows[:2]] == [5e-05, 5e-05]
+    assert len(rank_rows(table, "loss")) == 11
+
+    rows = select_rows(table, {"batch_size": 2, "augment": False})
+    assert [table["job_index"][row] for row in rows] == [7, 8]
+    assert rank_rows(table, "loss", mode="max", rows=rows) == [7, 6]
+    with pytest.raises(KeyError):
+        select_rows(table, {"epochs": 10})
+
+    text = format_results(table, rows)
+    assert text.splitlines()[0].split() == list(table)
+    assert len(text.splitlines()) == 3
+
+
+def test_collect_results_incremental(monkeypatch, finished_sweep):
+    collect_results(finished_sweep)
+
+    read_dirs = []
+    read_metrics = collect.read_metrics
+
+    def _read_metrics(output_dir, metrics_file):
+        read_dirs.append(output_dir)
+        return read_metrics(output_dir, metrics_file=metrics_file)
+
+    monkeypatch.setattr(collect, "read_metrics", _read_metrics)
+    output_dir = f"{finished_sweep.output_base_dir}my_experiment"
+    _write_metrics(f"{output_dir}12", {"loss": 0.01})
+    os.utime(os.path.join(f"{output_dir}3", "metrics.json"), ns=(1, 1))
+
+    table = collect_results(finished_sweep)
+
+    # only the new and the changed metrics files are read
+    assert sorted(read_dirs) == [f"{output_dir}12", f"{output_dir}3"]
+    assert table["loss"][11] == 0.01
+    assert table["epoch"][11] is None
+
+
+def test_collect_results_csv(finished_sweep):
+    output_dir = f"{finished_sweep.output_base_dir}my_experiment1"
+    with open(os.path.join(output_dir, "log.csv"), "w", newline="") as f_log:
+        writer = csv.writer(f_log)
+        writer.writerows([["epoch", "loss", "phase"], [1, 0.5, "a"], [2, 0.25, "b"]])
+
+    table = collect_results(finished_sweep, metrics_file="log.csv")
+
+    # the last row holds the final metrics
+    assert (table["epoch"][0], table["loss"][0], table["phase"][0]) == (2, 0.25, "b")
+    assert table["loss"][1:] == [None] * 11
+
+
+def test_collect_results_successive_halving(tmp_path, base_config):
+    config = copy.deepcopy(base_config)
+    config["output_base_dir"] = tmp_path.as_posix()
+    config["search"] = {
+        "strategy": "successive_halving",
+        "n_samples": 6,
+        "seed": 0,
+        "budget_parameter": "epochs",
+        "min_budget": 1,
+        "max_budget": 9,
+        "eta": 3,
+        "metric": "loss",
+    }
+    config_model = ConfigModel(**config)
+    config_path = (tmp_path / "config.json").as_posix()
+
+    # nothing was submitted yet
+    assert collect_results(config_model)["job_index"] == []
+
+    # the jobs of both rounds report their loss, only the second round the epoch
+    submit_round(config_model, config_path, round_index=0)
+    round_config = config_model.copy(update={"job_prefix": "my_experiment_r0"})
+    for params in iter_job_params(_runner_params_path(round_config)):
+        _write_metrics(
+            f"{config_model.output_base_dir}my_experiment_r0{params['job_index']}",
+            {"loss": params["batch_size"]},
+        )
+    submit_round(config_model, config_path, round_index=1)
+    round_config = config_model.copy(update={"job_prefix": "my_experiment_r1"})
+    for params in iter_job_params(_runner_params_path(round_config)):
+        _write_metrics(
+            f"{config_model.output_base_dir}my_experiment_r1{params['job_index']}",
+            {"loss": params["batch_size"] / 2, "epoch": params["epochs"]},
+        )
+
+    table = collect_results(config_model)
+
+    assert list(table) == [
+        "round",
+        "job_index",
+        "data",
+        "augment",
+        "batch_size",
+        "lr",
+        "epochs",
+        "loss",
+        "epoch",
+    ]
+    assert table["round"] == [0] * 6 + [1] * 2
+    assert table["job_index"] == [1, 2, 3, 4, 5, 6, 1, 2]
+    assert table["epochs"] == [1] * 6 + [3] * 2
+    assert table["epoch"] == [None] * 6 + [3] * 2
+    assert sorted(table["loss"][6:]) == [
+        b / 2 for b in sorted(table["batch_size"][:6])[:2]
+    ]
+
+
+def test_write_results_table(finished_sweep):
+    table = collect_results(finished_sweep)
+
+    path = write_results_table(finished_sweep, table)
+
+    if path.endswith(".parquet"):
+        import pyarrow.parquet
+
+        assert pyarrow.parquet.read_table(path).to_pydict() == table
+    else:
+        with open(path, newline="") as f_table:
+            rows = list(csv.reader(f_table))
+        assert rows[0] == list(table)
+        assert len(rows) == 13
+
+
+def test_parse_condition():
+    assert parse_condition("batch_size=32") == {"batch_size": 32}
+    assert parse_condition("optimizer=adam") == {"optimizer": "adam"}
+    with pytest.raises(ValueError):
+        parse_condition("batch_size")
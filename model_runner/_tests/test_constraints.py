@@ -0,0 +1,78 @@
+import sys
+from itertools import product
+
+import pytest
+
+from model_runner.constraints import filter_flat_indices
+
+JOB_PARAMS = {
+    "optimizer": ["adam", "sgd"],
+    "lr": [1e-3, 1e-4, 1e-5],
+    "ngpus": [1, 2, 4],
+    "batch_size": [8, 64],
+}
+EXCLUDE = [{"ngpus": [2, 4], "batch_size": [8]}]
+CONDITIONAL_AXES = {"lr": {"optimizer": ["adam"]}}
+
+
+def _expected_flat_indices(flat_indices=None):
+    expected = []
+    for flat_index, (optimizer, lr, ngpus, batch_size) in enumerate(
+        product(*JOB_PARAMS.values())
+    ):
+        if ngpus > 1 and batch_size == 8:
+            continue
+        if optimizer != "adam" and lr != 1e-3:
+            continue
+        expected.append(flat_index)
+
+    if flat_indices is None:
+        return expected
+    return [flat_index for flat_index in flat_indices if flat_index in expected]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        # importing numpy fails, the pure Python fallback is used
+        monkeypatch.setitem(sys.modules, "numpy", None)
+    else:
+        pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("chunk_size", [5, 2**20])
+def test_filter_flat_indices(backend, chunk_size):
+    valid_flat_indices = list(
+        filter_flat_indices(
+            JOB_PARAMS,
+            exclude=EXCLUDE,
+            conditional_axes=CONDITIONAL_AXES,
+            chunk_size=chunk_size,
+        )
+    )
+
+    # sgd only runs with the first lr, large ngpus only with large batches
+    assert valid_flat_indices == _expected_flat_indices()
+    assert len(valid_flat_indices) == 4 * 3 + 4
+    assert all(isinstance(flat_index, int) for flat_index in valid_flat_indices)
+
+
+def test_filter_flat_indices_selected(backend):
+    flat_indices = [35, 0, 7, 20, 6]
+
+    valid_flat_indices = list(
+        filter_flat_indices(
+            JOB_PARAMS,
+            exclude=EXCLUDE,
+            conditional_axes=CONDITIONAL_AXES,
+            flat_indices=flat_indices,
+            chunk_size=2,
+        )
+    )
+
+    # the order of the selected combinations is kept
+    assert valid_flat_indices == _expected_flat_indices(flat_indices)
+
+
+def test_filter_flat_indices_without_constraints(backend):
+    assert list(filter_flat_indices(JOB_PARAMS)) == list(range(36))
@@ -0,0 +1,32 @@
+from model_runner.early_stopping import (
+    clear_stop,
+    is_stopped,
+    read_stop,
+    request_stop,
+    stop_path,
+    target_reached,
+)
+
+
+def test_target_reached():
+    assert target_reached(0.1, 0.1, mode="min")
+    assert target_reached(0.05, 0.1, mode="min")
+    assert not target_reached(0.2, 0.1, mode="min")
+    assert target_reached(0.95, 0.9, mode="max")
+    assert not target_reached(0.85, 0.9, mode="max")
+
+
+def test_request_stop(tmp_path):
+    path = stop_path(tmp_path.as_posix(), "test_job")
+    assert not is_stopped(path)
+    assert read_stop(path) is None
+
+    # only the first job that reaches the target stops the sweep
+    assert request_stop(path, {"job_index": 3, "value": 0.1})
+    assert not request_stop(path, {"job_index": 5, "value": 0.05})
+    assert is_stopped(path)
+    assert read_stop(path) == {"job_index": 3, "value": 0.1}
+
+    clear_stop(path)
+    assert not is_stopped(path)
+    clear_stop(path)
@@ -0,0 +1,56 @@
+from model_runner.ledger import (
+    append_ledger_record,
+    completed_job_indices,
+    ledger_path,
+    pending_job_indices,
+    read_job_records,
+    read_ledger,
+    rotate_ledger,
+)
+
+
+def test_ledger(tmp_path):
+    path = ledger_path(tmp_path.as_posix(), "test_job")
+    assert read_ledger(path) == {}
+
+    append_ledger_record(path, job_index=1, exit_code=0, duration=1.5)
+    append_ledger_record(path, job_index=2, exit_code=1, duration=2.0)
+    append_ledger_record(path, job_index=3, exit_code=0, duration=1.0)
+    # job 3 was rerun and failed, the most recent record is valid
+    append_ledger_record(path, job_index=3, exit_code=137, duration=1.0)
+
+    # a truncated record is ignored
+    with open(path, "a") as f_ledger:
+        f_ledger.write('{"job_index": 5, "exit')
+
+    records = read_ledger(path)
+    assert set(records.keys()) == {1, 2, 3}
+    assert records[1]["duration"] == 1.5
+    assert records[3]["exit_code"] == 137
+
+    assert completed_job_indices(path) == {1}
+    assert pending_job_indices(path, n_jobs=5) == [2, 3, 4, 5]
+
+
+def test_read_job_records(tmp_path):
+    path = ledger_path(tmp_path.as_posix(), "test_job")
+    assert read_job_records(path, [1, 2]) == {}
+
+    append_ledger_record(path, job_index=1, exit_code=1, duration=1.0)
+    append_ledger_record(path, job_index=1, exit_code=0, duration=1.0, requeues=1)
+    append_ledger_record(path, job_index=3, exit_code=0, duration=1.0)
+
+    # only the most recent records of the requested jobs are read
+    records = read_job_records(path, [1, 2])
+    assert list(records) == [1]
+    assert (records[1]["exit_code"], records[1]["requeues"]) == (0, 1)
+
+    # a new sweep starts without the records of the previous one
+    rotate_ledger(path)
+    assert read_job_records(path, [1, 3]) == {}
+    assert read_ledger(path) == {}
+
+    # a ledger without the records of its jobs is read in full
+    with open(path, "w") as f_ledger:
+        f_ledger.write('{"job_index": 2, "exit_code": 0, "duration": 1.0}\n')
+    assert read_job_records(path, [1, 2])[2]["exit_code"] == 0
@@ -0,0 +1,251 @@
+import copy
+import json
+import os
+import sys
+
+import pytest
+
+from model_runner.__main__ import main
+from model_runner.early_stopping import is_stopped, request_stop, stop_path
+from model_runner.ledger import append_ledger_record, ledger_path, read_ledger
+from model_runner.params_store import iter_job_params
+from model_runner.result_cache import cache_key, file_hash, store
+from model_runner.submitter import LSFBackend
+from model_runner.utils import _create_runner_params, _runner_params_path
+from model_runner.validator import ConfigModel
+
+
+@pytest.fixture
+def config_path(tmp_path, base_config):
+    config = copy.deepcopy(base_config)
+    config["output_base_dir"] = tmp_path.as_posix()
+    path = tmp_path / "config.json"
+    with open(path, "w") as f_config:
+        json.dump(config, f_config)
+
+    return path
+
+
+def _run_main(monkeypatch, argv):
+    submitted = []
+
+    async def _fake_run(self, command):
+        submitted.append(command)
+        return f"Job <{len(submitted)}> is submitted to queue <normal>."
+
+    monkeypatch.setattr(LSFBackend, "_run", _fake_run)
+    monkeypatch.setattr(sys, "argv", ["model_runner"] + argv)
+    main()
+
+    return submitted
+
+
+def test_main(monkeypatch, config_path):
+    submitted = _run_main(monkeypatch, ["--params", config_path.as_posix()])
+
+    assert len(submitted) == 1
+    assert submitted[0].startswith('bsub -J "my_experiment[1-12]%4"')
+
+
+def test_main_resume(monkeypatch, tmp_path, base_config, config_path):
+    path = ledger_path(tmp_path.as_posix(), "my_experiment")
+    # jobs 4 and 9 failed and job 12 never finished
+    for job_index in range(1, 12):
+        exit_code = 1 if job_index in (4, 9) else 0
+        append_ledger_record(path, job_index, exit_code=exit_code, duration=1.0)
+
+    submitted = _run_main(monkeypatch, ["--params", config_path.as_posix(), "--resume"])
+
+    logfile = os.path.join(
+        base_config["job_parameters"]["logfile_dir"], "my_experiment"
+    )
+    runner_params_path = tmp_path / "my_experiment_runner_parameters.jsonl"
+    assert submitted == [
+        'bsub -J "my_experiment[4,9,12]%4"'
+        f' -o "{logfile}%I"'
+        ' -W "180"'
+        ' -n "16"'
+        ' -R "rusage[scratch=4000, mem=4000, ngpus_excl_p=2]"'
+        ' -R "select[gpu_model0==NVIDIATITANRTX]"'
+        ' "model_dispatcher --job_id \\$LSB_JOBINDEX'
+        f' --params {runner_params_path.as_posix()} --skip_completed"'
+    ]
+
+    # nothing is submitted once all jobs completed
+    for job_index in (4, 9, 12):
+        append_ledger_record(path, job_index, exit_code=0, duration=1.0)
+    submitted = _run_main(monkeypatch, ["--params", config_path.as_posix(), "--resume"])
+    assert submitted == []
+
+    # a new sweep does not take the records of the previous one for completed jobs
+    submitted = _run_main(monkeypatch, ["--params", config_path.as_posix()])
+    assert submitted[0].startswith('bsub -J "my_experiment[1-12]%4"')
+    assert not submitted[0].endswith('--skip_completed"')
+    assert read_ledger(path) == {}
+
+
+def test_main_resume_random_search(monkeypatch, tmp_path, base_config):
+    config = copy.deepcopy(base_config)
+    config["output_base_dir"] = tmp_path.as_posix()
+    config["search"] = {"strategy": "random", "n_samples": 4}
+    path = tmp_path / "config.json"
+    with open(path, "w") as f_config:
+        json.dump(config, f_config)
+    runner_params_path = _runner_params_path(ConfigModel(**config))
+
+    _run_main(monkeypatch, ["--params", path.as_posix()])
+    job_params = list(iter_job_params(runner_params_path))
+    submitted = _run_main(monkeypatch, ["--params", path.as_posix(), "--resume"])
+
+    # the resumed sweep runs the same samples, although they are drawn without a seed
+    assert list(iter_job_params(runner_params_path)) == job_params
+    assert submitted[0].startswith('bsub -J "my_experiment[1-4]%4"')
+
+
+def test_main_result_cache(monkeypatch, tmp_path, base_config):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    config = copy.deepcopy(base_config)
+    config["output_base_dir"] = tmp_path.as_posix()
+    config["result_cache"] = {"cache_dir": cache_dir.as_posix()}
+    config_path = tmp_path / "config.json"
+    with open(config_path, "w") as f_config:
+        json.dump(config, f_config)
+
+    # cache the results of jobs 2 and 3
+    config_model = ConfigModel(**config)
+    runner_hash = file_hash(config_model.runner)
+    runner_params = _create_runner_params(
+        config_model.runner_parameters,
+        job_prefix=config_model.job_prefix,
+        runner=config_model.runner,
+        output_base_dir=config_model.output_base_dir,
+    )
+    for job_index in (2, 3):
+        result_dir = tmp_path / f"result{job_index}"
+        result_dir.mkdir()
+        (result_dir / "result.txt").write_text(str(job_index))
+        store(
+            cache_dir.as_posix(),
+            cache_key(runner_params[job_index], runner_hash),
+            result_dir.as_posix(),
+        )
+
+    submitted = _run_main(monkeypatch, ["--params", config_path.as_posix()])
+
+    assert (tmp_path / "my_experiment3" / "result.txt").read_text() == "3"
+    assert submitted[0].startswith('bsub -J "my_experiment[1,4-12]%4"')
+    assert f"--result_cache {cache_dir.as_posix()} --runner_hash {runner_hash}" in (
+        submitted[0]
+    )
+
+
+def test_main_report(monkeypatch, capsys, tmp_path, config_path):
+    _run_main(monkeypatch, ["--params", config_path.as_posix()])
+    path = ledger_path(tmp_path.as_posix(), "my_experiment")
+    for job_index in range(1, 13):
+        append_ledger_record(
+            path, job_index, exit_code=0, duration=60, cpu_time=60, max_rss_mb=100
+        )
+
+    submitted = _run_main(monkeypatch, ["report", "--params", config_path.as_posix()])
+
+    assert submitted == []
+    report = capsys.readouterr().out
+    assert "12 of 12 jobs with a recorded resource usage" in report
+    assert "run_time: 180 -> 2" in report
+
+
+def test_main_stages(monkeypatch, tmp_path, base_config):
+    config = copy.deepcopy(base_config)
+    config["output_base_dir"] = tmp_path.as_posix()
+    config["stages"] = [{"name": "evaluate", "runner": base_config["runner"]}]
+    path = tmp_path / "config.json"
+    with open(path, "w") as f_config:
+        json.dump(config, f_config)
+
+    submitted = _run_main(monkeypatch, ["--params", path.as_posix()])
+
+    # the stage depends on the job ID of the job array
+    assert len(submitted) == 2
+    assert submitted[1].startswith(
+        'bsub -J "my_experiment_evaluate[1-12]%4" -w "ended(1[*])"'
+    )
+
+
+def test_main_split(monkeypatch, tmp_path, base_config):
+    config = copy.deepcopy(base_config)
+    config["output_base_dir"] = tmp_path.as_posix()
+    config["job_parameters"]["max_array_size"] = 5
+    config["stages"] = [
+        {"name": "evaluate", "runner": base_config["runner"]},
+        {"name": "summary", "runner": base_config["runner"], "mode": "aggregate"},
+    ]
+    path = tmp_path / "config.json"
+    with open(path, "w") as f_config:
+        json.dump(config, f_config)
+
+    submitted = _run_main(monkeypatch, ["--params", path.as_posix()])
+
+    # each chunk of the stage depends on the same chunk of the jobs
+    # and the summary job on all chunks of the stage
+    assert len(submitted) == 7
+    assert [command.split(" -o ")[0] for command in submitted[3:]] == [
+        'bsub -J "my_experiment_evaluate[1-5]%2" -w "ended(1[*])"',
+        'bsub -J "my_experiment_evaluate[1-5]%1" -w "ended(2[*])"',
+        'bsub -J "my_experiment_evaluate[1-2]%1" -w "ended(3[*])"',
+        'bsub -J "my_experiment_summary" -w "done(4) && done(5) && done(6)"',
+    ]
+
+
+def test_main_collect(monkeypatch, capsys, tmp_path, config_path):
+    _run_main(monkeypatch, ["--params", config_path.as_posix()])
+    for job_index in range(1, 13):
+        output_dir = tmp_path / f"my_experiment{job_index}"
+        output_dir.mkdir()
+        (output_dir / "metrics.json").write_text(json.dumps({"loss": job_index}))
+
+    submitted = _run_main(
+        monkeypatch,
+        [
+            "collect",
+            "--params",
+            config_path.as_posix(),
+            "--sort_by",
+            "loss",
+            "--mode",
+            "max",
+            "--top",
+            "2",
+            "--where",
+            "batch_size=2",
+        ],
+    )
+
+    assert submitted == []
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[-4].startswith("collected 12 jobs into ")
+    assert lines[-2].split()[0] == "8"
+    assert lines[-1].split()[0] == "7"
+
+
+def test_main_early_stopping(monkeypatch, capsys, tmp_path, base_config):
+    config = copy.deepcopy(base_config)
+    config["output_base_dir"] = tmp_path.as_posix()
+    config["early_stopping"] = {"metric": "loss", "threshold": 0.1}
+    path = tmp_path / "config.json"
+    with open(path, "w") as f_config:
+        json.dump(config, f_config)
+    sweep_stop_path = stop_path(tmp_path.as_posix(), "my_experiment")
+    request_stop(sweep_stop_path, {"job_index": 3})
+
+    # a resumed sweep stays stopped
+    submitted = _run_main(monkeypatch, ["--params", path.as_posix(), "--resume"])
+    assert submitted == []
+    assert "stopped early by job 3" in capsys.readouterr().out
+
+    # a new sweep starts again
+    submitted = _run_main(monkeypatch, ["--params", path.as_posix()])
+    assert len(submitted) == 1
+    assert "--stop_metric loss --stop_threshold 0.1 --stop_mode min" in submitted[0]
+    assert not is_stopped(sweep_stop_path)
@@ -0,0 +1,191 @@
+import os
+
+import pytest
+
+from model_runner.params_store import (
+    COMPACT_SUFFIX,
+    GRID_SPEC_SUFFIX,
+    count_index_map,
+    count_indexed_params,
+    count_job_params,
+    index_path,
+    iter_job_params,
+    ravel_grid_index,
+    read_compact_param,
+    read_index_map,
+    read_indexed_param,
+    read_job_params,
+    unravel_grid_index,
+    write_compact_params,
+    write_grid_spec,
+    write_index_map,
+    write_indexed_params,
+)
+from model_runner.utils import _create_runner_params, _iter_runner_params
+
+
+def test_indexed_params_round_trip(tmp_path):
+    records = [
+        {"job_index": i, "data": f"/path/to/data_{i}", "lr": 0.1 * i, "augment": True}
+        for i in range(1, 101)
+    ]
+    store_path = tmp_path / "params.jsonl"
+
+    n_records = write_indexed_params(records, store_path)
+
+    assert n_records == 100
+    assert os.path.isfile(index_path(store_path))
+    assert count_indexed_params(store_path) == 100
+
+    # random access in arbitrary order
+    for job_index in (100, 1, 42, 7):
+        assert read_indexed_param(store_path, job_index) == records[job_index - 1]
+
+
+def test_indexed_params_missing_job(tmp_path):
+    store_path = tmp_path / "params.jsonl"
+    write_indexed_params([{"job_index": 1}], store_path)
+
+    with pytest.raises(KeyError):
+        _ = read_indexed_param(store_path, 2)
+
+    with pytest.raises(KeyError):
+        _ = read_indexed_param(store_path, 0)
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_compact_params_round_trip(tmp_path, compression):
+    constants = {
+        "job_prefix": "test_job",
+        "runner": "runner.py",
+        "output_base_dir": "./",
+    }
+    records = [
+        {
+            "job_index": i,
+            "data": f"/path/to/data_{i % 3}",
+            "lr": 0.1 * i,
+            "augment": i % 2 == 0,
+            "layers": [i, 2],
+            **constants,
+        }
+        for i in range(1, 101)
+    ]
+    store_path = tmp_path / f"params{COMPACT_SUFFIX}"
+
+    n_records = write_compact_params(
+        records, constants, store_path, compression=compression, block_size=16
+    )
+
+    assert n_records == 100
+    assert count_job_params(store_path) == 100
+    # random access in arbitrary order, across block boundaries
+    for job_index in (100, 1, 16, 17, 42):
+        assert read_compact_param(store_path, job_index) == records[job_index - 1]
+        assert read_job_params(store_path, job_index) == records[job_index - 1]
+    assert list(iter_job_params(store_path)) == records
+
+    with pytest.raises(KeyError):
+        _ = read_job_params(store_path, 101)
+
+    # the constants and repeated values are only stored once
+    indexed_path = tmp_path / "params.jsonl"
+    write_indexed_params(records, indexed_path)
+    assert os.path.getsize(store_path) < os.path.getsize(indexed_path) / 2
+
+
+def test_grid_spec_matches_product(tmp_path):
+    job_params = {
+        "data": ["/path/a", "/path/b"],
+        "batch_size": [2, 16, 32],
+        "augment": [True, False],
+    }
+    constants = {
+        "job_prefix": "test_job",
+        "runner": "runner.py",
+        "output_base_dir": "./",
+    }
+    store_path = tmp_path / f"params{GRID_SPEC_SUFFIX}"
+
+    n_records = write_grid_spec(job_params, constants, store_path)
+
+    expected_params = _create_runner_params(job_params, **constants)
+    assert n_records == len(expected_params) == 12
+    assert count_job_params(store_path) == 12
+    for job_index, params in expected_params.items():
+        assert read_job_params(store_path, job_index) == params
+
+    with pytest.raises(KeyError):
+        _ = read_job_params(store_path, 13)
+
+
+def test_unravel_grid_index():
+    assert unravel_grid_index(0, [2, 3, 4]) == (0, 0, 0)
+    assert unravel_grid_index(5, [2, 3, 4]) == (0, 1, 1)
+    assert unravel_grid_index(23, [2, 3, 4]) == (1, 2, 3)
+
+    with pytest.raises(IndexError):
+        _ = unravel_grid_index(24, [2, 3, 4])
+
+
+@pytest.mark.parametrize("runner_params_format", ["indexed", "grid", "compact"])
+def test_selected_combinations(tmp_path, runner_params_format):
+    job_params = {"batch_size": [2, 16, 32], "lr": [0.1, 0.01]}
+    constants = {
+        "job_prefix": "test_job",
+        "runner": "runner.py",
+        "output_base_dir": "./",
+    }
+    flat_indices = [5, 0, 3]
+    if runner_params_format == "grid":
+        store_path = tmp_path / f"params{GRID_SPEC_SUFFIX}"
+        write_grid_spec(job_params, constants, store_path, flat_indices=flat_indices)
+    elif runner_params_format == "compact":
+        store_path = tmp_path / f"params{COMPACT_SUFFIX}"
+        write_compact_params(
+            (
+                params
+                for _, params in _iter_runner_params(
+                    job_params, **constants, flat_indices=flat_indices
+                )
+            ),
+            constants,
+            store_path,
+            block_size=2,
+        )
+    else:
+        store_path = tmp_path / "params.jsonl"
+        write_indexed_params(
+            (
+                params
+                for _, params in _iter_runner_params(
+                    job_params, **constants, flat_indices=flat_indices
+                )
+            ),
+            store_path,
+        )
+
+    assert count_job_params(store_path) == 3
+    expected = [(32, 0.01, 1), (2, 0.1, 2), (16, 0.01, 3)]
+    for params in (read_job_params(store_path, i) for i in (1, 2, 3)):
+        assert (params["batch_size"], params["lr"], params["job_index"]) in expected
+    assert [
+        (p["batch_size"], p["lr"], p["job_index"]) for p in iter_job_params(store_path)
+    ] == expected
+
+
+def test_ravel_grid_index():
+    for flat_index in range(24):
+        axis_indices = unravel_grid_index(flat_index, [2, 3, 4])
+        assert ravel_grid_index(axis_indices, [2, 3, 4]) == flat_index
+
+
+def test_index_map(tmp_path):
+    map_path = tmp_path / "profile.idx"
+
+    assert write_index_map(map_path, [3, 7, 8, 12]) == 4
+    assert count_index_map(map_path) == 4
+    assert [read_index_map(map_path, p) for p in range(1, 5)] == [3, 7, 8, 12]
+    for position in (0, 5):
+        with pytest.raises(KeyError):
+            _ = read_index_map(map_path, position)
@@ -0,0 +1,116 @@
+import copy
+import json
+import os
+
+import pytest
+
+from model_runner.ledger import append_ledger_record, ledger_path
+from model_runner.params_store import iter_job_params
+from model_runner.report import build_report, format_report, percentile
+from model_runner.successive_halving import submit_round
+from model_runner.utils import _runner_params_path, _write_runner_params
+from model_runner.validator import ConfigModel
+
+
+@pytest.fixture
+def measured_sweep(tmp_path, base_config):
+    config = copy.deepcopy(base_config)
+    config["output_base_dir"] = tmp_path.as_posix()
+    config_model = ConfigModel(**config)
+    runner_params_path = _runner_params_path(config_model)
+    _write_runner_params(config_model, runner_params_path)
+
+    # the memory grows with the batch size, every job uses 2 cores for 100 s
+    path = ledger_path(config_model.output_base_dir, config_model.job_prefix)
+    for params in iter_job_params(runner_params_path):
+        job_index = params["job_index"]
+        append_ledger_record(
+            path,
+            job_index,
+            exit_code=-9 if job_index == 12 else 0,
+            duration=100,
+            cpu_time=200,
+            max_rss_mb=10 * params["batch_size"],
+        )
+
+    return config_model
+
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([1, 2, 3, 4], 100) == 4
+
+
+def test_build_report(measured_sweep):
+    report = build_report(measured_sweep, margin=1.2)
+
+    assert report["n_jobs"] == 12
+    assert report["n_measured"] == 12
+    assert report["n_failed"] == 1
+    assert report["n_killed"] == 1
+    assert report["overall"]["cpu_cores"][50] == 2
+    assert report["overall"]["max_rss_mb"][100] == 320
+    assert report["axes"]["batch_size"]["16"]["max_rss_mb"][100] == 160
+    assert set(report["axes"]) == {"augment", "batch_size", "lr"}
+
+    assert report["current"] == {"run_time": 180, "processor_cores": 16, "memory": 4000}
+    # 100 s * 1.2, 2 cores and 320 MB * 1.2 / 2 cores
+    assert report["suggestion"] == {"run_time": 2, "processor_cores": 2, "memory": 192}
+
+    text = format_report(report)
+    assert "12 of 12 jobs" in text
+    assert "memory: 4000 -> 192" in text
+
+
+def test_build_report_successive_halving(tmp_path, base_config):
+    config = copy.deepcopy(base_config)
+    config["output_base_dir"] = tmp_path.as_posix()
+    config["search"] = {
+        "strategy": "successive_halving",
+        "n_samples": 6,
+        "seed": 0,
+        "budget_parameter": "epochs",
+        "min_budget": 1,
+        "max_budget": 9,
+        "eta": 3,
+        "metric": "loss",
+    }
+    config_model = ConfigModel(**config)
+    config_path = (tmp_path / "config.json").as_posix()
+
+    # nothing was submitted yet
+    assert build_report(config_model)["n_jobs"] == 0
+
+    # every job runs 100 s per epoch, one job of the second round failed
+    for round_index in range(2):
+        submit_round(config_model, config_path, round_index=round_index)
+        round_config = config_model.copy(
+            update={"job_prefix": f"my_experiment_r{round_index}"}
+        )
+        path = ledger_path(round_config.output_base_dir, round_config.job_prefix)
+        for params in iter_job_params(_runner_params_path(round_config)):
+            job_index = params["job_index"]
+            output_dir = f"{round_config.output_base_dir}my_experiment_r{round_index}"
+            os.makedirs(f"{output_dir}{job_index}")
+            with open(f"{output_dir}{job_index}/metrics.json", "w") as f_metrics:
+                json.dump({"loss": params["batch_size"]}, f_metrics)
+            append_ledger_record(
+                path,
+                job_index,
+                exit_code=1 if (round_index, job_index) == (1, 2) else 0,
+                duration=100 * params["epochs"],
+                cpu_time=100 * params["epochs"],
+                max_rss_mb=100,
+            )
+
+    report = build_report(config_model, margin=1.2)
+
+    assert report["n_jobs"] == 8
+    assert report["n_measured"] == 8
+    assert report["n_failed"] == 1
+    assert report["axes"]["epochs"]["1"]["duration"][100] == 100
+    assert report["axes"]["epochs"]["3"]["duration"][100] == 300
+    # 300 s * 1.2
+    assert report["suggestion"]["run_time"] == 6
@@ -0,0 +1,83 @@
+import os
+import time
+
+from model_runner.result_cache import (
+    cache_key,
+    evict,
+    file_hash,
+    lookup,
+    restore,
+    store,
+)
+
+
+def _make_output(path, content):
+    os.makedirs(path)
+    with open(os.path.join(path, "result.txt"), "w") as f:
+        f.write(content)
+
+
+def test_cache_key(tmp_path):
+    runner = tmp_path / "runner.py"
+    runner.write_text("print('hello')")
+    runner_hash = file_hash(runner.as_posix())
+
+    params = {
+        "data": "/path/to/data/",
+        "lr": 0.1,
+        "runner": runner.as_posix(),
+        "job_prefix": "sweep_a",
+        "output_base_dir": "/output/a/",
+        "job_index": 3,
+    }
+    # the key does not depend on the job specific parameters
+    other_job = dict(
+        params, job_prefix="sweep_b", output_base_dir="/output/b/", job_index=7
+    )
+    assert cache_key(params, runner_hash) == cache_key(other_job, runner_hash)
+
+    # the key depends on the parameters and the content of the runner
+    assert cache_key(params, runner_hash) != cache_key(dict(params, lr=1), runner_hash)
+    runner.write_text("print('hello world')")
+    assert cache_key(params, runner_hash) != cache_key(
+        params, file_hash(runner.as_posix())
+    )
+
+
+def test_store_and_restore(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    output_dir = (tmp_path / "job1").as_posix()
+    _make_output(output_dir, "result")
+
+    assert lookup(cache_dir.as_posix(), "key") is None
+    store(cache_dir.as_posix(), "key", output_dir)
+    entry_path = lookup(cache_dir.as_posix(), "key")
+    assert entry_path is not None
+
+    copied_dir = (tmp_path / "job2").as_posix() + os.path.sep
+    restore(entry_path, copied_dir)
+    assert not os.path.islink(copied_dir.rstrip(os.path.sep))
+    assert (tmp_path / "job2" / "result.txt").read_text() == "result"
+
+    linked_dir = (tmp_path / "job3").as_posix()
+    restore(entry_path, linked_dir, link=True)
+    assert os.path.islink(linked_dir)
+    assert (tmp_path / "job3" / "result.txt").read_text() == "result"
+
+
+def test_evict(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    for key, age in (("old", 3600), ("mid", 60), ("new", 0)):
+        entry_path = (cache_dir / key).as_posix()
+        _make_output(entry_path, "x" * 100)
+        last_used = time.time() - age
+        os.utime(entry_path, (last_used, last_used))
+
+    evict(cache_dir.as_posix(), max_age=600)
+    assert sorted(os.listdir(cache_dir)) == ["mid", "new"]
+
+    # the least recently used entry is evicted first
+    evict(cache_dir.as_posix(), max_size=150)
+    assert os.listdir(cache_dir) == ["new"]
@@ -0,0 +1,61 @@
+import pytest
+
+from model_runner.params_store import unravel_grid_index
+from model_runner.samplers import (
+    grid_size,
+    sample_latin_hypercube,
+    sample_random,
+    sample_sobol,
+    select_flat_indices,
+    top_fraction,
+)
+
+
+def test_sample_random():
+    axis_sizes = [10, 100, 1000]
+    flat_indices = sample_random(axis_sizes, 50, seed=0)
+
+    assert len(set(flat_indices)) == 50
+    assert flat_indices == sorted(flat_indices)
+    assert all(0 <= i < grid_size(axis_sizes) for i in flat_indices)
+    assert flat_indices == sample_random(axis_sizes, 50, seed=0)
+
+    # asking for more samples than combinations runs the full grid
+    assert sample_random([2, 3], 10) == list(range(6))
+
+
+def test_sample_latin_hypercube():
+    axis_sizes = [4, 4]
+    flat_indices = sample_latin_hypercube(axis_sizes, 4, seed=1)
+
+    # every value of every axis is sampled exactly once
+    axis_indices = [unravel_grid_index(i, axis_sizes) for i in flat_indices]
+    assert len(axis_indices) == 4
+    for axis in range(2):
+        assert sorted(indices[axis] for indices in axis_indices) == [0, 1, 2, 3]
+
+
+def test_sample_sobol():
+    pytest.importorskip("scipy")
+    flat_indices = sample_sobol([8, 8, 8], 16, seed=0)
+
+    assert 0 < len(flat_indices) <= 16
+    assert all(0 <= i < 512 for i in flat_indices)
+
+
+def test_select_flat_indices():
+    assert select_flat_indices("grid", [2, 3]) is None
+    assert select_flat_indices("random", [2, 3], n_samples=6) == list(range(6))
+
+    with pytest.raises(ValueError):
+        _ = select_flat_indices("bayesian", [2, 3], n_samples=2)
+
+
+def test_top_fraction():
+    scores = {10: 0.5, 11: None, 12: 0.1, 13: 0.9}
+
+    assert top_fraction(scores, 2, mode="min") == [10, 12]
+    assert top_fraction(scores, 2, mode="max") == [10, 13]
+    # candidates without score are ranked last
+    assert top_fraction(scores, 4, mode="max") == [10, 11, 12, 13]
+    assert top_fraction(scores, 3, mode="min") == [10, 12, 13]
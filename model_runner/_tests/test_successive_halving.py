@@ -0,0 +1,68 @@
+import copy
+import json
+import os
+
+from model_runner.params_store import iter_job_params
+from model_runner.successive_halving import halving_state_path, submit_round
+from model_runner.utils import _runner_params_path
+from model_runner.validator import ConfigModel
+
+
+def test_successive_halving(tmp_path, base_config):
+    config = copy.deepcopy(base_config)
+    config["output_base_dir"] = tmp_path.as_posix()
+    config["runner_parameters"]["lr"] = [0.1, 0.01, 0.001]
+    config["search"] = {
+        "strategy": "successive_halving",
+        "n_samples": 9,
+        "seed": 0,
+        "budget_parameter": "epochs",
+        "min_budget": 1,
+        "max_budget": 9,
+        "eta": 3,
+        "metric": "val_loss",
+    }
+    config_model = ConfigModel(**config)
+    config_path = (tmp_path / "config.json").as_posix()
+
+    # the first round runs 9 random combinations with the minimal budget
+    commands = submit_round(config_model, config_path, round_index=0)
+    assert commands[0].startswith('bsub -J "my_experiment_r0[1-9]%4"')
+    assert commands[1].startswith(
+        'bsub -J "my_experiment_promote_r1" -w "ended(my_experiment_r0)"'
+    )
+    assert commands[1].endswith(
+        f'"model_runner --params {config_path} --halving_round 1"'
+    )
+
+    round_config = config_model.copy(update={"job_prefix": "my_experiment_r0"})
+    round_params = list(iter_job_params(_runner_params_path(round_config)))
+    assert len(round_params) == 9
+    assert all(params["epochs"] == 1 for params in round_params)
+
+    # the runners of the first round report their metric
+    for params in round_params:
+        output_dir = os.path.join(tmp_path, f"my_experiment_r0{params['job_index']}")
+        os.makedirs(output_dir)
+        with open(os.path.join(output_dir, "metrics.json"), "w") as f_metrics:
+            json.dump({"val_loss": params["lr"] * params["batch_size"]}, f_metrics)
+
+    # the second round runs the best third with three times the budget
+    commands = submit_round(config_model, config_path, round_index=1)
+    assert commands[0].startswith('bsub -J "my_experiment_r1[1-3]%4"')
+    assert len(commands) == 2
+
+    round_config = config_model.copy(update={"job_prefix": "my_experiment_r1"})
+    promoted_params = list(iter_job_params(_runner_params_path(round_config)))
+    best_losses = sorted(p["lr"] * p["batch_size"] for p in round_params)[:3]
+    assert sorted(p["lr"] * p["batch_size"] for p in promoted_params) == best_losses
+    assert all(params["epochs"] == 3 for params in promoted_params)
+
+    # the last round runs with the maximal budget and has no promotion job
+    commands = submit_round(config_model, config_path, round_index=2)
+    assert commands[0].startswith('bsub -J "my_experiment_r2[1]%4"')
+    assert len(commands) == 1
+
+    with open(halving_state_path(config_model)) as f_state:
+        state = json.load(f_state)
+    assert [r["budget"] for r in state["rounds"]] == [1, 3, 9]
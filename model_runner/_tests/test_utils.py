@@ -1,11 +1,25 @@
 import copy
 import json
 import os
+import types
 
+from model_runner.params_store import (
+    count_indexed_params,
+    iter_job_params,
+    read_index_map,
+    read_indexed_param,
+    read_job_params,
+)
 from model_runner.utils import (
+    _array_indices_of_jobs,
     _create_runner_param,
     _create_runner_params,
+    _format_array_indices,
+    _iter_runner_params,
+    _runner_params_path,
     _write_job_array,
+    _write_job_arrays,
+    _write_pipeline,
     _write_runner_params,
 )
 from model_runner.validator import ConfigModel
@@ -74,6 +88,23 @@ def test_create_runner_params():
     assert {1, 2, 3, 4, 5, 6} == set(runner_params.keys())
 
 
+def test_iter_runner_params():
+    params = {
+        "batch_size": [0, 10, 20],
+        "augment": [True, False],
+    }
+    runner_params = _iter_runner_params(
+        params, job_prefix="test_job", runner="runner.py", output_base_dir="./output"
+    )
+
+    # the grid is generated lazily
+    assert isinstance(runner_params, types.GeneratorType)
+    job_index, first_params = next(runner_params)
+    assert job_index == 1
+    assert (first_params["batch_size"], first_params["augment"]) == (0, True)
+    assert len(list(runner_params)) == 5
+
+
 def test_write_runner_params(tmp_path_factory):
     job_prefix = "test_job"
     runner = tmp_path_factory.mktemp("data") / "myfile"
@@ -104,11 +135,21 @@ def test_write_runner_params(tmp_path_factory):
     }
     config_model = ConfigModel(**config)
 
-    output_path = os.path.join(tmp_path_factory._basetemp.as_posix(), "test.json")
-    _write_runner_params(config_model, output_path)
+    output_path = os.path.join(tmp_path_factory._basetemp.as_posix(), "test.jsonl")
+    json_export_path = os.path.join(tmp_path_factory._basetemp.as_posix(), "test.json")
+    n_jobs = _write_runner_params(
+        config_model, output_path, json_export_path=json_export_path
+    )
+    assert n_jobs == 6
 
-    with open(output_path, "r") as f_json:
+    with open(json_export_path, "r") as f_json:
         runner_params = json.load(f_json)
+
+    # the indexed store should hold the same records as the json export
+    assert count_indexed_params(output_path) == len(runner_params)
+    for job_index, params in runner_params.items():
+        assert read_indexed_param(output_path, int(job_index)) == params
+
     runner_param_combinations = [
         (
             v["runner"],
@@ -138,15 +179,18 @@ def test_write_runner_params(tmp_path_factory):
 
 def test_write_job_array(tmp_path_factory, base_config):
     runner_params_path = os.path.join(
-        tmp_path_factory._basetemp.as_posix(), "test.json"
+        tmp_path_factory._basetemp.as_posix(), "test.jsonl"
     )
     logfile_dir = os.path.join(tmp_path_factory._basetemp.as_posix(), "my_experiment")
 
     # test gpu config
     config_model = ConfigModel(**base_config)
-    _write_runner_params(config_model, runner_params_path)
+    n_jobs = _write_runner_params(config_model, runner_params_path)
 
     job_array_command = _write_job_array(config_model, runner_params_path)
+    assert job_array_command == _write_job_array(
+        config_model, runner_params_path, n_jobs=n_jobs
+    )
     expected_command = 'bsub -J "my_experiment[1-12]%4"'
     expected_command += f' -o "{logfile_dir}%I"'
     expected_command += ' -W "180"'
@@ -177,3 +221,315 @@ def test_write_job_array(tmp_path_factory, base_config):
     )
 
     assert expected_command == job_array_command
+
+
+def test_write_runner_params_grid(tmp_path, base_config):
+    grid_config = copy.deepcopy(base_config)
+    grid_config["runner_params_format"] = "grid"
+    config_model = ConfigModel(**grid_config)
+
+    runner_params_path = _runner_params_path(config_model)
+    assert runner_params_path.endswith(".grid.json")
+
+    runner_params_path = os.path.join(tmp_path, os.path.basename(runner_params_path))
+    _write_runner_params(config_model, runner_params_path)
+
+    expected_params = _create_runner_params(
+        config_model.runner_parameters,
+        job_prefix=config_model.job_prefix,
+        runner=config_model.runner,
+        output_base_dir=config_model.output_base_dir,
+    )
+    for job_index, params in expected_params.items():
+        assert read_job_params(runner_params_path, job_index) == params
+
+    job_array_command = _write_job_array(config_model, runner_params_path)
+    assert job_array_command.startswith('bsub -J "my_experiment[1-12]%4"')
+
+
+def test_write_runner_params_constraints(tmp_path, base_config):
+    constrained_config = copy.deepcopy(base_config)
+    constrained_config["runner_params_format"] = "grid"
+    constrained_config["exclude"] = [{"augment": [False], "batch_size": [2, 16]}]
+    constrained_config["conditional_axes"] = {"lr": {"batch_size": [32]}}
+    config_model = ConfigModel(**constrained_config)
+    runner_params_path = os.path.join(
+        tmp_path, os.path.basename(_runner_params_path(config_model))
+    )
+
+    n_jobs = _write_runner_params(config_model, runner_params_path)
+
+    # the remaining jobs have contiguous indices
+    job_params = list(iter_job_params(runner_params_path))
+    assert n_jobs == len(job_params) == 6
+    assert [params["job_index"] for params in job_params] == list(range(1, 7))
+    assert [
+        (params["augment"], params["batch_size"], params["lr"]) for params in job_params
+    ] == [
+        (True, 2, 5e-05),
+        (True, 16, 5e-05),
+        (True, 32, 5e-05),
+        (True, 32, 0.001),
+        (False, 32, 5e-05),
+        (False, 32, 0.001),
+    ]
+
+    job_array_command = _write_job_array(config_model, runner_params_path, n_jobs)
+    assert job_array_command.startswith('bsub -J "my_experiment[1-6]%4"')
+
+
+def test_write_runner_params_compact(tmp_path, base_config):
+    compact_config = copy.deepcopy(base_config)
+    compact_config["runner_params_format"] = "compact"
+    compact_config["runner_params_compression"] = "gzip"
+    config_model = ConfigModel(**compact_config)
+
+    runner_params_path = _runner_params_path(config_model)
+    assert runner_params_path.endswith(".compact")
+
+    runner_params_path = os.path.join(tmp_path, os.path.basename(runner_params_path))
+    json_export_path = os.path.join(tmp_path, "params.json")
+    n_jobs = _write_runner_params(
+        config_model, runner_params_path, json_export_path=json_export_path
+    )
+
+    expected_params = _create_runner_params(
+        config_model.runner_parameters,
+        job_prefix=config_model.job_prefix,
+        runner=config_model.runner,
+        output_base_dir=config_model.output_base_dir,
+    )
+    assert n_jobs == len(expected_params)
+    for job_index, params in expected_params.items():
+        assert read_job_params(runner_params_path, job_index) == params
+    with open(json_export_path) as f_export:
+        assert len(json.load(f_export)) == n_jobs
+
+
+def test_write_job_array_pack(tmp_path, base_config):
+    pack_config = copy.deepcopy(base_config)
+    pack_config["job_parameters"]["pack_size"] = 5
+    pack_config["job_parameters"]["pack_workers"] = 4
+    config_model = ConfigModel(**pack_config)
+    runner_params_path = os.path.join(tmp_path, "test.jsonl")
+
+    job_array_command = _write_job_array(config_model, runner_params_path, n_jobs=12)
+
+    # 12 jobs are packed into 3 job array elements
+    assert job_array_command.startswith('bsub -J "my_experiment[1-3]%4"')
+    assert job_array_command.endswith(
+        f'--params {runner_params_path} --pack_size 5 --pack_workers 4"'
+    )
+
+
+def test_write_job_array_entrypoint(tmp_path, base_config):
+    entrypoint_config = copy.deepcopy(base_config)
+    entrypoint_config["runner_type"] = "python_entrypoint"
+    entrypoint_config["runner"] = "json:dumps"
+    config_model = ConfigModel(**entrypoint_config)
+    runner_params_path = os.path.join(tmp_path, "test.jsonl")
+
+    job_array_command = _write_job_array(config_model, runner_params_path, n_jobs=12)
+
+    assert job_array_command.endswith(f'--params {runner_params_path} --entrypoint"')
+
+    entrypoint_config["preload_modules"] = ["json", "argparse"]
+    config_model = ConfigModel(**entrypoint_config)
+
+    job_array_command = _write_job_array(config_model, runner_params_path, n_jobs=12)
+
+    assert job_array_command.endswith('--entrypoint --preload json,argparse"')
+
+
+def test_write_job_array_data_staging(tmp_path, base_config):
+    staging_config = copy.deepcopy(base_config)
+    staging_config["data_staging"] = True
+    config_model = ConfigModel(**staging_config)
+    runner_params_path = os.path.join(tmp_path, "test.jsonl")
+
+    job_array_command = _write_job_array(config_model, runner_params_path, n_jobs=12)
+
+    assert job_array_command.endswith(f'--params {runner_params_path} --stage_data"')
+
+
+def test_write_job_array_requeue(tmp_path, base_config):
+    requeue_config = copy.deepcopy(base_config)
+    requeue_config["requeue"] = {"warning_time": 10, "max_requeues": 3}
+    config_model = ConfigModel(**requeue_config)
+    runner_params_path = os.path.join(tmp_path, "test.jsonl")
+
+    job_array_command = _write_job_array(config_model, runner_params_path, n_jobs=12)
+
+    assert ' -wa "USR2" -wt "10" -Q "99" ' in job_array_command
+    assert job_array_command.endswith(
+        '--requeue_signal USR2 --requeue_exit_code 99 --max_requeues 3"'
+    )
+
+
+def test_format_array_indices():
+    assert _format_array_indices(range(1, 13)) == "1-12"
+    assert _format_array_indices([9, 1, 4, 7, 8]) == "1,4,7-9"
+    assert _format_array_indices([3]) == "3"
+
+
+def test_array_indices_of_jobs():
+    assert _array_indices_of_jobs([1, 4, 7, 8, 9], pack_size=1) == [1, 4, 7, 8, 9]
+    assert _array_indices_of_jobs([1, 4, 7, 8, 9], pack_size=4) == [1, 2, 3]
+
+
+def test_write_job_arrays_resource_overrides(tmp_path, base_config):
+    config = copy.deepcopy(base_config)
+    config["output_base_dir"] = tmp_path.as_posix()
+    config["resource_overrides"] = [
+        {"when": {"batch_size": [32]}, "job_parameters": {"memory": 16000}},
+        {
+            "when": {"batch_size": [32], "lr": [0.001]},
+            "job_parameters": {"run_time": "6:00"},
+        },
+    ]
+    config_model = ConfigModel(**config)
+    runner_params_path = _runner_params_path(config_model)
+    n_jobs = _write_runner_params(config_model, runner_params_path)
+
+    commands = _write_job_arrays(config_model, runner_params_path, n_jobs=n_jobs)
+
+    # batch_size 2 and 16, batch_size 32 and batch_size 32 with lr 0.001
+    assert len(commands) == 3
+    memory = ["mem=4000", "mem=16000", "mem=16000"]
+    run_time = ['-W "180"', '-W "180"', '-W "360"']
+    job_indices = []
+    for profile_index, command in enumerate(commands):
+        assert memory[profile_index] in command
+        assert run_time[profile_index] in command
+        assert f'_p{profile_index}_%I"' in command
+        map_path = os.path.join(tmp_path, f"my_experiment_profile{profile_index}.idx")
+        assert command.endswith(f'--index_map {map_path}"')
+        n_elements = int(command.split("[1-")[1].split("]")[0])
+        job_indices.append(
+            [read_index_map(map_path, p) for p in range(1, n_elements + 1)]
+        )
+    assert sorted(sum(job_indices, [])) == list(range(1, 13))
+    for job_index in job_indices[2]:
+        params = read_job_params(runner_params_path, job_index)
+        assert (params["batch_size"], params["lr"]) == (32, 0.001)
+
+    # only the profiles with pending jobs are submitted
+    commands = _write_job_arrays(
+        config_model, runner_params_path, n_jobs=n_jobs, pending_jobs=job_indices[1]
+    )
+    assert len(commands) == 1
+    assert commands[0].startswith(f'bsub -J "my_experiment[1-{len(job_indices[1])}]%4"')
+
+
+def test_write_job_arrays_without_overrides(tmp_path, base_config):
+    config_model = ConfigModel(**base_config)
+    runner_params_path = os.path.join(tmp_path, "test.jsonl")
+
+    commands = _write_job_arrays(
+        config_model, runner_params_path, n_jobs=12, pending_jobs=[4, 9, 12]
+    )
+
+    assert commands == [
+        _write_job_array(
+            config_model, runner_params_path, n_jobs=12, array_indices=[4, 9, 12]
+        )
+    ]
+
+
+def test_write_job_arrays_split(tmp_path, base_config):
+    config = copy.deepcopy(base_config)
+    config["output_base_dir"] = tmp_path.as_posix()
+    config["job_parameters"]["max_array_size"] = 5
+    config_model = ConfigModel(**config)
+    runner_params_path = _runner_params_path(config_model)
+    n_jobs = _write_runner_params(config_model, runner_params_path)
+    logfile_dir = os.path.join(config_model.job_parameters.logfile_dir, "my_experiment")
+
+    commands = _write_job_arrays(config_model, runner_params_path, n_jobs=n_jobs)
+
+    # the 12 elements are split into chunks of 5 that share njobs_parallel (4)
+    assert [command.split(" -w ")[0].split(" -o ")[0] for command in commands] == [
+        'bsub -J "my_experiment[1-5]%2"',
+        'bsub -J "my_experiment[1-5]%1"',
+        'bsub -J "my_experiment[1-2]%1"',
+    ]
+    for chunk_index, command in enumerate(commands):
+        assert f'-o "{logfile_dir}_c{chunk_index}_%I"' in command
+    assert " --index_offset " not in commands[0]
+    assert " --index_offset 5 " in commands[1]
+    assert " --index_offset 10 " in commands[2]
+
+    # only the chunks of pending jobs are submitted
+    commands = _write_job_arrays(
+        config_model, runner_params_path, n_jobs=n_jobs, pending_jobs=[3, 11]
+    )
+
+    assert len(commands) == 2
+    assert commands[0].startswith('bsub -J "my_experiment[3]%2"')
+    assert commands[1].startswith('bsub -J "my_experiment[1]%2"')
+    assert " --index_offset 10 " in commands[1]
+
+    # job arrays within the limit are not split
+    config["job_parameters"]["max_array_size"] = 12
+    config_model = ConfigModel(**config)
+
+    commands = _write_job_arrays(config_model, runner_params_path, n_jobs=n_jobs)
+
+    assert len(commands) == 1
+    assert commands[0].startswith('bsub -J "my_experiment[1-12]%4"')
+
+    # job arrays are only split if max_array_size is set
+    del config["job_parameters"]["max_array_size"]
+    config_model = ConfigModel(**config)
+    assert config_model.job_parameters.max_array_size is None
+
+    assert (
+        _write_job_arrays(config_model, runner_params_path, n_jobs=n_jobs) == commands
+    )
+
+
+def test_write_pipeline(tmp_path, base_config):
+    config = copy.deepcopy(base_config)
+    config["output_base_dir"] = tmp_path.as_posix()
+    config["resource_overrides"] = [
+        {"when": {"batch_size": [32]}, "job_parameters": {"memory": 16000}}
+    ]
+    config["stages"] = [
+        {
+            "name": "evaluate",
+            "runner": base_config["runner"],
+            "job_parameters": {"ngpus": 1},
+        },
+        {"name": "summary", "runner": base_config["runner"], "mode": "aggregate"},
+    ]
+    config_model = ConfigModel(**config)
+    runner_params_path = _runner_params_path(config_model)
+    n_jobs = _write_runner_params(config_model, runner_params_path)
+
+    commands = _write_pipeline(config_model, runner_params_path, n_jobs=n_jobs)
+
+    # two job arrays, one evaluate job array per job array and the summary job
+    assert len(commands) == 5
+    assert commands[:2] == _write_job_arrays(
+        config_model, runner_params_path, n_jobs=n_jobs
+    )
+    for profile_index, command in enumerate(commands[2:4]):
+        # each element waits for the same element of the job array of its profile
+        assert command.startswith(
+            commands[profile_index]
+            .split(" -w")[0]
+            .split(" -o")[0]
+            .replace("my_experiment[", "my_experiment_evaluate[")
+            + f' -w "ended(<job_id:{profile_index}>[*])"'
+        )
+        assert f'_evaluate_p{profile_index}_%I"' in command
+        assert "ngpus_excl_p=1" in command
+        assert commands[profile_index].split('-R "')[1].split(",")[1] in command
+        assert f"--runner {base_config['runner']} --stage evaluate" in command
+    # the summary job waits for the evaluate job arrays by their job IDs
+    assert commands[4].startswith(
+        'bsub -J "my_experiment_summary" -w "done(<job_id:2>) && done(<job_id:3>)"'
+    )
+    assert commands[4].endswith(
+        f'--job_prefix my_experiment --runner_params {runner_params_path}"'
+    )
@@ -0,0 +1,278 @@
+"""Collecting the metrics of the jobs of a sweep into one results table.
+
+The runner parameters of every job are joined with the metrics file in its
+output folder (see model_runner.metrics) into a columnar table, a dict of
+equally long columns: "job_index", one column per parameter axis and one
+column per metric. The metrics files are checked in parallel and a file
+is only read again if its modification time changed since the last
+collection. The modification times and metrics of the last collection are
+kept in {output_base_dir}{job_prefix}_results_state.json.
+
+The rounds of a successive halving search are job arrays of their own
+(see model_runner.successive_halving). Their tables are concatenated with
+the additional columns "round" and the budget parameter.
+
+The table is saved as {job_prefix}_results.parquet if pyarrow is installed
+and as {job_prefix}_results.csv otherwise.
+"""
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from .metrics import read_metrics
+from .params_store import iter_job_params
+from .successive_halving import submitted_rounds
+from .utils import _runner_params_path
+from .validator import ConfigModel
+
+# the number of threads that check and read the metrics files
+_MAX_WORKERS = 16
+
+
+def results_state_path(array_config: ConfigModel) -> str:
+    """Get the path of the state of the last collection of a sweep."""
+    return os.path.join(
+        array_config.output_base_dir, f"{array_config.job_prefix}_results_state.json"
+    )
+
+
+def _load_state(array_config: ConfigModel, metrics_file: str) -> Dict[str, Any]:
+    try:
+        with open(results_state_path(array_config), "r") as f_state:
+            state = json.load(f_state)
+    except (OSError, ValueError):
+        return {}
+
+    # the state of another metrics file is of no use
+    return state["jobs"] if state.get("metrics_file") == metrics_file else {}
+
+
+def _save_state(array_config: ConfigModel, metrics_file: str, jobs: Dict[str, Any]):
+    with open(results_state_path(array_config), "w") as f_state:
+        json.dump({"metrics_file": metrics_file, "jobs": jobs}, f_state)
+
+
+def _mtime_ns(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _collect_job_array(
+    array_config: ConfigModel, axes: List[str], metrics_file: str
+) -> Dict[str, List[Any]]:
+    """Collect the runner parameters of axes and the metrics of the jobs of a job array."""
+    job_params = list(iter_job_params(_runner_params_path(array_config)))
+    output_dirs = [
+        f"{array_config.output_base_dir}{array_config.job_prefix}{params['job_index']}"
+        for params in job_params
+    ]
+
+    previous_jobs = _load_state(array_config, metrics_file)
+    with ThreadPoolExecutor(max_workers=_MAX_WORKERS) as pool:
+        mtimes = list(
+            pool.map(
+                _mtime_ns,
+                [os.path.join(output_dir, metrics_file) for output_dir in output_dirs],
+            )
+        )
+
+        # only read the metrics files that changed since the last collection
+        jobs = {}
+        changed = []
+        for position, (params, mtime) in enumerate(zip(job_params, mtimes)):
+            previous = previous_jobs.get(str(params["job_index"]))
+            if mtime is None:
+                continue
+            elif previous is not None and previous[0] == mtime:
+                jobs[str(params["job_index"])] = previous
+            else:
+                changed.append(position)
+        changed_metrics = pool.map(
+            lambda position: read_metrics(
+                output_dirs[position], metrics_file=metrics_file
+            ),
+            changed,
+        )
+        for position, metrics in zip(changed, changed_metrics):
+            jobs[str(job_params[position]["job_index"])] = [mtimes[position], metrics]
+
+    _save_state(array_config, metrics_file, jobs)
+
+    metric_names = {}
+    for _, metrics in jobs.values():
+        metric_names.update(dict.fromkeys(metrics or {}))
+    table = {name: [] for name in ["job_index"] + axes}
+    table.update({name: [] for name in metric_names if name not in table})
+    for params in job_params:
+        metrics = jobs.get(str(params["job_index"]), [None, None])[1] or {}
+        for name in table:
+            if name == "job_index" or name in axes:
+                table[name].append(params.get(name))
+            else:
+                table[name].append(metrics.get(name))
+
+    return table
+
+
+def collect_results(
+    array_config: ConfigModel, metrics_file: Optional[str] = None
+) -> Dict[str, List[Any]]:
+    """Collect the runner parameters and metrics of all jobs of a sweep.
+
+    Parameters
+    ----------
+    array_config : ConfigModel
+        The parameters for the job array.
+    metrics_file : Optional[str]
+        The name of the metrics file in the output folder of each job.
+        If None, the metrics_file of the search is used.
+
+    Returns
+    -------
+    table : Dict[str, List[Any]]
+        The columns "job_index", the parameter axes and the metrics (in
+        the order in which they first appear). Jobs without a metrics file
+        (e.g., because they failed) have None as their metrics. For a
+        successive halving search, the rows of all submitted rounds with
+        the additional columns "round" and the budget parameter.
+    """
+    if metrics_file is None:
+        metrics_file = array_config.search.metrics_file
+    axes = list(array_config.runner_parameters)
+    if array_config.search.strategy != "successive_halving":
+        return _collect_job_array(array_config, axes, metrics_file)
+
+    axes.append(array_config.search.budget_parameter)
+    table = {name: [] for name in ["round", "job_index"] + axes}
+    for round_index, round_config in submitted_rounds(array_config):
+        round_table = _collect_job_array(round_config, axes, metrics_file)
+        n_rows, n_round_rows = len(table["round"]), len(round_table["job_index"])
+        for name in round_table:
+            # a metric that first appears in this round
+            table.setdefault(name, [None] * n_rows)
+        table["round"].extend([round_index] * n_round_rows)
+        for name, column in table.items():
+            if name != "round":
+                column.extend(round_table.get(name, [None] * n_round_rows))
+
+    return table
+
+
+def results_table_path(array_config: ConfigModel, extension: str) -> str:
+    """Get the path of the results table of a sweep (e.g., with the extension ".parquet")."""
+    return os.path.join(
+        array_config.output_base_dir, f"{array_config.job_prefix}_results{extension}"
+    )
+
+
+def write_results_table(array_config: ConfigModel, table: Dict[str, List[Any]]) -> str:
+    """Save a results table as Parquet (requires pyarrow) or CSV and return its path."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        pyarrow = None
+
+    if pyarrow is not None:
+        path = results_table_path(array_config, ".parquet")
+        pyarrow.parquet.write_table(pyarrow.table(table), path)
+        return path
+
+    path = results_table_path(array_config, ".csv")
+    with open(path, "w", newline="") as f_table:
+        writer = csv.writer(f_table)
+        writer.writerow(table)
+        writer.writerows(zip(*table.values()))
+
+    return path
+
+
+def parse_condition(condition: str) -> Dict[str, Any]:
+    """Parse a condition "name=value" on a column, the value is parsed as JSON if possible."""
+    name, sep, value = condition.partition("=")
+    if sep == "":
+        raise ValueError(f'condition "{condition}" is not of the form name=value')
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass
+
+    return {name: value}
+
+
+def select_rows(
+    table: Dict[str, List[Any]], where: Optional[Dict[str, Any]] = None
+) -> List[int]:
+    """Get the rows of a results table whose columns have the values in where."""
+    rows = range(len(table["job_index"]))
+    for name, value in (where or {}).items():
+        if name not in table:
+            raise KeyError(f'"{name}" is not a column of the results')
+        column = table[name]
+        rows = [row for row in rows if column[row] == value]
+
+    return list(rows)
+
+
+def rank_rows(
+    table: Dict[str, List[Any]],
+    metric: str,
+    mode: str = "min",
+    rows: Optional[Sequence[int]] = None,
+    top: Optional[int] = None,
+) -> List[int]:
+    """Sort the rows of a results table by a metric, best first.
+
+    Rows without a numeric value of the metric are left out.
+
+    Parameters
+    ----------
+    table : Dict[str, List[Any]]
+        The results table of collect_results().
+    metric : str
+        The column to sort by.
+    mode : str
+        "min" if lower values are better, "max" if higher values are better.
+    rows : Optional[Sequence[int]]
+        The rows to rank (e.g., of select_rows()). If None, all rows are ranked.
+    top : Optional[int]
+        The number of rows to return. If None, all ranked rows are returned.
+
+    Returns
+    -------
+    ranked : List[int]
+        The ranked rows.
+    """
+    if metric not in table:
+        raise KeyError(f'"{metric}" is not a column of the results')
+    column = table[metric]
+    if rows is None:
+        rows = range(len(column))
+
+    ranked = sorted(
+        (
+            row
+            for row in rows
+            if isinstance(column[row], (int, float))
+            and not isinstance(column[row], bool)
+        ),
+        key=column.__getitem__,
+        reverse=(mode == "max"),
+    )
+
+    return ranked if top is None else ranked[:top]
+
+
+def format_results(table: Dict[str, List[Any]], rows: Sequence[int]) -> str:
+    """Format rows of a results table as an aligned text table."""
+    lines = [list(table)] + [[str(table[name][row]) for name in table] for row in rows]
+    widths = [max(len(line[i]) for line in lines) for i in range(len(table))]
+
+    return "\n".join(
+        "  ".join(value.ljust(width) for value, width in zip(line, widths)).rstrip()
+        for line in lines
+    )
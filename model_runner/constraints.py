@@ -0,0 +1,182 @@
+"""Constraints that prune invalid combinations from the parameter grid.
+
+Two kinds of constraints are supported:
+
+- exclusion rules, e.g. ``{"optimizer": ["sgd"], "ngpus": [2, 4]}``, which
+  exclude every combination in which each listed axis has one of the
+  listed values.
+- conditional axes, e.g. ``{"lr": {"optimizer": ["adam"]}}``, which only
+  vary an axis in the combinations that match the condition. The other
+  combinations keep the first value of the axis, so they are not repeated
+  once per value of an axis that does not matter for them.
+
+The constraints are evaluated on the flat grid indices (see
+model_runner.params_store.unravel_grid_index()) without creating the
+parameters of the jobs. Each axis value is looked up once and every rule
+becomes a table of booleans per axis. If numpy is installed, the flat
+indices are unraveled and filtered chunk by chunk with vectorized lookups
+in these tables, so even grids with millions of combinations are pruned
+quickly and with bounded memory.
+"""
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .params_store import unravel_grid_index
+from .samplers import grid_size
+
+# the number of flat indices that are filtered at once with numpy
+_CHUNK_SIZE = 2**20
+
+# (axis position, whether each value of the axis matches)
+_AxisTable = Tuple[int, List[bool]]
+
+
+def _axis_tables(
+    condition: Dict[str, List[Any]],
+    param_names: List[str],
+    param_values: List[List[Any]],
+) -> List[_AxisTable]:
+    tables = []
+    for name, values in condition.items():
+        axis = param_names.index(name)
+        tables.append((axis, [value in values for value in param_values[axis]]))
+
+    return tables
+
+
+def _compile(
+    job_params: Dict[str, List[Any]],
+    exclude: Sequence[Dict[str, List[Any]]],
+    conditional_axes: Dict[str, Dict[str, List[Any]]],
+) -> Tuple[List[List[_AxisTable]], List[Tuple[int, List[_AxisTable]]]]:
+    param_names = list(job_params.keys())
+    param_values = list(job_params.values())
+    rules = [_axis_tables(rule, param_names, param_values) for rule in exclude]
+    conditions = [
+        (param_names.index(axis), _axis_tables(condition, param_names, param_values))
+        for axis, condition in conditional_axes.items()
+    ]
+
+    return rules, conditions
+
+
+def _chunks(flat_indices: Iterable[int], chunk_size: int) -> Iterator[List[int]]:
+    flat_indices = iter(flat_indices)
+    while True:
+        chunk = list(islice(flat_indices, chunk_size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def _filter_numpy(
+    numpy,
+    flat_indices: Optional[Iterable[int]],
+    axis_sizes: List[int],
+    rules: List[List[_AxisTable]],
+    conditions: List[Tuple[int, List[_AxisTable]]],
+    chunk_size: int,
+) -> Iterator[int]:
+    rules = [[(axis, numpy.array(table)) for axis, table in rule] for rule in rules]
+    conditions = [
+        (axis, [(a, numpy.array(table)) for a, table in condition])
+        for axis, condition in conditions
+    ]
+
+    if flat_indices is None:
+        n_combinations = grid_size(axis_sizes)
+        chunks = (
+            numpy.arange(start, min(start + chunk_size, n_combinations))
+            for start in range(0, n_combinations, chunk_size)
+        )
+    else:
+        chunks = (
+            numpy.array(chunk, dtype=numpy.int64)
+            for chunk in _chunks(flat_indices, chunk_size)
+        )
+
+    for chunk in chunks:
+        # numpy unravels in C order, i.e., the last axis varies fastest
+        axis_indices = numpy.unravel_index(chunk, axis_sizes)
+        valid = numpy.ones(len(chunk), dtype=bool)
+        for rule in rules:
+            matched = numpy.ones(len(chunk), dtype=bool)
+            for axis, table in rule:
+                matched &= table[axis_indices[axis]]
+            valid &= ~matched
+        for conditional_axis, condition in conditions:
+            matched = numpy.ones(len(chunk), dtype=bool)
+            for axis, table in condition:
+                matched &= table[axis_indices[axis]]
+            valid &= matched | (axis_indices[conditional_axis] == 0)
+        yield from chunk[valid].tolist()
+
+
+def _filter_python(
+    flat_indices: Optional[Iterable[int]],
+    axis_sizes: List[int],
+    rules: List[List[_AxisTable]],
+    conditions: List[Tuple[int, List[_AxisTable]]],
+) -> Iterator[int]:
+    if flat_indices is None:
+        flat_indices = range(grid_size(axis_sizes))
+
+    for flat_index in flat_indices:
+        axis_indices = unravel_grid_index(flat_index, axis_sizes)
+        if any(all(table[axis_indices[a]] for a, table in rule) for rule in rules):
+            continue
+        if any(
+            axis_indices[axis] != 0
+            and not all(table[axis_indices[a]] for a, table in condition)
+            for axis, condition in conditions
+        ):
+            continue
+        yield flat_index
+
+
+def filter_flat_indices(
+    job_params: Dict[str, List[Any]],
+    exclude: Sequence[Dict[str, List[Any]]] = (),
+    conditional_axes: Optional[Dict[str, Dict[str, List[Any]]]] = None,
+    flat_indices: Optional[Iterable[int]] = None,
+    chunk_size: int = _CHUNK_SIZE,
+) -> Iterator[int]:
+    """Lazily filter the combinations of the parameter grid with the constraints.
+
+    Uses numpy if it is installed and falls back to pure Python otherwise.
+
+    Parameters
+    ----------
+    job_params : Dict[str, List[Any]]
+        The values of each parameter axis of the grid.
+    exclude : Sequence[Dict[str, List[Any]]]
+        The exclusion rules. A combination is excluded if its value of
+        every axis of a rule is one of the listed values.
+    conditional_axes : Optional[Dict[str, Dict[str, List[Any]]]]
+        The condition of each conditional axis. In combinations that do
+        not match the condition, only the first value of the axis is kept.
+    flat_indices : Optional[Iterable[int]]
+        The flat grid indices to filter (e.g., of a sampler). If None,
+        all combinations of the grid are filtered.
+    chunk_size : int
+        The number of flat indices that are filtered at once with numpy.
+
+    Returns
+    -------
+    valid_flat_indices : Iterator[int]
+        The flat grid indices of the valid combinations, in the given order.
+    """
+    axis_sizes = [len(values) for values in job_params.values()]
+    rules, conditions = _compile(job_params, exclude, conditional_axes or {})
+
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+
+    if numpy is not None:
+        return _filter_numpy(
+            numpy, flat_indices, axis_sizes, rules, conditions, chunk_size
+        )
+
+    return _filter_python(flat_indices, axis_sizes, rules, conditions)
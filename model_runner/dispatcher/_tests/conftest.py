@@ -0,0 +1,40 @@
+import sys
+from multiprocessing import forkserver
+
+import pytest
+
+from model_runner.dispatcher.dispatcher_utils import load_entrypoint
+from model_runner.dispatcher.warm_pool import _forkserver_context
+
+ENTRYPOINT_SOURCE = """
+import os
+
+imports = []
+
+
+def main(params):
+    imports.append(os.getpid())
+    os.makedirs(params["output_base_dir"])
+    with open(os.path.join(params["output_base_dir"], "done.txt"), "w") as f:
+        f.write(str(len(imports)))
+    return params["exit_code"]
+"""
+
+
+@pytest.fixture
+def fresh_forkserver():
+    # the forkserver preloads the modules of the first job of the process
+    yield
+    forkserver._forkserver._stop()
+    _forkserver_context.cache_clear()
+
+
+@pytest.fixture
+def entrypoint_runner(tmp_path, monkeypatch):
+    # the entrypoint writes the number of jobs it ran in its process to done.txt
+    (tmp_path / "job_entrypoint_runner.py").write_text(ENTRYPOINT_SOURCE)
+    monkeypatch.syspath_prepend(tmp_path.as_posix())
+    monkeypatch.delitem(sys.modules, "job_entrypoint_runner", raising=False)
+    load_entrypoint.cache_clear()
+    yield "job_entrypoint_runner:main"
+    load_entrypoint.cache_clear()
@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from model_runner.dispatcher.data_staging import acquire, evict, release, staging_root
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data_dir = tmp_path / "shared" / "dataset"
+    data_dir.mkdir(parents=True)
+    (data_dir / "images.txt").write_text("1 2 3")
+
+    return data_dir
+
+
+def test_staging_root(monkeypatch, tmp_path):
+    monkeypatch.setenv("TMPDIR", tmp_path.as_posix())
+
+    assert staging_root() == os.path.join(tmp_path, "model_runner_data")
+
+
+def test_acquire_directory(tmp_path, data_dir):
+    root = (tmp_path / "scratch").as_posix()
+
+    local_path = acquire(data_dir.as_posix(), root=root)
+
+    assert local_path.startswith(root)
+    assert os.path.basename(local_path) == "dataset"
+    with open(os.path.join(local_path, "images.txt")) as f_images:
+        assert f_images.read() == "1 2 3"
+
+    # a trailing separator is kept
+    assert acquire(data_dir.as_posix() + os.path.sep, root=root) == (
+        local_path + os.path.sep
+    )
+
+
+def test_acquire_file(tmp_path, data_dir):
+    root = (tmp_path / "scratch").as_posix()
+    data_file = (data_dir / "images.txt").as_posix()
+
+    local_path = acquire(data_file, root=root)
+
+    assert os.path.basename(local_path) == "images.txt"
+    with open(local_path) as f_images:
+        assert f_images.read() == "1 2 3"
+
+
+def test_acquire_reuses_copy(tmp_path, data_dir):
+    root = (tmp_path / "scratch").as_posix()
+    local_path = acquire(data_dir.as_posix(), root=root)
+    marker = os.path.join(local_path, "marker.txt")
+    with open(marker, "w") as f_marker:
+        f_marker.write("staged")
+
+    # the second job on the node uses the same copy
+    assert acquire(data_dir.as_posix(), root=root) == local_path
+    assert os.path.exists(marker)
+
+    # a new version of the data is staged again
+    os.utime(data_dir, ns=(1, 1))
+    assert acquire(data_dir.as_posix(), root=root) == local_path
+    assert not os.path.exists(marker)
+
+
+def test_evict(tmp_path, data_dir):
+    root = (tmp_path / "scratch").as_posix()
+    local_path = acquire(data_dir.as_posix(), root=root)
+    acquire(data_dir.as_posix(), root=root)
+
+    # copies are only removed once no job uses them
+    release(data_dir.as_posix(), root=root)
+    assert evict(root=root) == 0
+    assert os.path.exists(local_path)
+
+    release(data_dir.as_posix(), root=root)
+    assert evict(root=root) == 1
+    assert not os.path.exists(local_path)
+    assert evict(root=root) == 0
+
+    # an evicted copy is staged again
+    assert acquire(data_dir.as_posix(), root=root) == local_path
+    assert os.path.exists(os.path.join(local_path, "images.txt"))
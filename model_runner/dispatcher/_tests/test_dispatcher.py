@@ -0,0 +1,600 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import model_runner
+from model_runner import ledger as ledger_module
+from model_runner.dispatcher import dispatcher as dispatcher_module
+from model_runner.dispatcher import main
+from model_runner.dispatcher.requeue import SignalForwarder
+from model_runner.early_stopping import read_stop, stop_path
+from model_runner.ledger import ledger_path, read_ledger
+from model_runner.params_store import (
+    read_job_params,
+    write_index_map,
+    write_indexed_params,
+)
+from model_runner.result_cache import cache_key, lookup
+
+RUNNER_SOURCE = """
+import argparse
+import json
+import os
+import sys
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--output_base_dir", type=str)
+parser.add_argument("--exit_code", type=int)
+args = parser.parse_args()
+
+os.makedirs(args.output_base_dir)
+with open(os.path.join(args.output_base_dir, "done.txt"), "w") as f:
+    f.write(str(args.exit_code))
+sys.exit(args.exit_code)
+"""
+
+
+@pytest.fixture
+def packed_params(tmp_path):
+    runner = tmp_path / "runner.py"
+    runner.write_text(RUNNER_SOURCE)
+    output_base_dir = tmp_path.as_posix() + os.path.sep
+
+    records = [
+        {
+            "runner": runner.as_posix(),
+            "job_prefix": "test_job",
+            "output_base_dir": output_base_dir,
+            "job_index": i,
+            "exit_code": 3 if i == 4 else 0,
+        }
+        for i in range(1, 6)
+    ]
+    store_path = tmp_path / "params.jsonl"
+    write_indexed_params(records, store_path)
+
+    return store_path, output_base_dir
+
+
+@pytest.mark.parametrize("pack_workers", [1, 2])
+def test_dispatcher_pack(monkeypatch, packed_params, pack_workers):
+    store_path, output_base_dir = packed_params
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "model_dispatcher",
+            "--job_id",
+            "1",
+            "--params",
+            store_path.as_posix(),
+            "--pack_size",
+            "3",
+            "--pack_workers",
+            str(pack_workers),
+        ],
+    )
+
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 0
+
+    # each job of the pack writes to its own output directory
+    for job_index in (1, 2, 3):
+        assert os.path.isfile(
+            os.path.join(output_base_dir, f"test_job{job_index}", "done.txt")
+        )
+    assert not os.path.exists(os.path.join(output_base_dir, "test_job4"))
+
+
+def test_dispatcher_index_offset(monkeypatch, packed_params):
+    store_path, output_base_dir = packed_params
+    argv = [
+        "model_dispatcher",
+        "--job_id",
+        "1",
+        "--params",
+        store_path.as_posix(),
+        "--index_offset",
+        "2",
+        "--pack_size",
+        "2",
+    ]
+    monkeypatch.setattr(sys, "argv", argv)
+
+    with pytest.raises(SystemExit):
+        main()
+
+    # element 1 of the second chunk runs the jobs of element 3
+    assert sorted(os.listdir(output_base_dir)) == [
+        "params.jsonl",
+        "params.jsonl.idx",
+        "runner.py",
+        "test_job5",
+        "test_job_ledger.jsonl",
+        "test_job_ledger_jobs",
+    ]
+
+
+def test_dispatcher_pack_failure(monkeypatch, packed_params):
+    store_path, output_base_dir = packed_params
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "model_dispatcher",
+            "--job_id",
+            "2",
+            "--params",
+            store_path.as_posix(),
+            "--pack_size",
+            "3",
+        ],
+    )
+
+    # the last pack is smaller and job 4 fails
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 3
+    assert os.path.isfile(os.path.join(output_base_dir, "test_job5", "done.txt"))
+
+
+def test_dispatcher_ledger(monkeypatch, packed_params):
+    store_path, output_base_dir = packed_params
+    path = ledger_path(output_base_dir, "test_job")
+    argv = [
+        "model_dispatcher",
+        "--job_id",
+        "2",
+        "--params",
+        store_path.as_posix(),
+        "--pack_size",
+        "3",
+    ]
+    monkeypatch.setattr(sys, "argv", argv)
+    with pytest.raises(SystemExit):
+        main()
+
+    records = read_ledger(path)
+    assert {i: r["exit_code"] for i, r in records.items()} == {4: 3, 5: 0}
+    # the resource usage of each job is recorded
+    for record in records.values():
+        assert record["cpu_time"] >= 0
+        assert record["max_rss_mb"] > 0
+
+    # only the failed job is rerun when skipping completed jobs
+    monkeypatch.setattr(sys, "argv", argv + ["--skip_completed"])
+    with pytest.raises(SystemExit):
+        main()
+
+    with open(path) as f_ledger:
+        rerun_jobs = [json.loads(line)["job_index"] for line in f_ledger]
+    assert rerun_jobs == [4, 5, 4]
+
+
+def test_dispatcher_stage(monkeypatch, tmp_path, packed_params):
+    store_path, output_base_dir = packed_params
+    stage_runner = tmp_path / "evaluate.py"
+    stage_runner.write_text(
+        RUNNER_SOURCE.replace("os.makedirs(args.output_base_dir)", "").replace(
+            "done.txt", "evaluated.txt"
+        )
+    )
+    argv = [
+        "model_dispatcher",
+        "--job_id",
+        "2",
+        "--params",
+        store_path.as_posix(),
+        "--runner",
+        stage_runner.as_posix(),
+        "--stage",
+        "evaluate",
+    ]
+    # the stage runs in the output folder of the job
+    os.makedirs(os.path.join(output_base_dir, "test_job2"))
+    monkeypatch.setattr(sys, "argv", argv)
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+
+    assert exit_info.value.code == 0
+    assert os.path.isfile(os.path.join(output_base_dir, "test_job2", "evaluated.txt"))
+    # the jobs of the stage are recorded in the ledger of the stage
+    assert not os.path.exists(ledger_path(output_base_dir, "test_job"))
+    records = read_ledger(ledger_path(output_base_dir, "test_job_evaluate"))
+    assert list(records) == [2]
+
+
+def test_dispatcher_early_stopping(monkeypatch, tmp_path):
+    runner = tmp_path / "runner.py"
+    runner.write_text(
+        "import argparse, json, os\n"
+        "parser = argparse.ArgumentParser()\n"
+        'parser.add_argument("--output_base_dir", type=str)\n'
+        'parser.add_argument("--loss", type=float)\n'
+        "args = parser.parse_args()\n"
+        "os.makedirs(args.output_base_dir)\n"
+        'with open(os.path.join(args.output_base_dir, "metrics.json"), "w") as f:\n'
+        '    json.dump({"loss": args.loss}, f)\n'
+    )
+    output_base_dir = tmp_path.as_posix() + os.path.sep
+    records = [
+        {
+            "runner": runner.as_posix(),
+            "job_prefix": "test_job",
+            "output_base_dir": output_base_dir,
+            "job_index": i,
+            "loss": 1 / i,
+        }
+        for i in range(1, 6)
+    ]
+    store_path = tmp_path / "params.jsonl"
+    write_indexed_params(records, store_path)
+
+    argv = [
+        "model_dispatcher",
+        "--job_id",
+        "1",
+        "--params",
+        store_path.as_posix(),
+        "--pack_size",
+        "5",
+        "--stop_metric",
+        "loss",
+        "--stop_threshold",
+        "0.4",
+    ]
+    monkeypatch.setattr(sys, "argv", argv)
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+
+    # job 3 reached the target, the remaining jobs were skipped
+    assert exit_info.value.code == 0
+    assert read_stop(stop_path(output_base_dir, "test_job")) == {
+        "job_index": 3,
+        "metric": "loss",
+        "value": 1 / 3,
+    }
+    assert sorted(read_ledger(ledger_path(output_base_dir, "test_job"))) == [1, 2, 3]
+    assert not os.path.exists(os.path.join(output_base_dir, "test_job4"))
+
+
+def test_dispatcher_stage_data(monkeypatch, tmp_path):
+    runner = tmp_path / "runner.py"
+    runner.write_text(
+        "import argparse, os, shutil\n"
+        "parser = argparse.ArgumentParser()\n"
+        'parser.add_argument("--output_base_dir", type=str)\n'
+        'parser.add_argument("--data", type=str)\n'
+        "args = parser.parse_args()\n"
+        "os.makedirs(args.output_base_dir)\n"
+        'with open(os.path.join(args.output_base_dir, "data.txt"), "w") as f:\n'
+        "    f.write(args.data)\n"
+        'shutil.copy(args.data, os.path.join(args.output_base_dir, "copy.txt"))\n'
+    )
+    data_file = tmp_path / "data.csv"
+    data_file.write_text("a,b")
+    output_base_dir = tmp_path.as_posix() + os.path.sep
+    records = [
+        {
+            "runner": runner.as_posix(),
+            "job_prefix": "test_job",
+            "output_base_dir": output_base_dir,
+            "job_index": i,
+            # the data of job 2 is missing
+            "data": (tmp_path / "missing.csv" if i == 2 else data_file).as_posix(),
+        }
+        for i in range(1, 4)
+    ]
+    store_path = tmp_path / "params.jsonl"
+    write_indexed_params(records, store_path)
+    scratch_dir = tmp_path / "scratch"
+    scratch_dir.mkdir()
+    monkeypatch.setenv("TMPDIR", scratch_dir.as_posix())
+
+    argv = [
+        "model_dispatcher",
+        "--job_id",
+        "1",
+        "--params",
+        store_path.as_posix(),
+        "--pack_size",
+        "3",
+        "--stage_data",
+    ]
+    monkeypatch.setattr(sys, "argv", argv)
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+
+    # job 2 fails without data, the other jobs of the pack still run
+    assert exit_info.value.code == 1
+    records = read_ledger(ledger_path(output_base_dir, "test_job"))
+    assert {i: r["exit_code"] for i, r in records.items()} == {1: 0, 2: 1, 3: 0}
+    assert not os.path.exists(os.path.join(output_base_dir, "test_job2"))
+
+    # both other jobs read the same staged copy, which is evicted afterwards
+    staged_paths = set()
+    for job_index in (1, 3):
+        job_dir = os.path.join(output_base_dir, f"test_job{job_index}")
+        with open(os.path.join(job_dir, "data.txt")) as f_data:
+            staged_paths.add(f_data.read())
+        with open(os.path.join(job_dir, "copy.txt")) as f_copy:
+            assert f_copy.read() == "a,b"
+    (staged_path,) = staged_paths
+    assert staged_path.startswith(os.path.join(scratch_dir, "model_runner_data"))
+    assert not os.path.exists(staged_path)
+
+
+CHECKPOINT_RUNNER_SOURCE = """
+import argparse
+import os
+import signal
+import sys
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--output_base_dir", type=str)
+parser.add_argument("--dispatcher_pid", type=int)
+parser.add_argument("--resume_from", type=str)
+args = parser.parse_args()
+
+os.makedirs(args.output_base_dir, exist_ok=True)
+if args.resume_from is not None:
+    with open(os.path.join(args.output_base_dir, "resumed.txt"), "w") as f:
+        f.write(args.resume_from)
+    sys.exit(0)
+
+
+def _save_checkpoint(signum, frame):
+    checkpoint = os.path.join(args.output_base_dir, "checkpoint.pt")
+    with open(checkpoint, "w") as f:
+        f.write("state")
+    with open(os.environ["MODEL_RUNNER_CHECKPOINT_FILE"], "w") as f:
+        f.write(checkpoint)
+    sys.exit(0)
+
+
+signal.signal(signal.SIGUSR2, _save_checkpoint)
+# LSF sends the warning signal to the dispatcher before the run time limit
+os.kill(args.dispatcher_pid, signal.SIGUSR2)
+time.sleep(30)
+sys.exit(1)
+"""
+
+
+def test_signal_forwarder_reentrant():
+    forwarder = SignalForwarder("USR2")
+
+    def _signal_while_tracking():
+        # the signal arrives while the thread that handles it holds the lock
+        # (e.g., the main thread in track() with a single worker)
+        with forwarder._lock:
+            forwarder._handle(forwarder.signum, None)
+
+    thread = threading.Thread(target=_signal_while_tracking, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert forwarder.received
+
+
+def test_dispatcher_requeue(monkeypatch, tmp_path):
+    runner = tmp_path / "runner.py"
+    runner.write_text(CHECKPOINT_RUNNER_SOURCE)
+    output_base_dir = tmp_path.as_posix() + os.path.sep
+    records = [
+        {
+            "runner": runner.as_posix(),
+            "job_prefix": "test_job",
+            "output_base_dir": output_base_dir,
+            "job_index": i,
+            "dispatcher_pid": os.getpid(),
+        }
+        for i in range(1, 3)
+    ]
+    store_path = tmp_path / "params.jsonl"
+    write_indexed_params(records, store_path)
+    argv = [
+        "model_dispatcher",
+        "--job_id",
+        "1",
+        "--params",
+        store_path.as_posix(),
+        "--pack_size",
+        "2",
+        "--requeue_exit_code",
+        "99",
+        "--max_requeues",
+        "1",
+    ]
+    monkeypatch.setattr(sys, "argv", argv)
+    path = ledger_path(output_base_dir, "test_job")
+    default_handler = signal.getsignal(signal.SIGUSR2)
+
+    try:
+        with pytest.raises(SystemExit) as exit_info:
+            main()
+
+        # job 1 saved a checkpoint, job 2 was not started
+        assert exit_info.value.code == 99
+        checkpoint = os.path.join(output_base_dir, "test_job1", "checkpoint.pt")
+        ledger = read_ledger(path)
+        assert list(ledger) == [1]
+        assert ledger[1]["exit_code"] == 99
+        assert (ledger[1]["checkpoint"], ledger[1]["requeues"]) == (checkpoint, 1)
+
+        # the requeued element resumes job 1 and runs job 2, it only reads the
+        # records of its own jobs instead of the whole ledger
+        def read_whole_ledger(path):
+            raise AssertionError("the whole ledger was read")
+
+        with monkeypatch.context() as m:
+            m.setattr(ledger_module, "read_ledger", read_whole_ledger)
+            m.setattr(
+                dispatcher_module, "read_ledger", read_whole_ledger, raising=False
+            )
+            with pytest.raises(SystemExit) as exit_info:
+                main()
+
+        assert exit_info.value.code == 99
+        with open(os.path.join(output_base_dir, "test_job1", "resumed.txt")) as f:
+            assert f.read() == checkpoint
+        ledger = read_ledger(path)
+        assert ledger[1]["exit_code"] == 0
+        assert (ledger[2]["exit_code"], ledger[2]["requeues"]) == (99, 1)
+
+        # job 1 is not run again and job 2 resumes
+        with pytest.raises(SystemExit) as exit_info:
+            main()
+
+        assert exit_info.value.code == 0
+        assert os.path.isfile(os.path.join(output_base_dir, "test_job2", "resumed.txt"))
+    finally:
+        signal.signal(signal.SIGUSR2, default_handler)
+
+
+def test_dispatcher_result_cache(monkeypatch, tmp_path, packed_params):
+    store_path, output_base_dir = packed_params
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "model_dispatcher",
+            "--job_id",
+            "2",
+            "--params",
+            store_path.as_posix(),
+            "--pack_size",
+            "3",
+            "--result_cache",
+            cache_dir.as_posix(),
+            "--runner_hash",
+            "abc",
+        ],
+    )
+    with pytest.raises(SystemExit):
+        main()
+
+    # only the successful job is cached
+    job_params = read_job_params(store_path, 5)
+    entry_path = lookup(cache_dir.as_posix(), cache_key(job_params, "abc"))
+    assert os.path.isfile(os.path.join(entry_path, "done.txt"))
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_dispatcher_entrypoint(monkeypatch, packed_params, entrypoint_runner):
+    store_path, output_base_dir = packed_params
+    records = [
+        dict(params, runner=entrypoint_runner)
+        for params in (read_job_params(store_path, i) for i in range(1, 6))
+    ]
+    write_indexed_params(records, store_path)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "model_dispatcher",
+            "--job_id",
+            "2",
+            "--params",
+            store_path.as_posix(),
+            "--pack_size",
+            "3",
+            "--entrypoint",
+        ],
+    )
+
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 3
+
+    # both jobs of the pack ran in the dispatcher with the same import of the runner
+    for job_index, n_calls in ((4, "1"), (5, "2")):
+        with open(
+            os.path.join(output_base_dir, f"test_job{job_index}", "done.txt")
+        ) as f:
+            assert f.read() == n_calls
+
+
+def test_dispatcher_preload(monkeypatch, packed_params, fresh_forkserver):
+    store_path, output_base_dir = packed_params
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "model_dispatcher",
+            "--job_id",
+            "2",
+            "--params",
+            store_path.as_posix(),
+            "--pack_size",
+            "3",
+            "--pack_workers",
+            "2",
+            "--preload",
+            "json,argparse",
+        ],
+    )
+
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 3
+
+    records = read_ledger(ledger_path(output_base_dir, "test_job"))
+    assert {i: r["exit_code"] for i, r in records.items()} == {4: 3, 5: 0}
+
+
+def test_dispatcher_imports():
+    # every job array element pays for the imports of the dispatcher
+    repo_dir = os.path.dirname(os.path.dirname(model_runner.__file__))
+    code = "import sys, model_runner.dispatcher; print(' '.join(sys.modules))"
+    env = dict(os.environ)
+    env["PYTHONPATH"] = repo_dir
+    process = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imported = {name.split(".")[0] for name in process.stdout.split()}
+
+    for heavy_module in ("pydantic", "asyncio", "multiprocessing", "concurrent"):
+        assert heavy_module not in imported
+
+
+def test_dispatcher_index_map(monkeypatch, tmp_path, packed_params):
+    store_path, output_base_dir = packed_params
+    map_path = tmp_path / "profile.idx"
+    write_index_map(map_path, [2, 3, 5])
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "model_dispatcher",
+            "--job_id",
+            "1",
+            "--params",
+            store_path.as_posix(),
+            "--pack_size",
+            "2",
+            "--index_map",
+            map_path.as_posix(),
+        ],
+    )
+
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 0
+
+    # the first element runs the jobs at the first two positions of the map
+    records = read_ledger(ledger_path(output_base_dir, "test_job"))
+    assert sorted(records) == [2, 3]
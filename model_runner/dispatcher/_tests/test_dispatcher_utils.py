@@ -1,6 +1,40 @@
+import os
+import sys
+
 import pytest
 
-from model_runner.dispatcher.dispatcher_utils import create_run_command
+from model_runner.dispatcher.dispatcher_utils import (
+    create_run_command,
+    load_entrypoint,
+    pack_job_indices,
+    run_entrypoint,
+    run_job_with_usage,
+)
+
+ENTRYPOINT_SOURCE = """
+import sys
+
+calls = []
+
+
+def main(params):
+    calls.append(params)
+    if params.get("fail"):
+        raise RuntimeError("failed")
+    if params.get("exit"):
+        sys.exit(params["exit"])
+    return params.get("exit_code")
+"""
+
+
+@pytest.fixture
+def entrypoint_module(tmp_path, monkeypatch):
+    (tmp_path / "entrypoint_runner.py").write_text(ENTRYPOINT_SOURCE)
+    monkeypatch.syspath_prepend(tmp_path.as_posix())
+    monkeypatch.delitem(sys.modules, "entrypoint_runner", raising=False)
+    load_entrypoint.cache_clear()
+    yield "entrypoint_runner:main"
+    load_entrypoint.cache_clear()
 
 
 def test_create_run_command():
@@ -34,3 +68,79 @@ def test_create_run_command_errors():
     }
     with pytest.raises(TypeError):
         _ = create_run_command(params_bad_runner)
+
+
+def test_pack_job_indices():
+    assert list(pack_job_indices(1, pack_size=4, n_jobs=10)) == [1, 2, 3, 4]
+    assert list(pack_job_indices(2, pack_size=4, n_jobs=10)) == [5, 6, 7, 8]
+    assert list(pack_job_indices(3, pack_size=4, n_jobs=10)) == [9, 10]
+
+    with pytest.raises(ValueError):
+        _ = pack_job_indices(4, pack_size=4, n_jobs=10)
+
+
+def test_load_entrypoint(entrypoint_module):
+    entrypoint = load_entrypoint(entrypoint_module)
+    assert entrypoint.__name__ == "main"
+    assert load_entrypoint(entrypoint_module) is entrypoint
+
+    with pytest.raises(ValueError):
+        _ = load_entrypoint("entrypoint_runner")
+    with pytest.raises(AttributeError):
+        _ = load_entrypoint("entrypoint_runner:no_such_function")
+
+
+def test_run_entrypoint(entrypoint_module):
+    def _params(**kwargs):
+        params = {
+            "runner": entrypoint_module,
+            "job_index": 1,
+            "job_prefix": "my_experiment",
+            "output_base_dir": "/some/output/",
+            "batch_size": 1,
+        }
+        params.update(kwargs)
+        return params
+
+    assert run_entrypoint(_params()) == 0
+    # the function gets the same parameters as a runner script
+    calls = sys.modules["entrypoint_runner"].calls
+    assert calls[-1] == {
+        "batch_size": 1,
+        "output_base_dir": "/some/output/my_experiment1/",
+    }
+
+    assert run_entrypoint(_params(exit_code=3)) == 3
+    assert run_entrypoint(_params(exit=4)) == 4
+    assert run_entrypoint(_params(fail=True)) == 1
+    # the module is only imported once
+    assert len(sys.modules["entrypoint_runner"].calls) == 4
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "sched_getaffinity"), reason="requires CPU affinity support"
+)
+def test_run_job_with_usage_cpus(tmp_path):
+    runner = tmp_path / "runner.py"
+    runner.write_text(
+        "import argparse, os\n"
+        "parser = argparse.ArgumentParser()\n"
+        'parser.add_argument("--output_base_dir", type=str)\n'
+        "args = parser.parse_args()\n"
+        "os.makedirs(args.output_base_dir)\n"
+        'with open(os.path.join(args.output_base_dir, "cpus.txt"), "w") as f:\n'
+        "    f.write(str(sorted(os.sched_getaffinity(0))))\n"
+    )
+    params = {
+        "runner": runner.as_posix(),
+        "job_index": 1,
+        "job_prefix": "test_job",
+        "output_base_dir": tmp_path.as_posix() + os.path.sep,
+    }
+    cpu = min(os.sched_getaffinity(0))
+
+    exit_code, usage = run_job_with_usage(params, cpus={cpu})
+
+    # the runner is pinned from its start
+    assert exit_code == 0
+    assert (tmp_path / "test_job1" / "cpus.txt").read_text() == str([cpu])
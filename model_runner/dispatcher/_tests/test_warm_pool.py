@@ -0,0 +1,60 @@
+import os
+import sys
+
+from model_runner.dispatcher.warm_pool import run_warm_job, run_warm_job_with_usage
+
+RUNNER_SOURCE = """
+import argparse
+import os
+import sys
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--output_base_dir", type=str)
+parser.add_argument("--exit_code", type=int)
+parser.add_argument("--tag", type=str)
+args = parser.parse_args()
+
+os.makedirs(args.output_base_dir)
+with open(os.path.join(args.output_base_dir, "done.txt"), "w") as f:
+    # the preloaded module was imported before the runner
+    f.write(f"{__name__} {'warm_module' in sys.modules} {args.tag}")
+sys.exit(args.exit_code)
+"""
+
+
+def _params(tmp_path, runner, job_index, exit_code=0):
+    return {
+        "runner": runner,
+        "job_prefix": "test_job",
+        "output_base_dir": tmp_path.as_posix() + os.path.sep,
+        "job_index": job_index,
+        "exit_code": exit_code,
+        "tag": "warm",
+    }
+
+
+def test_run_warm_job(tmp_path, monkeypatch, fresh_forkserver, entrypoint_runner):
+    runner = tmp_path / "runner.py"
+    runner.write_text(RUNNER_SOURCE)
+    (tmp_path / "warm_module.py").write_text("")
+    monkeypatch.chdir(tmp_path)
+    preload_modules = ["warm_module"]
+
+    assert run_warm_job(_params(tmp_path, runner.as_posix(), 1), preload_modules) == 0
+    assert (tmp_path / "test_job1" / "done.txt").read_text() == "__main__ True warm"
+    # each job runs in its own process
+    assert "warm_module" not in sys.modules
+
+    exit_code, usage = run_warm_job_with_usage(
+        _params(tmp_path, runner.as_posix(), 2, exit_code=3), preload_modules
+    )
+    assert exit_code == 3
+    assert usage["max_rss_mb"] > 0
+
+    exit_code = run_warm_job(
+        _params(tmp_path, entrypoint_runner, 3, exit_code=4),
+        preload_modules,
+        entrypoint=True,
+    )
+    assert exit_code == 4
+    assert (tmp_path / "test_job3").is_dir()
@@ -0,0 +1,52 @@
+import threading
+import time
+
+from model_runner.dispatcher.worker_pool import (
+    create_worker_slots,
+    run_worker_pool,
+    split_devices,
+)
+
+
+def test_split_devices():
+    assert split_devices([0, 1, 2, 3, 4], 2) == [[0, 1, 2], [3, 4]]
+    assert split_devices(["0", "1", "2", "3"], 4) == [["0"], ["1"], ["2"], ["3"]]
+
+    # fewer devices than workers are shared
+    assert split_devices(["0"], 2) is None
+
+
+def test_create_worker_slots_gpus(monkeypatch):
+    monkeypatch.setenv("CUDA_VISIBLE_DEVICES", "0,1,2,3")
+    slots = create_worker_slots(2)
+
+    assert [slot.gpus for slot in slots] == [["0", "1"], ["2", "3"]]
+    assert slots[1].env()["CUDA_VISIBLE_DEVICES"] == "2,3"
+
+    monkeypatch.delenv("CUDA_VISIBLE_DEVICES")
+    slots = create_worker_slots(2)
+    assert all(slot.gpus is None and slot.env() is None for slot in slots)
+
+
+def test_run_worker_pool(monkeypatch):
+    monkeypatch.setenv("CUDA_VISIBLE_DEVICES", "0,1")
+    lock = threading.Lock()
+    busy_gpus = set()
+    used_gpus = []
+
+    def run_fn(job_index, slot):
+        gpu = slot.gpus[0]
+        with lock:
+            # a slot is never used by two jobs at the same time
+            assert gpu not in busy_gpus
+            busy_gpus.add(gpu)
+            used_gpus.append(gpu)
+        time.sleep(0.01)
+        with lock:
+            busy_gpus.remove(gpu)
+        return job_index % 2
+
+    exit_codes = run_worker_pool(range(1, 7), n_workers=2, run_fn=run_fn)
+
+    assert exit_codes == [1, 0, 1, 0, 1, 0]
+    assert set(used_gpus) == {"0", "1"}
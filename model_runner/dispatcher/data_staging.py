@@ -0,0 +1,172 @@
+"""Staging of the data of the jobs into node-local scratch.
+
+With data staging, the dispatcher copies the "data" path of a job into the
+node-local scratch directory $TMPDIR (the scratch space that LSF reserves
+for the job, see the "scratch" job parameter) before it runs the job, and
+the runner reads the local copy instead of the shared file system. Each
+data path is copied once into ``$TMPDIR/model_runner_data/{key}/``, where
+key is the hash of the path, and is reused by all jobs of the same node
+that run with the same data (e.g., the jobs of a pack).
+
+Every staged copy has a lock file, which is locked with fcntl.flock() while
+it is copied, so concurrent jobs wait for the first one to finish the copy
+instead of copying again, and a reference count of the jobs that use it.
+When the dispatcher is done, it evicts the copies that are no longer used.
+LSF removes $TMPDIR when the allocation ends in any case.
+"""
+import contextlib
+import fcntl
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Iterator, Optional
+
+_STAGING_DIR = "model_runner_data"
+
+
+class StagingError(RuntimeError):
+    """Raised when the data of a job cannot be staged."""
+
+
+def staging_root() -> str:
+    """Get the directory of the staged copies in the node-local scratch."""
+    return os.path.join(os.environ.get("TMPDIR") or tempfile.gettempdir(), _STAGING_DIR)
+
+
+def _entry_dir(data_path: str, root: str) -> str:
+    key = hashlib.sha256(os.path.realpath(data_path).encode("utf-8")).hexdigest()
+    return os.path.join(root, key[:32])
+
+
+@contextlib.contextmanager
+def _locked(entry_dir: str) -> Iterator[None]:
+    os.makedirs(entry_dir, exist_ok=True)
+    with open(os.path.join(entry_dir, "lock"), "a") as f_lock:
+        fcntl.flock(f_lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f_lock, fcntl.LOCK_UN)
+
+
+def _read_count(entry_dir: str, name: str) -> Optional[int]:
+    try:
+        with open(os.path.join(entry_dir, name), "r") as f_count:
+            return int(f_count.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_count(entry_dir: str, name: str, value: int):
+    with open(os.path.join(entry_dir, name), "w") as f_count:
+        f_count.write(str(value))
+
+
+def _source_version(data_path: str) -> int:
+    # a changed source (e.g., a new version of the dataset) is staged again
+    return os.stat(data_path).st_mtime_ns
+
+
+def _copy(data_path: str, destination: str):
+    """Copy a file or directory, with rsync if it is installed."""
+    if shutil.which("rsync") is not None:
+        source = data_path.rstrip(os.path.sep)
+        if os.path.isdir(source):
+            source += os.path.sep
+        subprocess.run(["rsync", "-a", source, destination], check=True)
+    elif os.path.isdir(data_path):
+        shutil.copytree(data_path, destination)
+    else:
+        shutil.copy2(data_path, destination)
+
+
+def _staged_path(data_path: str, entry_dir: str) -> str:
+    local_path = os.path.join(
+        entry_dir, "data", os.path.basename(data_path.rstrip(os.path.sep))
+    )
+    # keep the trailing separator of directories, which the runner may rely on
+    return local_path + os.path.sep if data_path.endswith(os.path.sep) else local_path
+
+
+def acquire(data_path: str, root: Optional[str] = None) -> str:
+    """Stage a data path into the node-local scratch and get the path of the copy.
+
+    The copy is only made if no job on this node staged the same version of
+    the data before. Every call has to be followed by a call to release().
+
+    Parameters
+    ----------
+    data_path : str
+        The path to the data file or directory on the shared file system.
+    root : Optional[str]
+        The directory of the staged copies. If None, staging_root() is used.
+
+    Returns
+    -------
+    local_path : str
+        The path to the staged copy.
+
+    Raises
+    ------
+    StagingError
+        If the data cannot be copied. The copy is then not acquired.
+    """
+    entry_dir = _entry_dir(data_path, root or staging_root())
+    local_path = _staged_path(data_path, entry_dir)
+    try:
+        version = _source_version(data_path)
+        with _locked(entry_dir):
+            if _read_count(entry_dir, "version") != version or not os.path.exists(
+                local_path
+            ):
+                shutil.rmtree(os.path.join(entry_dir, "data"), ignore_errors=True)
+                os.makedirs(os.path.join(entry_dir, "data"))
+                _copy(data_path, local_path.rstrip(os.path.sep))
+                _write_count(entry_dir, "version", version)
+            _write_count(
+                entry_dir, "refcount", (_read_count(entry_dir, "refcount") or 0) + 1
+            )
+    except (OSError, subprocess.CalledProcessError) as e:
+        # e.g., a missing data path, a failed rsync or a full scratch
+        raise StagingError(f"could not stage {data_path}: {e}") from e
+
+    return local_path
+
+
+def release(data_path: str, root: Optional[str] = None):
+    """Release a staged copy after the job that acquired it finished."""
+    entry_dir = _entry_dir(data_path, root or staging_root())
+    with _locked(entry_dir):
+        refcount = _read_count(entry_dir, "refcount") or 0
+        _write_count(entry_dir, "refcount", max(0, refcount - 1))
+
+
+def evict(root: Optional[str] = None) -> int:
+    """Remove the staged copies that are not used by any job.
+
+    Returns
+    -------
+    n_evicted : int
+        The number of removed copies.
+    """
+    root = root or staging_root()
+    if not os.path.isdir(root):
+        return 0
+
+    n_evicted = 0
+    for name in os.listdir(root):
+        entry_dir = os.path.join(root, name)
+        with _locked(entry_dir):
+            staged_dir = os.path.join(entry_dir, "data")
+            if (_read_count(entry_dir, "refcount") or 0) > 0 or not os.path.isdir(
+                staged_dir
+            ):
+                continue
+            shutil.rmtree(staged_dir)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(entry_dir, "version"))
+            n_evicted += 1
+
+    return n_evicted
@@ -1,22 +1,377 @@
+"""The model_dispatcher entry point, which runs the jobs of one job array element.
+
+It is started once for every element of the job array, so its import time
+is paid by every element. Only the modules needed by every element are
+imported at the top, everything else (e.g., multiprocessing for the warm
+pool) is imported where it is used. The dispatcher and the modules of
+model_runner that it imports (e.g., model_runner.ledger) must only depend
+on the standard library. In particular, the dispatcher must not import
+the validator (pydantic), the runner parameters are validated by
+model_runner before submission.
+"""
 import argparse
-import json
 import os
+import sys
+import time
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from ..ledger import append_ledger_record, ledger_path, read_job_records
+from ..params_store import (
+    count_index_map,
+    count_job_params,
+    read_index_map,
+    read_job_params,
+)
+from .dispatcher_utils import (
+    pack_job_indices,
+    run_entrypoint_with_usage,
+    run_job_with_usage,
+)
+
+if TYPE_CHECKING:
+    from .worker_pool import WorkerSlot
+
+
+def _ledger_path(job_params: Dict[str, Any], stage: Optional[str] = None) -> str:
+    """Get the path of the ledger of the jobs (of a pipeline stage)."""
+    job_prefix = job_params["job_prefix"]
+    if stage is not None:
+        job_prefix += f"_{stage}"
+    return ledger_path(job_params["output_base_dir"], job_prefix)
+
+
+def _check_early_stopping(
+    path: str,
+    job_index: int,
+    output_dir: str,
+    metric: str,
+    threshold: float,
+    mode: str,
+    metrics_file: str,
+):
+    """Stop the sweep if the metric of a job reached the threshold."""
+    from ..early_stopping import request_stop, target_reached
+    from ..metrics import read_metric
+
+    value = read_metric(output_dir, metric, metrics_file=metrics_file)
+    if value is None or not target_reached(value, threshold, mode=mode):
+        return
+
+    if request_stop(path, {"job_index": job_index, "metric": metric, "value": value}):
+        print(
+            f"job {job_index} reached {metric} {value}, stopping the sweep", flush=True
+        )
+
+
+def _run_indexed_job(
+    params_path: str,
+    job_index: int,
+    worker_slot: Optional["WorkerSlot"] = None,
+    result_cache: Optional[str] = None,
+    runner_hash: Optional[str] = None,
+    entrypoint: bool = False,
+    preload_modules: Optional[List[str]] = None,
+    runner: Optional[str] = None,
+    stage: Optional[str] = None,
+    early_stopping: Optional[Dict[str, Any]] = None,
+    stage_data: bool = False,
+    requeue: Optional[Dict[str, Any]] = None,
+) -> int:
+    # only read the parameters of this job from the store
+    job_params = read_job_params(params_path, job_index)
+    job_ledger_path = _ledger_path(job_params, stage)
+    if early_stopping is not None:
+        from ..early_stopping import is_stopped, stop_path
+
+        job_stop_path = stop_path(
+            job_params["output_base_dir"], job_params["job_prefix"]
+        )
+        if is_stopped(job_stop_path):
+            print(f"job {job_index} skipped, the sweep was stopped early", flush=True)
+            return 0
+    if requeue is not None and requeue["forwarder"].received:
+        # too little run time is left, the job runs when the element is requeued
+        print(f"job {job_index} not started, the job array element is requeued")
+        return requeue["exit_code"]
+    if runner is not None:
+        job_params["runner"] = runner
+    output_dir = (
+        f"{job_params['output_base_dir']}{job_params['job_prefix']}{job_index}/"
+    )
+    if result_cache is not None:
+        from ..result_cache import cache_key, store
+
+        job_cache_key = cache_key(job_params, runner_hash)
+
+    env = None if worker_slot is None else worker_slot.env()
+    cpus = None if worker_slot is None else worker_slot.cpus
+
+    n_requeues = 0
+    if requeue is not None:
+        previous = requeue["records"].get(job_index, {})
+        if previous.get("checkpoint") is not None:
+            # the job continues from the checkpoint of its previous run
+            job_params["resume_from"] = previous["checkpoint"]
+            n_requeues = previous.get("requeues", 0)
 
-from .dispatcher_utils import create_run_command
+    start_time = time.monotonic()
+    checkpoint = None
+    staging_failed = False
+    data_path = job_params.get("data") if stage_data else None
+    if data_path is not None:
+        from .data_staging import StagingError, acquire, release
+
+        try:
+            # the runner reads the copy of the data in the node-local scratch
+            job_params["data"] = acquire(data_path)
+        except StagingError as e:
+            # the job fails, the other jobs of the pack still run
+            print(f"job {job_index} not started: {e}", flush=True)
+            staging_failed = True
+            data_path = None
+    try:
+        if staging_failed:
+            exit_code, usage = 1, None
+        elif preload_modules is not None:
+            from .warm_pool import run_warm_job_with_usage
+
+            exit_code, usage = run_warm_job_with_usage(
+                job_params, preload_modules, env=env, cpus=cpus, entrypoint=entrypoint
+            )
+        elif entrypoint:
+            exit_code, usage = run_entrypoint_with_usage(job_params)
+        elif requeue is not None:
+            from .requeue import checkpoint_report
+
+            with checkpoint_report(env) as report:
+                exit_code, usage = run_job_with_usage(
+                    job_params,
+                    env=report["env"],
+                    cpus=cpus,
+                    forwarder=requeue["forwarder"],
+                )
+            checkpoint = report["checkpoint"]
+        else:
+            exit_code, usage = run_job_with_usage(job_params, env=env, cpus=cpus)
+    finally:
+        if data_path is not None:
+            release(data_path)
+    duration = time.monotonic() - start_time
+    print(f"job {job_index} finished with exit code {exit_code}", flush=True)
+
+    extra = {}
+    if checkpoint is not None:
+        extra = {"checkpoint": checkpoint, "requeues": n_requeues}
+        if requeue["forwarder"].received:
+            extra["requeues"] += 1
+            if n_requeues < requeue["max_requeues"]:
+                print(f"job {job_index} is requeued from {checkpoint}", flush=True)
+                exit_code = requeue["exit_code"]
+            else:
+                print(f"job {job_index} reached the maximum number of requeues")
+                exit_code = exit_code or 1
+
+    # the resource usage is recorded to size the resource requests of later sweeps
+    append_ledger_record(
+        job_ledger_path,
+        job_index=job_index,
+        exit_code=exit_code,
+        duration=duration,
+        **(usage or {}),
+        **extra,
+    )
+
+    if result_cache is not None and exit_code == 0 and os.path.isdir(output_dir):
+        store(result_cache, job_cache_key, output_dir)
+
+    if early_stopping is not None and exit_code == 0:
+        _check_early_stopping(job_stop_path, job_index, output_dir, **early_stopping)
+
+    return exit_code
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--job_id", help="the job ID from /$LSB_JOBINDEX", type=int)
     parser.add_argument("--params", help="path to the job params file", type=str)
+    parser.add_argument(
+        "--index_offset",
+        help="offset that is added to --job_id (e.g., for a chunk of a split job array)",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--pack_size", help="number of jobs per job ID", type=int, default=1
+    )
+    parser.add_argument(
+        "--pack_workers",
+        help="number of jobs of the pack to run concurrently",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--skip_completed",
+        help="skip jobs that already completed successfully according to the ledger",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--result_cache", help="directory of the result cache", type=str
+    )
+    parser.add_argument(
+        "--runner_hash", help="hash of the content of the runner", type=str
+    )
+    parser.add_argument(
+        "--entrypoint",
+        help='the runner is a python entrypoint ("module:function") that is called in this process',
+        action="store_true",
+    )
+    parser.add_argument(
+        "--preload",
+        help="comma separated modules to import once in a forkserver that forks every job",
+        type=str,
+    )
+    parser.add_argument(
+        "--index_map",
+        help="index map of the jobs of a job array that only runs a subset of the jobs",
+        type=str,
+    )
+    parser.add_argument(
+        "--runner",
+        help="runner to run instead of the runner in the job params (e.g., of a pipeline stage)",
+        type=str,
+    )
+    parser.add_argument(
+        "--stage",
+        help="name of the pipeline stage, whose jobs are recorded in their own ledger",
+        type=str,
+    )
+    parser.add_argument(
+        "--stop_metric",
+        help="metric that stops the sweep early once a job reached --stop_threshold",
+        type=str,
+    )
+    parser.add_argument(
+        "--stop_threshold", help="target value of --stop_metric", type=float
+    )
+    parser.add_argument(
+        "--stop_mode",
+        help='"min" if the target is reached at or below the threshold, "max" if at or above it',
+        choices=["min", "max"],
+        default="min",
+    )
+    parser.add_argument(
+        "--metrics_file",
+        help="name of the metrics file in the output folder of each job",
+        type=str,
+        default="metrics.json",
+    )
+    parser.add_argument(
+        "--requeue_signal",
+        help="signal (e.g., USR2) before the run time limit that is forwarded to the runners to save a checkpoint",
+        type=str,
+        default="USR2",
+    )
+    parser.add_argument(
+        "--requeue_exit_code",
+        help="exit code with which the element is requeued once the runners saved their checkpoints",
+        type=int,
+    )
+    parser.add_argument(
+        "--max_requeues",
+        help="maximum number of times a job is requeued",
+        type=int,
+        default=10,
+    )
+    parser.add_argument(
+        "--stage_data",
+        help="copy the data of each job into the node-local scratch ($TMPDIR) and run the job on the copy",
+        action="store_true",
+    )
     args = parser.parse_args()
+    # without the forkserver, entrypoints run in the dispatcher and cannot be pinned
+    if args.entrypoint and args.pack_workers > 1 and args.preload is None:
+        parser.error("--entrypoint runs the jobs of a pack one after the other")
+    if args.stop_metric is not None and args.stop_threshold is None:
+        parser.error("--stop_metric requires --stop_threshold")
+    early_stopping = None
+    if args.stop_metric is not None:
+        early_stopping = {
+            "metric": args.stop_metric,
+            "threshold": args.stop_threshold,
+            "mode": args.stop_mode,
+            "metrics_file": args.metrics_file,
+        }
+    preload_modules = None
+    if args.preload is not None:
+        preload_modules = [module for module in args.preload.split(",") if module]
+
+    job_id = args.job_id + args.index_offset
+
+    if args.index_map is not None:
+        # the elements of the job array are numbered by their position in the map
+        n_positions = count_index_map(args.index_map)
+        positions = pack_job_indices(job_id, args.pack_size, n_positions)
+        job_indices = [read_index_map(args.index_map, p) for p in positions]
+    elif args.pack_size == 1:
+        job_indices = [job_id]
+    else:
+        n_jobs = count_job_params(args.params)
+        job_indices = pack_job_indices(job_id, args.pack_size, n_jobs)
+
+    requeue = None
+    if args.skip_completed or args.requeue_exit_code is not None:
+        first_params = read_job_params(args.params, job_indices[0])
+        # only the records (e.g., the checkpoints) of the jobs of the pack are read
+        records = read_job_records(_ledger_path(first_params, args.stage), job_indices)
+        # a requeued element only runs the jobs of its pack that did not complete
+        job_indices = [
+            i for i in job_indices if records.get(i, {}).get("exit_code") != 0
+        ]
+        if args.requeue_exit_code is not None:
+            from .requeue import SignalForwarder
+
+            forwarder = SignalForwarder(args.requeue_signal)
+            forwarder.install()
+            requeue = {
+                "forwarder": forwarder,
+                "exit_code": args.requeue_exit_code,
+                "max_requeues": args.max_requeues,
+                "records": records,
+            }
+
+    run_fn = partial(
+        _run_indexed_job,
+        args.params,
+        result_cache=args.result_cache,
+        runner_hash=args.runner_hash,
+        entrypoint=args.entrypoint,
+        preload_modules=preload_modules,
+        runner=args.runner,
+        stage=args.stage,
+        early_stopping=early_stopping,
+        stage_data=args.stage_data,
+        requeue=requeue,
+    )
+    if args.pack_workers == 1:
+        exit_codes = [run_fn(i) for i in job_indices]
+    else:
+        from .worker_pool import run_worker_pool
+
+        # each worker is pinned to its own share of the CPUs/GPUs of the allocation
+        exit_codes = run_worker_pool(
+            job_indices, n_workers=args.pack_workers, run_fn=run_fn
+        )
+
+    if args.stage_data:
+        from .data_staging import evict
 
-    job_id = args.job_id
+        # the staged copies that no other job on this node uses are removed
+        evict()
 
-    with open(args.params) as f_params:
-        params = json.load(f_params)
+    if requeue is not None and requeue["exit_code"] in exit_codes:
+        sys.exit(requeue["exit_code"])
 
-    # json number keys are saved as strings
-    job_params = params[str(job_id)]
-    run_command = create_run_command(job_params)
-    os.system(run_command)
+    # the job array element only succeeds if all jobs of the pack succeeded
+    failed = [code for code in exit_codes if code != 0]
+    sys.exit(failed[0] if failed else 0)
@@ -1,20 +1,24 @@
-from typing import Any, Dict
+import contextlib
+import functools
+import importlib
+import os
+import subprocess
+import sys
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Set, Tuple
 
+if TYPE_CHECKING:
+    from .requeue import SignalForwarder
 
-def create_run_command(params: Dict[str, Any]) -> str:
-    """Create the run command that will start the training/prediction.
 
-    Parameters
-    ----------
-    params : Dict[str, Any]
-        The parameters for the job. It must contain "runner", which is
-        the path to the python script to run the job. All other key/values
-        will be passed as arguments to the runner as "--key value"
+def _pop_job_params(params: Dict[str, Any]) -> str:
+    """Pop the job parameters that are not passed on to the runner.
+
+    The output directory of the job replaces "output_base_dir" in params.
 
     Returns
     -------
-    job_command : str
-        The command that will be executed on the command line.
+    runner : str
+        The runner of the job.
     """
     try:
         runner = params.pop("runner")
@@ -48,13 +52,33 @@ def create_run_command(params: Dict[str, Any]) -> str:
     except AssertionError:
         raise TypeError("'job_prefix' should be a string")
 
+    params["output_base_dir"] = f"{output_base_dir}{job_prefix}{job_index}/"
+
+    return runner
+
+
+def create_run_command(params: Dict[str, Any]) -> str:
+    """Create the run command that will start the training/prediction.
+
+    Parameters
+    ----------
+    params : Dict[str, Any]
+        The parameters for the job. It must contain "runner", which is
+        the path to the python script to run the job. All other key/values
+        will be passed as arguments to the runner as "--key value"
+
+    Returns
+    -------
+    job_command : str
+        The command that will be executed on the command line.
+    """
+    runner = _pop_job_params(params)
+
     if ".py" in runner:
         job_command = f"python {runner}"
     else:
         job_command = f"{runner}"
 
-    params["output_base_dir"] = f"{output_base_dir}{job_prefix}{job_index}/"
-
     for k, v in params.items():
         if type(v) == bool:
             if v is True:
@@ -65,3 +89,238 @@ def create_run_command(params: Dict[str, Any]) -> str:
             job_command += f" --{k} {v}"
 
     return job_command
+
+
+def pack_job_indices(pack_index: int, pack_size: int, n_jobs: int) -> range:
+    """Get the indices of the jobs that are run by one element of the job array.
+
+    Parameters
+    ----------
+    pack_index : int
+        The index of the job array element (i.e., $LSB_JOBINDEX, starting at 1).
+    pack_size : int
+        The number of jobs per job array element.
+    n_jobs : int
+        The total number of jobs. The last pack may contain fewer jobs.
+
+    Returns
+    -------
+    job_indices : range
+        The indices of the jobs in the pack (starting at 1).
+    """
+    if pack_index < 1 or pack_size < 1:
+        raise ValueError("pack_index and pack_size must be at least 1")
+
+    first_job = (pack_index - 1) * pack_size + 1
+    last_job = min(pack_index * pack_size, n_jobs)
+    if first_job > last_job:
+        raise ValueError(f"pack {pack_index} does not contain any of the {n_jobs} jobs")
+
+    return range(first_job, last_job + 1)
+
+
+def resource_usage(*usages: Any) -> Dict[str, float]:
+    """Summarize the resource usage of a job.
+
+    Parameters
+    ----------
+    *usages : resource.struct_rusage
+        The resource usages of the processes of the job
+        (e.g., from os.wait4() or resource.getrusage()).
+
+    Returns
+    -------
+    usage : Dict[str, float]
+        "cpu_time", the user and system CPU time of all processes in
+        seconds, and "max_rss_mb", the largest peak resident set size
+        of the processes in MB.
+    """
+    # ru_maxrss is in bytes on macOS and in KB everywhere else
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+
+    return {
+        "cpu_time": round(sum(u.ru_utime + u.ru_stime for u in usages), 3),
+        "max_rss_mb": round(max(u.ru_maxrss for u in usages) * rss_unit / 1024**2, 1),
+    }
+
+
+def _exit_code_of_status(status: int) -> int:
+    # like subprocess, jobs killed by a signal have the negative signal number
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def run_job_with_usage(
+    params: Dict[str, Any],
+    env: Optional[Dict[str, str]] = None,
+    cpus: Optional[Set[int]] = None,
+    forwarder: Optional["SignalForwarder"] = None,
+) -> Tuple[int, Optional[Dict[str, float]]]:
+    """Run a single job, wait for it to finish and measure its resource usage.
+
+    Parameters
+    ----------
+    params : Dict[str, Any]
+        The parameters for the job (see create_run_command()).
+    env : Optional[Dict[str, str]]
+        The environment of the job. If None, the environment of the
+        dispatcher is inherited.
+    cpus : Optional[Set[int]]
+        The CPUs the job is pinned to. If None, the job may use all CPUs
+        of the dispatcher. Ignored on platforms without CPU affinity support.
+    forwarder : Optional[SignalForwarder]
+        If set, the runner is started in its own session, so that it does not
+        receive the signals of the job array element, and the forwarder passes
+        its signal on to the runner (see model_runner.dispatcher.requeue).
+
+    Returns
+    -------
+    exit_code : int
+        The exit code of the runner.
+    usage : Optional[Dict[str, float]]
+        The resource usage of the runner and its child processes (see
+        resource_usage()). None on platforms without os.wait4().
+    """
+    run_command = create_run_command(params)
+    if forwarder is not None:
+        # the shell is replaced by the runner, which then receives the forwarded signal
+        run_command = f"exec {run_command}"
+    preexec_fn = None
+    if cpus is not None and hasattr(os, "sched_setaffinity"):
+        # the child is pinned before it runs the shell, so the affinity is
+        # inherited by the runner and all of its threads and child processes
+        preexec_fn = functools.partial(os.sched_setaffinity, 0, cpus)
+    process = subprocess.Popen(
+        run_command,
+        shell=True,
+        env=env,
+        start_new_session=forwarder is not None,
+        preexec_fn=preexec_fn,
+    )
+
+    with contextlib.nullcontext() if forwarder is None else forwarder.track(process):
+        if not hasattr(os, "wait4"):
+            return process.wait(), None
+
+        # the usage of a waited process includes all of its waited descendants
+        _, status, rusage = os.wait4(process.pid, 0)
+        process.returncode = _exit_code_of_status(status)
+
+    return process.returncode, resource_usage(rusage)
+
+
+def run_job(
+    params: Dict[str, Any],
+    env: Optional[Dict[str, str]] = None,
+    cpus: Optional[Set[int]] = None,
+) -> int:
+    """Run a single job and wait for it to finish.
+
+    Parameters
+    ----------
+    params : Dict[str, Any]
+        The parameters for the job (see create_run_command()).
+    env : Optional[Dict[str, str]]
+        The environment of the job. If None, the environment of the
+        dispatcher is inherited.
+    cpus : Optional[Set[int]]
+        The CPUs the job is pinned to. If None, the job may use all CPUs
+        of the dispatcher. Ignored on platforms without CPU affinity support.
+
+    Returns
+    -------
+    exit_code : int
+        The exit code of the runner.
+    """
+    return run_job_with_usage(params, env=env, cpus=cpus)[0]
+
+
+@functools.lru_cache(maxsize=None)
+def load_entrypoint(entrypoint: str) -> Callable[[Dict[str, Any]], Any]:
+    """Import a python entrypoint runner given as "module:function".
+
+    Like with "python -m", modules in the current working directory can be
+    imported. The module is only imported once per process, so the imports
+    of the runner (e.g., torch) are shared by all jobs the process runs.
+    """
+    module_name, _, function_name = entrypoint.partition(":")
+    if not (module_name and function_name):
+        raise ValueError(
+            f'"{entrypoint}" is not a python entrypoint of the form "module:function"'
+        )
+
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    module = importlib.import_module(module_name)
+
+    return getattr(module, function_name)
+
+
+def run_entrypoint(params: Dict[str, Any]) -> int:
+    """Run a single job by calling its python entrypoint runner in this process.
+
+    Parameters
+    ----------
+    params : Dict[str, Any]
+        The parameters for the job. "runner" must be a python entrypoint
+        of the form "module:function" (see load_entrypoint()). The function
+        is called with a dict of all other parameters, with the same keys
+        and values the runner script would get as arguments.
+
+    Returns
+    -------
+    exit_code : int
+        The return value of the function if it is an int, 0 if it returns
+        anything else and 1 if it raises an exception. If the function
+        calls sys.exit(), the exit code is returned.
+    """
+    runner = _pop_job_params(params)
+    entrypoint = load_entrypoint(runner)
+
+    try:
+        result = entrypoint(params)
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except Exception:
+        import traceback
+
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+    return result if isinstance(result, int) else 0
+
+
+def run_entrypoint_with_usage(
+    params: Dict[str, Any]
+) -> Tuple[int, Optional[Dict[str, float]]]:
+    """Run a single job with run_entrypoint() and measure its resource usage.
+
+    Returns
+    -------
+    exit_code : int
+        The exit code of the job (see run_entrypoint()).
+    usage : Optional[Dict[str, float]]
+        The CPU time used by the dispatcher during the job and the peak
+        resident set size of the dispatcher, which includes the job (see
+        resource_usage()). None on platforms without the resource module.
+    """
+    try:
+        import resource
+    except ImportError:
+        return run_entrypoint(params), None
+
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    exit_code = run_entrypoint(params)
+    usage = resource_usage(resource.getrusage(resource.RUSAGE_SELF))
+    usage["cpu_time"] = round(
+        usage["cpu_time"] - usage_before.ru_utime - usage_before.ru_stime, 3
+    )
+
+    return exit_code, usage
@@ -0,0 +1,92 @@
+"""Checkpointing of jobs before the run time limit and their requeue.
+
+With requeue, LSF sends a warning signal to the job array element shortly
+before its run time limit (bsub -wa/-wt). The dispatcher forwards the
+signal to the runners, which are started in their own session so that
+they only receive it once. A runner then saves a checkpoint, writes its
+path to the file in the environment variable MODEL_RUNNER_CHECKPOINT_FILE
+and exits. The dispatcher records the checkpoint in the ledger and exits
+with the requeue exit code, which makes LSF requeue the element
+(bsub -Q). When the job runs again, the runner is called with the
+additional argument --resume_from {checkpoint}.
+"""
+import contextlib
+import os
+import signal
+import subprocess
+import tempfile
+import threading
+from typing import Any, Dict, Iterator, Optional, Set
+
+# the environment variable with the path to which a runner reports its checkpoint
+CHECKPOINT_FILE_ENV = "MODEL_RUNNER_CHECKPOINT_FILE"
+
+
+class SignalForwarder:
+    """Forwards a signal that the dispatcher receives to the running runners.
+
+    Parameters
+    ----------
+    signal_name : str
+        The name of the signal without the prefix "SIG" (e.g., "USR2").
+    """
+
+    def __init__(self, signal_name: str):
+        self.signum = getattr(signal, f"SIG{signal_name}")
+        self.received = False
+        self._processes: Set[subprocess.Popen] = set()
+        # the signal handler runs on the main thread, possibly while the main
+        # thread holds the lock in track() (e.g., with a single worker)
+        self._lock = threading.RLock()
+
+    def install(self):
+        """Handle the signal in the dispatcher instead of terminating it."""
+        signal.signal(self.signum, self._handle)
+
+    def _handle(self, signum: int, frame: Any):
+        self.received = True
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            with contextlib.suppress(ProcessLookupError):
+                process.send_signal(signum)
+
+    @contextlib.contextmanager
+    def track(self, process: subprocess.Popen) -> Iterator[None]:
+        """Forward the signal to a runner process while it runs."""
+        with self._lock:
+            self._processes.add(process)
+        try:
+            if self.received:
+                # the signal arrived while the runner was started
+                with contextlib.suppress(ProcessLookupError):
+                    process.send_signal(self.signum)
+            yield
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+
+
+@contextlib.contextmanager
+def checkpoint_report(env: Optional[Dict[str, str]]) -> Iterator[Dict[str, Any]]:
+    """Provide a file to which a runner reports the path of its checkpoint.
+
+    Yields a dictionary with "env", the environment of the runner with
+    CHECKPOINT_FILE_ENV, and, once the context exits, "checkpoint", the
+    reported path or None if the runner did not report a checkpoint.
+    """
+    fd, report_path = tempfile.mkstemp(prefix="model_runner_checkpoint_")
+    os.close(fd)
+    report = {
+        "env": {
+            **(os.environ if env is None else env),
+            CHECKPOINT_FILE_ENV: report_path,
+        }
+    }
+    try:
+        yield report
+    finally:
+        with open(report_path, "r") as f_report:
+            checkpoint = f_report.read().strip()
+        os.remove(report_path)
+        report["checkpoint"] = checkpoint or None
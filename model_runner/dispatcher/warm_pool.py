@@ -0,0 +1,181 @@
+"""Warm pool that runs the jobs of a pack in processes forked from a forkserver.
+
+The forkserver is started once per job array element and imports a list of
+modules (e.g., torch) before it forks. Every job is then run in its own
+process, forked from this warm state, so the jobs stay isolated from each
+other but do not pay for importing the modules again. Runner scripts are run
+with runpy as if they were started with "python {runner} --key value ...",
+python entrypoint runners (see dispatcher_utils.run_entrypoint()) are called
+in the forked process.
+"""
+import functools
+import multiprocessing
+import os
+import runpy
+import shlex
+import sys
+import threading
+from multiprocessing import forkserver
+from typing import Any, Dict, Optional, Sequence, Set, Tuple
+
+from .dispatcher_utils import (
+    create_run_command,
+    resource_usage,
+    run_entrypoint,
+    run_job_with_usage,
+)
+
+_forkserver_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _forkserver_context(preload_modules: Sequence[str]):
+    """Start the forkserver that preloads the modules and get its context."""
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__] + list(preload_modules))
+
+    # the forkserver is a new interpreter that does not inherit sys.path, so it is
+    # passed on with PYTHONPATH to be able to preload modules of the working directory
+    search_path = [os.getcwd()] + sys.path
+    saved_python_path = os.environ.get("PYTHONPATH")
+    os.environ["PYTHONPATH"] = os.pathsep.join(search_path)
+    try:
+        forkserver.ensure_running()
+    finally:
+        if saved_python_path is None:
+            del os.environ["PYTHONPATH"]
+        else:
+            os.environ["PYTHONPATH"] = saved_python_path
+
+    return context
+
+
+def _send_usage(usage_conn):
+    """Send the resource usage of the forked process and its children to the dispatcher."""
+    try:
+        import resource
+    except ImportError:
+        usage_conn.send(None)
+        return
+
+    usage_conn.send(
+        resource_usage(
+            resource.getrusage(resource.RUSAGE_SELF),
+            resource.getrusage(resource.RUSAGE_CHILDREN),
+        )
+    )
+
+
+def _run_in_child(
+    params: Dict[str, Any],
+    env: Optional[Dict[str, str]],
+    cpus: Optional[Set[int]],
+    entrypoint: bool,
+    usage_conn=None,
+):
+    if env is not None:
+        os.environ.clear()
+        os.environ.update(env)
+    if cpus is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+    try:
+        if entrypoint:
+            sys.exit(run_entrypoint(params))
+
+        # "python {runner} --key value ..." without the interpreter
+        argv = shlex.split(create_run_command(params))[1:]
+        sys.argv = argv
+        sys.path.insert(0, os.path.dirname(os.path.abspath(argv[0])))
+        runpy.run_path(argv[0], run_name="__main__")
+    finally:
+        if usage_conn is not None:
+            _send_usage(usage_conn)
+
+
+def run_warm_job_with_usage(
+    params: Dict[str, Any],
+    preload_modules: Sequence[str],
+    env: Optional[Dict[str, str]] = None,
+    cpus: Optional[Set[int]] = None,
+    entrypoint: bool = False,
+) -> Tuple[int, Optional[Dict[str, float]]]:
+    """Run a single job in a process forked from the warm forkserver and measure its resource usage.
+
+    Parameters
+    ----------
+    params : Dict[str, Any]
+        The parameters for the job (see create_run_command()).
+    preload_modules : Sequence[str]
+        The modules that are imported by the forkserver. The forkserver is
+        started by the first job and shared by all following jobs of the
+        dispatcher, so all jobs must use the same modules.
+    env : Optional[Dict[str, str]]
+        The environment of the job. If None, the environment of the
+        dispatcher is used.
+    cpus : Optional[Set[int]]
+        The CPUs the job is pinned to. If None, the job may use all CPUs
+        of the dispatcher.
+    entrypoint : bool
+        If True, the runner is a python entrypoint ("module:function").
+        Otherwise, it is a python script. Runners that are not python
+        scripts are run with run_job_with_usage().
+
+    Returns
+    -------
+    exit_code : int
+        The exit code of the job. It is negative if the job was killed
+        by a signal.
+    usage : Optional[Dict[str, float]]
+        The resource usage of the forked process and its children (see
+        dispatcher_utils.resource_usage()). None if the process was killed
+        before it could report it.
+    """
+    if not (entrypoint or ".py" in params["runner"]):
+        return run_job_with_usage(params, env=env, cpus=cpus)
+
+    with _forkserver_lock:
+        context = _forkserver_context(tuple(preload_modules))
+    # the forked process gets the environment of the forkserver otherwise
+    if env is None:
+        env = dict(os.environ)
+    # the forked process is a child of the forkserver, so it reports its own usage
+    usage_receiver, usage_sender = context.Pipe(duplex=False)
+    process = context.Process(
+        target=_run_in_child, args=(params, env, cpus, entrypoint, usage_sender)
+    )
+    process.start()
+    usage_sender.close()
+    process.join()
+
+    usage = None
+    if usage_receiver.poll():
+        try:
+            usage = usage_receiver.recv()
+        except EOFError:
+            pass
+    usage_receiver.close()
+
+    return process.exitcode, usage
+
+
+def run_warm_job(
+    params: Dict[str, Any],
+    preload_modules: Sequence[str],
+    env: Optional[Dict[str, str]] = None,
+    cpus: Optional[Set[int]] = None,
+    entrypoint: bool = False,
+) -> int:
+    """Run a single job in a process forked from the warm forkserver.
+
+    See run_warm_job_with_usage() for the parameters.
+
+    Returns
+    -------
+    exit_code : int
+        The exit code of the job. It is negative if the job was killed
+        by a signal.
+    """
+    return run_warm_job_with_usage(
+        params, preload_modules, env=env, cpus=cpus, entrypoint=entrypoint
+    )[0]
@@ -0,0 +1,110 @@
+"""Pool of workers that run the jobs of a pack inside one allocation.
+
+Each worker owns a slot with its own subset of the CPUs and GPUs of the
+allocation, so that concurrently running jobs do not compete for the same
+devices. Workers pull the next job as soon as their previous job finished,
+which keeps every slot busy until the pack is drained.
+"""
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set
+
+
+class WorkerSlot(NamedTuple):
+    """The devices a worker is pinned to. None means no pinning."""
+
+    cpus: Optional[Set[int]] = None
+    gpus: Optional[List[str]] = None
+
+    def env(self) -> Optional[Dict[str, str]]:
+        """Get the environment for a job run in this slot."""
+        if self.gpus is None:
+            return None
+        env = dict(os.environ)
+        env["CUDA_VISIBLE_DEVICES"] = ",".join(self.gpus)
+        return env
+
+
+def split_devices(devices: Sequence, n_workers: int) -> Optional[List[list]]:
+    """Split the devices into n_workers contiguous, nearly equal subsets.
+
+    Returns None if there are fewer devices than workers, in which case the
+    devices are shared by all workers.
+    """
+    if len(devices) < n_workers:
+        return None
+
+    n_per_worker, n_remaining = divmod(len(devices), n_workers)
+    subsets = []
+    start = 0
+    for i in range(n_workers):
+        stop = start + n_per_worker + (1 if i < n_remaining else 0)
+        subsets.append(list(devices[start:stop]))
+        start = stop
+
+    return subsets
+
+
+def _available_cpus() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    # affinity is not supported (e.g., macOS), jobs share all CPUs
+    return []
+
+
+def _available_gpus() -> List[str]:
+    # LSF sets CUDA_VISIBLE_DEVICES to the GPUs of the allocation
+    visible_devices = os.environ.get("CUDA_VISIBLE_DEVICES", "")
+    return [device for device in visible_devices.split(",") if device.strip()]
+
+
+def create_worker_slots(n_workers: int) -> List[WorkerSlot]:
+    """Partition the CPUs and GPUs of the allocation into n_workers slots."""
+    cpu_subsets = split_devices(_available_cpus(), n_workers)
+    gpu_subsets = split_devices(_available_gpus(), n_workers)
+
+    return [
+        WorkerSlot(
+            cpus=None if cpu_subsets is None else set(cpu_subsets[i]),
+            gpus=None if gpu_subsets is None else gpu_subsets[i],
+        )
+        for i in range(n_workers)
+    ]
+
+
+def run_worker_pool(
+    job_indices: Iterable[int],
+    n_workers: int,
+    run_fn: Callable[[int, WorkerSlot], int],
+) -> List[int]:
+    """Run the jobs concurrently, each one pinned to a free worker slot.
+
+    Parameters
+    ----------
+    job_indices : Iterable[int]
+        The indices of the jobs to run.
+    n_workers : int
+        The number of jobs to run concurrently.
+    run_fn : Callable[[int, WorkerSlot], int]
+        Function that runs the job with the given index in the given slot
+        and returns its exit code.
+
+    Returns
+    -------
+    exit_codes : List[int]
+        The exit code of each job, in the order of job_indices.
+    """
+    free_slots = queue.Queue()
+    for slot in create_worker_slots(n_workers):
+        free_slots.put(slot)
+
+    def _run_in_free_slot(job_index: int) -> int:
+        slot = free_slots.get()
+        try:
+            return run_fn(job_index, slot)
+        finally:
+            free_slots.put(slot)
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        return list(executor.map(_run_in_free_slot, job_indices))
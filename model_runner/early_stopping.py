@@ -0,0 +1,68 @@
+"""Early stopping of a sweep once a job reached a target metric.
+
+After each successful job, the dispatcher reads the metric from the
+metrics file of the job (see model_runner.metrics). The first job that
+reaches the target creates the stop file
+``{output_base_dir}{job_prefix}_stop.json``, which marks the sweep as done:
+the dispatchers skip all jobs that have not started yet and model_runner
+kills the job arrays when it monitors them.
+"""
+import json
+import os
+from typing import Any, Dict, Optional, Union
+
+
+def stop_path(output_base_dir: str, job_prefix: str) -> str:
+    """Get the path to the stop file of a job array."""
+    return os.path.join(output_base_dir, f"{job_prefix}_stop.json")
+
+
+def is_stopped(path: Union[str, os.PathLike]) -> bool:
+    """Check if a sweep was stopped early."""
+    return os.path.exists(path)
+
+
+def read_stop(path: Union[str, os.PathLike]) -> Optional[Dict[str, Any]]:
+    """Read the record of the job that stopped a sweep or None if it was not stopped."""
+    try:
+        with open(path, "r") as f_stop:
+            return json.load(f_stop)
+    except (OSError, ValueError):
+        return None
+
+
+def clear_stop(path: Union[str, os.PathLike]):
+    """Remove the stop file so that a new sweep is not stopped."""
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def target_reached(value: float, threshold: float, mode: str = "min") -> bool:
+    """Check if a metric value reached the threshold.
+
+    In mode "min", lower values are better and the target is reached at or
+    below the threshold, in mode "max" at or above it.
+    """
+    return value <= threshold if mode == "min" else value >= threshold
+
+
+def request_stop(path: Union[str, os.PathLike], record: Dict[str, Any]) -> bool:
+    """Stop a sweep by creating its stop file.
+
+    The file is created exclusively, so only the first of several jobs that
+    reach the target at the same time writes its record.
+
+    Returns
+    -------
+    created : bool
+        True if this call stopped the sweep, False if it was already stopped.
+    """
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        return False
+
+    with os.fdopen(fd, "w") as f_stop:
+        json.dump(record, f_stop)
+
+    return True
@@ -0,0 +1,155 @@
+"""Append-only completion ledger of the jobs of a job array.
+
+The dispatcher appends one JSON line per finished job to
+``{output_base_dir}{job_prefix}_ledger.jsonl``. Each record is written with
+a single append, so concurrently running jobs can share the ledger. When a
+job is run more than once, its most recent record is the valid one.
+
+The most recent record of each job is also kept in its own file in
+``{output_base_dir}{job_prefix}_ledger_jobs/``, so that a job array element
+can look up the jobs of its pack without reading the whole ledger.
+"""
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Set, Union
+
+
+def ledger_path(output_base_dir: str, job_prefix: str) -> str:
+    """Get the path to the ledger of a job array."""
+    return os.path.join(output_base_dir, f"{job_prefix}_ledger.jsonl")
+
+
+def _job_records_dir(path: Union[str, os.PathLike]) -> str:
+    """Get the directory with the most recent record of each job of a ledger."""
+    return f"{os.path.splitext(os.fspath(path))[0]}_jobs"
+
+
+def rotate_ledger(path: Union[str, os.PathLike]):
+    """Move an existing ledger aside so that a new sweep starts with an empty ledger."""
+    suffix = int(time.time())
+    if os.path.isfile(path):
+        os.replace(path, f"{os.fspath(path)}.{suffix}")
+    records_dir = _job_records_dir(path)
+    if os.path.isdir(records_dir):
+        os.replace(records_dir, f"{records_dir}.{suffix}")
+
+
+def _hostname() -> str:
+    # os.uname() avoids importing socket on every job array element
+    if hasattr(os, "uname"):
+        return os.uname().nodename
+    import socket
+
+    return socket.gethostname()
+
+
+def append_ledger_record(
+    path: Union[str, os.PathLike],
+    job_index: int,
+    exit_code: int,
+    duration: float,
+    **extra: Any,
+):
+    """Append the completion record of a job to the ledger.
+
+    Parameters
+    ----------
+    path : os.PathLike
+        The path to the ledger.
+    job_index : int
+        The index of the finished job.
+    exit_code : int
+        The exit code of the runner.
+    duration : float
+        The wall time of the job in seconds.
+    **extra : Any
+        Additional JSON serializable fields to store in the record.
+    """
+    record = {
+        "job_index": job_index,
+        "exit_code": exit_code,
+        "duration": round(duration, 3),
+        "finished_at": time.time(),
+        "host": _hostname(),
+    }
+    record.update(extra)
+    line = (json.dumps(record) + "\n").encode("utf-8")
+
+    # a single write on a file opened with O_APPEND does not interleave
+    # with the records of other jobs
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+    # the job record is replaced atomically, so it is never read half-written
+    records_dir = _job_records_dir(path)
+    os.makedirs(records_dir, exist_ok=True)
+    record_path = os.path.join(records_dir, f"{job_index}.json")
+    tmp_path = f"{record_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f_record:
+        f_record.write(line)
+    os.replace(tmp_path, record_path)
+
+
+def read_ledger(path: Union[str, os.PathLike]) -> Dict[int, Dict[str, Any]]:
+    """Read the most recent record of each job from the ledger.
+
+    Returns an empty dictionary if the ledger does not exist. Incomplete
+    lines (e.g., from a job that was killed while writing) are skipped.
+    """
+    records = {}
+    if not os.path.isfile(path):
+        return records
+
+    with open(path, "r") as f_ledger:
+        for line in f_ledger:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record["job_index"]] = record
+
+    return records
+
+
+def read_job_records(
+    path: Union[str, os.PathLike], job_indices: Iterable[int]
+) -> Dict[int, Dict[str, Any]]:
+    """Read the most recent record of some jobs of the ledger.
+
+    Only the records of the jobs are read, not the whole ledger. Jobs
+    without a record are left out. Ledgers written without the records of
+    the jobs are read in full.
+    """
+    records_dir = _job_records_dir(path)
+    if not os.path.isdir(records_dir):
+        records = read_ledger(path)
+        return {i: records[i] for i in job_indices if i in records}
+
+    records = {}
+    for job_index in job_indices:
+        try:
+            with open(os.path.join(records_dir, f"{job_index}.json"), "r") as f_record:
+                records[job_index] = json.load(f_record)
+        except FileNotFoundError:
+            continue
+
+    return records
+
+
+def completed_job_indices(path: Union[str, os.PathLike]) -> Set[int]:
+    """Get the indices of the jobs whose most recent run succeeded."""
+    return {
+        job_index
+        for job_index, record in read_ledger(path).items()
+        if record["exit_code"] == 0
+    }
+
+
+def pending_job_indices(path: Union[str, os.PathLike], n_jobs: int) -> List[int]:
+    """Get the indices of the jobs that are missing from the ledger or failed."""
+    completed = completed_job_indices(path)
+    return [i for i in range(1, n_jobs + 1) if i not in completed]
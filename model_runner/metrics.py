@@ -0,0 +1,70 @@
+"""Reading the metrics that a runner writes to its output directory.
+
+Runners report metrics (e.g., the validation loss) by writing a JSON file
+with a flat object of metric names and values into the output directory
+of their job. Metrics files with the extension .csv are read as tables
+with a header row of metric names, of which the last row holds the final
+metrics (e.g., a log with one row per epoch).
+"""
+import csv
+import json
+import os
+from typing import Any, Dict, Optional
+
+DEFAULT_METRICS_FILE = "metrics.json"
+
+
+def _parse_csv_value(value: Optional[str]) -> Any:
+    if value is None or value == "":
+        return None
+    for parse in (int, float):
+        try:
+            return parse(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _read_csv_metrics(path: str) -> Optional[Dict[str, Any]]:
+    last_row = None
+    with open(path, "r", newline="") as f_metrics:
+        for row in csv.DictReader(f_metrics):
+            last_row = row
+    if last_row is None:
+        return None
+
+    return {name: _parse_csv_value(value) for name, value in last_row.items()}
+
+
+def read_metrics(
+    output_dir: str, metrics_file: str = DEFAULT_METRICS_FILE
+) -> Optional[Dict[str, Any]]:
+    """Read the metrics file of a job.
+
+    Returns None if the file does not exist or cannot be parsed (e.g.,
+    because the job failed or is still running).
+    """
+    path = os.path.join(output_dir, metrics_file)
+    try:
+        if metrics_file.endswith(".csv"):
+            return _read_csv_metrics(path)
+        with open(path, "r") as f_metrics:
+            metrics = json.load(f_metrics)
+    except (OSError, ValueError, csv.Error):
+        return None
+
+    return metrics if isinstance(metrics, dict) else None
+
+
+def read_metric(
+    output_dir: str, metric: str, metrics_file: str = DEFAULT_METRICS_FILE
+) -> Optional[float]:
+    """Read a single numeric metric of a job or None if it is not available."""
+    metrics = read_metrics(output_dir, metrics_file)
+    if metrics is None:
+        return None
+
+    try:
+        return float(metrics[metric])
+    except (KeyError, TypeError, ValueError):
+        return None
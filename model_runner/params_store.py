@@ -0,0 +1,550 @@
+"""Random-access on-disk stores for the runner parameters.
+
+Three formats are supported:
+
+- indexed: a JSON lines file with one runner parameter record per line
+  (record ``k`` is on line ``k``) and a sidecar index file holding the byte
+  offset of every record as a fixed-width unsigned 64 bit integer.
+- grid: a small JSON file (extension .grid.json) holding only the values of
+  each parameter axis and the parameters shared by all jobs. The
+  parameters of job ``k`` are computed by unravelling ``k - 1`` into one
+  index per axis, in the same order as itertools.product. If only a
+  subset of the grid is run, the flat grid index of each job is stored in
+  a sidecar file of fixed-width unsigned 64 bit integers.
+- compact: a file of blocks of records (extension .compact) in which the
+  parameters shared by all jobs are only stored once and every value is
+  interned into a table per parameter, so that a record is a JSON array
+  of small integer references. The blocks are optionally compressed with
+  gzip or zstd (requires zstandard). The tables follow the blocks and the
+  sidecar index file holds the byte offset of every block and of the
+  tables.
+
+Reading the parameters of a single job therefore costs a constant amount
+of I/O, independent of the size of the job array. Job arrays that only run
+a subset of the jobs with their own element numbering map their positions
+to job indices with an index map, which uses the same fixed-width format.
+"""
+import json
+import os
+import struct
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+INDEX_SUFFIX = ".idx"
+GRID_SPEC_SUFFIX = ".grid.json"
+COMPACT_SUFFIX = ".compact"
+COMPRESSIONS = ("gzip", "zstd")
+
+# fixed-width little endian unsigned 64 bit offsets
+_OFFSET_FORMAT = "<Q"
+_OFFSET_SIZE = struct.calcsize(_OFFSET_FORMAT)
+
+
+def index_path(store_path: Union[str, os.PathLike]) -> str:
+    """Get the path to the sidecar index file of a parameter store."""
+    return os.fspath(store_path) + INDEX_SUFFIX
+
+
+def write_indexed_params(
+    records: Iterable[Dict[str, Any]], store_path: Union[str, os.PathLike]
+) -> int:
+    """Write runner parameter records to an indexed JSON lines store.
+
+    Parameters
+    ----------
+    records : Iterable[Dict[str, Any]]
+        The runner parameters of each job, ordered by job index (i.e.,
+        the first record belongs to job 1).
+    store_path : os.PathLike
+        The path to save the store to. Should have the extension .jsonl.
+        The index is saved next to it with the additional extension .idx.
+
+    Returns
+    -------
+    n_records : int
+        The number of records written to the store.
+    """
+    n_records = 0
+    with open(store_path, "wb") as f_store, open(index_path(store_path), "wb") as f_idx:
+        for record in records:
+            f_idx.write(struct.pack(_OFFSET_FORMAT, f_store.tell()))
+            f_store.write(json.dumps(record).encode("utf-8") + b"\n")
+            n_records += 1
+
+    return n_records
+
+
+def count_indexed_params(store_path: Union[str, os.PathLike]) -> int:
+    """Get the number of records in an indexed store without reading it."""
+    return os.path.getsize(index_path(store_path)) // _OFFSET_SIZE
+
+
+def read_indexed_param(
+    store_path: Union[str, os.PathLike], job_index: int
+) -> Dict[str, Any]:
+    """Read the runner parameters of a single job from an indexed store.
+
+    Parameters
+    ----------
+    store_path : os.PathLike
+        The path to the store written by write_indexed_params().
+    job_index : int
+        The index of the job to read (starting at 1).
+
+    Returns
+    -------
+    params : Dict[str, Any]
+        The runner parameters of the job.
+    """
+    if job_index < 1:
+        raise KeyError(f"job {job_index} is not in {store_path}")
+
+    with open(index_path(store_path), "rb") as f_idx:
+        f_idx.seek((job_index - 1) * _OFFSET_SIZE)
+        offset_bytes = f_idx.read(_OFFSET_SIZE)
+    if len(offset_bytes) != _OFFSET_SIZE:
+        raise KeyError(f"job {job_index} is not in {store_path}")
+    (offset,) = struct.unpack(_OFFSET_FORMAT, offset_bytes)
+
+    with open(store_path, "rb") as f_store:
+        f_store.seek(offset)
+        line = f_store.readline()
+
+    return json.loads(line)
+
+
+def is_grid_spec(store_path: Union[str, os.PathLike]) -> bool:
+    """Check if a parameter store is a grid spec (see write_grid_spec())."""
+    return os.fspath(store_path).endswith(GRID_SPEC_SUFFIX)
+
+
+def write_grid_spec(
+    job_params: Dict[str, List[Any]],
+    constants: Dict[str, Any],
+    store_path: Union[str, os.PathLike],
+    flat_indices: Optional[Iterable[int]] = None,
+) -> int:
+    """Write the parameter grid as a grid spec.
+
+    Parameters
+    ----------
+    job_params : Dict[str, List[Any]]
+        The values of each parameter axis of the grid.
+    constants : Dict[str, Any]
+        The parameters that are shared by all jobs
+        (e.g., "job_prefix", "runner" and "output_base_dir").
+    store_path : os.PathLike
+        The path to save the grid spec to. Should have the
+        extension .grid.json.
+    flat_indices : Optional[Iterable[int]]
+        The flat (0-based) grid indices of the combinations to run, in the
+        order of the jobs. They are saved next to the grid spec with the
+        additional extension .idx. If None, all combinations of the grid
+        are run.
+
+    Returns
+    -------
+    n_records : int
+        The number of jobs.
+    """
+    grid_spec = {
+        "param_names": list(job_params.keys()),
+        "param_values": list(job_params.values()),
+        "constants": constants,
+    }
+    if flat_indices is not None:
+        grid_spec["n_selected"] = _write_uint64s(index_path(store_path), flat_indices)
+
+    with open(store_path, "w") as f_out:
+        json.dump(grid_spec, f_out, indent=4)
+
+    return _grid_spec_size(grid_spec)
+
+
+def _write_uint64s(path: Union[str, os.PathLike], values: Iterable[int]) -> int:
+    n_values = 0
+    with open(path, "wb") as f_out:
+        for value in values:
+            f_out.write(struct.pack(_OFFSET_FORMAT, value))
+            n_values += 1
+
+    return n_values
+
+
+def _read_uint64(path: Union[str, os.PathLike], position: int) -> Optional[int]:
+    with open(path, "rb") as f_in:
+        f_in.seek(position * _OFFSET_SIZE)
+        value_bytes = f_in.read(_OFFSET_SIZE)
+    if len(value_bytes) != _OFFSET_SIZE:
+        return None
+
+    return struct.unpack(_OFFSET_FORMAT, value_bytes)[0]
+
+
+def _iter_uint64s(path: Union[str, os.PathLike]) -> Iterator[int]:
+    with open(path, "rb") as f_in:
+        for chunk in iter(lambda: f_in.read(_OFFSET_SIZE * 4096), b""):
+            yield from (value for (value,) in struct.iter_unpack(_OFFSET_FORMAT, chunk))
+
+
+def _load_grid_spec(store_path: Union[str, os.PathLike]) -> Dict[str, Any]:
+    with open(store_path, "r") as f_spec:
+        return json.load(f_spec)
+
+
+def _grid_size(param_values: List[List[Any]]) -> int:
+    n_records = 1
+    for values in param_values:
+        n_records *= len(values)
+    return n_records
+
+
+def _grid_spec_size(grid_spec: Dict[str, Any]) -> int:
+    if "n_selected" in grid_spec:
+        return grid_spec["n_selected"]
+    return _grid_size(grid_spec["param_values"])
+
+
+def unravel_grid_index(flat_index: int, axis_sizes: List[int]) -> Tuple[int, ...]:
+    """Convert a flat (0-based) grid index into one index per axis.
+
+    The last axis varies fastest, which matches the order of
+    itertools.product.
+    """
+    axis_indices = []
+    for size in reversed(axis_sizes):
+        flat_index, axis_index = divmod(flat_index, size)
+        axis_indices.append(axis_index)
+    if flat_index != 0:
+        raise IndexError("flat_index is out of bounds for the grid")
+
+    return tuple(reversed(axis_indices))
+
+
+def ravel_grid_index(axis_indices: Sequence[int], axis_sizes: List[int]) -> int:
+    """Convert one index per axis into a flat (0-based) grid index.
+
+    This is the inverse of unravel_grid_index().
+    """
+    flat_index = 0
+    for axis_index, size in zip(axis_indices, axis_sizes):
+        if not (0 <= axis_index < size):
+            raise IndexError("axis_indices are out of bounds for the grid")
+        flat_index = flat_index * size + axis_index
+
+    return flat_index
+
+
+def _grid_record(
+    grid_spec: Dict[str, Any], flat_index: int, job_index: int
+) -> Dict[str, Any]:
+    param_values = grid_spec["param_values"]
+    axis_indices = unravel_grid_index(
+        flat_index, [len(values) for values in param_values]
+    )
+    params = {
+        name: values[i]
+        for name, values, i in zip(grid_spec["param_names"], param_values, axis_indices)
+    }
+    params.update(grid_spec["constants"])
+    params["job_index"] = job_index
+
+    return params
+
+
+def read_grid_param(
+    store_path: Union[str, os.PathLike], job_index: int
+) -> Dict[str, Any]:
+    """Compute the runner parameters of a single job from a grid spec.
+
+    Parameters
+    ----------
+    store_path : os.PathLike
+        The path to the grid spec written by write_grid_spec().
+    job_index : int
+        The index of the job (starting at 1).
+
+    Returns
+    -------
+    params : Dict[str, Any]
+        The runner parameters of the job.
+    """
+    grid_spec = _load_grid_spec(store_path)
+    if not (1 <= job_index <= _grid_spec_size(grid_spec)):
+        raise KeyError(f"job {job_index} is not in {store_path}")
+
+    if "n_selected" in grid_spec:
+        flat_index = _read_uint64(index_path(store_path), job_index - 1)
+    else:
+        flat_index = job_index - 1
+
+    return _grid_record(grid_spec, flat_index, job_index)
+
+
+def is_compact_store(store_path: Union[str, os.PathLike]) -> bool:
+    """Check if a parameter store is a compact store (see write_compact_params())."""
+    return os.fspath(store_path).endswith(COMPACT_SUFFIX)
+
+
+def _compress(data: bytes, compression: Optional[str]) -> bytes:
+    if compression == "gzip":
+        import zlib
+
+        # a raw deflate stream inside a gzip container
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    elif compression == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+def _decompress(data: bytes, compression: Optional[str]) -> bytes:
+    if compression == "gzip":
+        import zlib
+
+        return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+    elif compression == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def write_compact_params(
+    records: Iterable[Dict[str, Any]],
+    constants: Dict[str, Any],
+    store_path: Union[str, os.PathLike],
+    compression: Optional[str] = None,
+    block_size: int = 256,
+) -> int:
+    """Write runner parameter records to a compact store.
+
+    Parameters
+    ----------
+    records : Iterable[Dict[str, Any]]
+        The runner parameters of each job, ordered by job index (i.e.,
+        the first record belongs to job 1). The constants and "job_index"
+        are not stored with the records.
+    constants : Dict[str, Any]
+        The parameters that are shared by all jobs
+        (e.g., "job_prefix", "runner" and "output_base_dir").
+    store_path : os.PathLike
+        The path to save the store to. Should have the extension .compact.
+        The index is saved next to it with the additional extension .idx.
+    compression : Optional[str]
+        The compression of the blocks of records, None, "gzip" or "zstd".
+    block_size : int
+        The number of records per block. Larger blocks compress better,
+        but every job has to read and decompress its whole block.
+
+    Returns
+    -------
+    n_records : int
+        The number of records written to the store.
+    """
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f'"{compression}" is not a supported compression')
+
+    names = {}
+    tables = {}
+    n_records = 0
+    with open(store_path, "wb") as f_store, open(index_path(store_path), "wb") as f_idx:
+        block = []
+
+        def _write_block():
+            f_idx.write(struct.pack(_OFFSET_FORMAT, f_store.tell()))
+            f_store.write(_compress(b"".join(block), compression))
+            block.clear()
+
+        for record in records:
+            refs = []
+            for name, value in record.items():
+                if name in constants or name == "job_index":
+                    continue
+                column = names.setdefault(name, len(names))
+                # JSON encoded values are hashable and keep their type
+                table = tables.setdefault(name, {})
+                refs.append((column, table.setdefault(json.dumps(value), len(table))))
+            block.append(json.dumps(refs, separators=(",", ":")).encode() + b"\n")
+            n_records += 1
+            if len(block) == block_size:
+                _write_block()
+        if len(block) > 0:
+            _write_block()
+
+        header = {
+            "n_records": n_records,
+            "block_size": block_size,
+            "compression": compression,
+            "constants": constants,
+            "names": list(names),
+            "values": [[json.loads(v) for v in tables[name]] for name in names],
+        }
+        f_idx.write(struct.pack(_OFFSET_FORMAT, f_store.tell()))
+        f_store.write(json.dumps(header).encode("utf-8"))
+
+    return n_records
+
+
+def _load_compact_header(store_path: Union[str, os.PathLike]) -> Dict[str, Any]:
+    # the last entry of the index is the offset of the header
+    with open(index_path(store_path), "rb") as f_idx:
+        f_idx.seek(-_OFFSET_SIZE, os.SEEK_END)
+        (offset,) = struct.unpack(_OFFSET_FORMAT, f_idx.read(_OFFSET_SIZE))
+    with open(store_path, "rb") as f_store:
+        f_store.seek(offset)
+        return json.loads(f_store.read())
+
+
+def _compact_record(
+    header: Dict[str, Any], line: bytes, job_index: int
+) -> Dict[str, Any]:
+    names = header["names"]
+    values = header["values"]
+    params = {names[column]: values[column][ref] for column, ref in json.loads(line)}
+    params.update(header["constants"])
+    params["job_index"] = job_index
+
+    return params
+
+
+def _read_compact_block(
+    store_path: Union[str, os.PathLike],
+    header: Dict[str, Any],
+    block_index: int,
+) -> List[bytes]:
+    with open(index_path(store_path), "rb") as f_idx:
+        f_idx.seek(block_index * _OFFSET_SIZE)
+        start, stop = struct.unpack("<QQ", f_idx.read(2 * _OFFSET_SIZE))
+    with open(store_path, "rb") as f_store:
+        f_store.seek(start)
+        block = f_store.read(stop - start)
+
+    return _decompress(block, header["compression"]).splitlines()
+
+
+def read_compact_param(
+    store_path: Union[str, os.PathLike], job_index: int
+) -> Dict[str, Any]:
+    """Read the runner parameters of a single job from a compact store.
+
+    Only the block of the job is read and decompressed.
+
+    Parameters
+    ----------
+    store_path : os.PathLike
+        The path to the store written by write_compact_params().
+    job_index : int
+        The index of the job to read (starting at 1).
+
+    Returns
+    -------
+    params : Dict[str, Any]
+        The runner parameters of the job.
+    """
+    header = _load_compact_header(store_path)
+    if not (1 <= job_index <= header["n_records"]):
+        raise KeyError(f"job {job_index} is not in {store_path}")
+
+    block_index, position = divmod(job_index - 1, header["block_size"])
+    block = _read_compact_block(store_path, header, block_index)
+
+    return _compact_record(header, block[position], job_index)
+
+
+def write_index_map(
+    map_path: Union[str, os.PathLike], job_indices: Iterable[int]
+) -> int:
+    """Write the job indices that are run by a job array whose elements are renumbered.
+
+    Parameters
+    ----------
+    map_path : os.PathLike
+        The path to save the index map to (e.g., with the extension .idx).
+    job_indices : Iterable[int]
+        The indices of the jobs (starting at 1), in the order in which they
+        are assigned to the positions of the map.
+
+    Returns
+    -------
+    n_jobs : int
+        The number of jobs in the map.
+    """
+    return _write_uint64s(map_path, job_indices)
+
+
+def count_index_map(map_path: Union[str, os.PathLike]) -> int:
+    """Get the number of jobs in an index map without reading it."""
+    return os.path.getsize(map_path) // _OFFSET_SIZE
+
+
+def read_index_map(map_path: Union[str, os.PathLike], position: int) -> int:
+    """Read the job index at a position (starting at 1) of an index map."""
+    job_index = None if position < 1 else _read_uint64(map_path, position - 1)
+    if job_index is None:
+        raise KeyError(f"position {position} is not in {map_path}")
+
+    return job_index
+
+
+def count_job_params(store_path: Union[str, os.PathLike]) -> int:
+    """Get the number of jobs in a parameter store of any format."""
+    if is_grid_spec(store_path):
+        return _grid_spec_size(_load_grid_spec(store_path))
+    elif is_compact_store(store_path):
+        return _load_compact_header(store_path)["n_records"]
+    return count_indexed_params(store_path)
+
+
+def read_job_params(
+    store_path: Union[str, os.PathLike], job_index: int
+) -> Dict[str, Any]:
+    """Read the runner parameters of a single job from a store of any format.
+
+    Parameters
+    ----------
+    store_path : os.PathLike
+        The path to the parameter store. Grid specs are recognized by
+        the extension .grid.json and compact stores by the extension
+        .compact, all other files are read as indexed stores.
+    job_index : int
+        The index of the job (starting at 1).
+
+    Returns
+    -------
+    params : Dict[str, Any]
+        The runner parameters of the job.
+    """
+    if is_grid_spec(store_path):
+        return read_grid_param(store_path, job_index)
+    elif is_compact_store(store_path):
+        return read_compact_param(store_path, job_index)
+    return read_indexed_param(store_path, job_index)
+
+
+def iter_job_params(store_path: Union[str, os.PathLike]) -> Iterator[Dict[str, Any]]:
+    """Lazily read the runner parameters of all jobs in a store of any format.
+
+    The jobs are read sequentially in the order of their job index.
+    """
+    if is_grid_spec(store_path):
+        grid_spec = _load_grid_spec(store_path)
+        if "n_selected" in grid_spec:
+            flat_indices = _iter_uint64s(index_path(store_path))
+        else:
+            flat_indices = range(_grid_size(grid_spec["param_values"]))
+        for job_index, flat_index in enumerate(flat_indices, start=1):
+            yield _grid_record(grid_spec, flat_index, job_index)
+    elif is_compact_store(store_path):
+        header = _load_compact_header(store_path)
+        n_blocks = -(-header["n_records"] // header["block_size"])
+        job_index = 1
+        for block_index in range(n_blocks):
+            for line in _read_compact_block(store_path, header, block_index):
+                yield _compact_record(header, line, job_index)
+                job_index += 1
+    else:
+        with open(store_path, "rb") as f_store:
+            for line in f_store:
+                yield json.loads(line)
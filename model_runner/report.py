@@ -0,0 +1,203 @@
+"""Resource usage report of a sweep.
+
+The dispatcher records the wall time, CPU time and peak resident set size
+of every job in the ledger (see model_runner.ledger). The report summarizes
+them with percentiles, overall and for each value of every parameter axis,
+and suggests the resource requests of the job array for the next sweep.
+The rounds of a successive halving search are job arrays with ledgers of
+their own, the report covers all submitted rounds.
+"""
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+from .ledger import ledger_path, read_ledger
+from .params_store import iter_job_params
+from .successive_halving import submitted_rounds
+from .utils import _runner_params_path
+from .validator import ConfigModel
+
+# the recorded metrics of each job and their units
+REPORT_METRICS = {
+    "duration": "s",
+    "cpu_time": "s",
+    "cpu_cores": "cores",
+    "max_rss_mb": "MB",
+}
+
+_PERCENTILES = (50, 90, 100)
+
+
+def percentile(values: Iterable[float], q: float) -> Optional[float]:
+    """Compute the q-th percentile of values with linear interpolation (None if empty)."""
+    values = sorted(values)
+    if len(values) == 0:
+        return None
+
+    position = (len(values) - 1) * q / 100
+    lower, upper = math.floor(position), math.ceil(position)
+
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def _summarize(records: List[Dict[str, Any]]) -> Dict[str, Dict[int, Optional[float]]]:
+    """Compute the percentiles of each metric over the records."""
+    return {
+        metric: {
+            q: percentile([r[metric] for r in records if metric in r], q)
+            for q in _PERCENTILES
+        }
+        for metric in REPORT_METRICS
+    }
+
+
+def _suggest_resources(
+    array_config: ConfigModel,
+    summary: Dict[str, Dict[int, Optional[float]]],
+    margin: float,
+) -> Dict[str, int]:
+    """Suggest the resource requests of a job array element from the usage of its jobs."""
+    job_parameters = array_config.job_parameters
+    # the workers of an element run their share of the pack one after the other
+    jobs_per_worker = math.ceil(job_parameters.pack_size / job_parameters.pack_workers)
+
+    suggestion = {}
+    max_duration = summary["duration"][100]
+    if max_duration is not None:
+        suggestion["run_time"] = max(
+            1, math.ceil(max_duration * jobs_per_worker * margin / 60)
+        )
+
+    cpu_cores = summary["cpu_cores"][90]
+    processor_cores = job_parameters.processor_cores
+    if cpu_cores is not None:
+        processor_cores = max(
+            job_parameters.pack_workers,
+            math.ceil(cpu_cores * job_parameters.pack_workers),
+        )
+        suggestion["processor_cores"] = processor_cores
+
+    # memory is requested per processor core
+    max_rss_mb = summary["max_rss_mb"][100]
+    if max_rss_mb is not None:
+        suggestion["memory"] = math.ceil(
+            max_rss_mb * job_parameters.pack_workers * margin / processor_cores
+        )
+
+    return suggestion
+
+
+def build_report(array_config: ConfigModel, margin: float = 1.2) -> Dict[str, Any]:
+    """Summarize the resource usage of the jobs of a sweep.
+
+    Parameters
+    ----------
+    array_config : ConfigModel
+        The parameters for the job array.
+    margin : float
+        The factor by which the suggested run time and memory exceed the
+        largest measured usage.
+
+    Returns
+    -------
+    report : Dict[str, Any]
+        "n_jobs", "n_measured" (jobs with a recorded resource usage),
+        "n_failed" and "n_killed" (failed jobs that were killed by a signal,
+        e.g., for exceeding the memory limit), "overall" (the 50th, 90th and
+        100th percentile of each metric of REPORT_METRICS), "axes" (the
+        percentiles for each value of every parameter axis with more than
+        one value and, for a successive halving search, of the budget
+        parameter), "current" (the current resource requests) and
+        "suggestion" (the suggested resource requests).
+    """
+    axes = [
+        name
+        for name, values in array_config.runner_parameters.items()
+        if len(values) > 1
+    ]
+    job_arrays = [array_config]
+    if array_config.search.strategy == "successive_halving":
+        # the budget of the rounds determines their resource usage
+        axes.append(array_config.search.budget_parameter)
+        job_arrays = [
+            round_config for _, round_config in submitted_rounds(array_config)
+        ]
+
+    n_jobs = 0
+    measured = []
+    failed = []
+    axis_records = {name: {} for name in axes}
+    for job_array in job_arrays:
+        records = read_ledger(
+            ledger_path(job_array.output_base_dir, job_array.job_prefix)
+        )
+        failed.extend(r for r in records.values() if r["exit_code"] != 0)
+        for params in iter_job_params(_runner_params_path(job_array)):
+            n_jobs += 1
+            record = records.get(params["job_index"])
+            if record is None or "cpu_time" not in record:
+                continue
+            record = dict(record)
+            if record["duration"] > 0:
+                record["cpu_cores"] = record["cpu_time"] / record["duration"]
+            measured.append(record)
+            for name in axes:
+                axis_records[name].setdefault(str(params[name]), []).append(record)
+
+    overall = _summarize(measured)
+    job_parameters = array_config.job_parameters
+
+    return {
+        "n_jobs": n_jobs,
+        "n_measured": len(measured),
+        "n_failed": len(failed),
+        "n_killed": len([r for r in failed if r["exit_code"] < 0]),
+        "overall": overall,
+        "axes": {
+            name: {value: _summarize(rs) for value, rs in values.items()}
+            for name, values in axis_records.items()
+        },
+        "current": {
+            "run_time": job_parameters.run_time,
+            "processor_cores": job_parameters.processor_cores,
+            "memory": job_parameters.memory,
+        },
+        "suggestion": _suggest_resources(array_config, overall, margin),
+    }
+
+
+def _format_percentiles(percentiles: Dict[int, Optional[float]]) -> str:
+    return " / ".join(
+        "-" if percentiles[q] is None else f"{percentiles[q]:.1f}" for q in _PERCENTILES
+    )
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Format a report of build_report() as text."""
+    lines = [
+        f"{report['n_measured']} of {report['n_jobs']} jobs with a recorded resource usage, "
+        f"{report['n_failed']} failed ({report['n_killed']} killed by a signal)",
+        "",
+        "p50 / p90 / max",
+    ]
+    for metric, unit in REPORT_METRICS.items():
+        lines.append(
+            f"  {metric} [{unit}]: {_format_percentiles(report['overall'][metric])}"
+        )
+
+    for name, values in report["axes"].items():
+        lines.append("")
+        lines.append(
+            f"{name}: duration [s] p50 / p90 / max, max_rss_mb [MB] p50 / p90 / max"
+        )
+        for value, summary in values.items():
+            lines.append(
+                f"  {value}: {_format_percentiles(summary['duration'])}, "
+                f"{_format_percentiles(summary['max_rss_mb'])}"
+            )
+
+    lines.append("")
+    lines.append("suggested job_parameters (scratch is not measured):")
+    for name, suggested in report["suggestion"].items():
+        lines.append(f"  {name}: {report['current'][name]} -> {suggested}")
+
+    return "\n".join(lines)
@@ -0,0 +1,156 @@
+"""Content-addressed cache of job results.
+
+The results of a job are stored under a key that is the hash of the runner
+parameters of the job (without the job specific "job_index", "job_prefix"
+and "output_base_dir") together with the hash of the content of the
+runner. Jobs that were already run with identical parameters in an earlier
+sweep can therefore be restored from the cache instead of being run again.
+
+Each cache entry is a copy of the output directory of the job. Entries are
+written to a temporary directory and renamed into place, so incomplete
+entries are never visible to other jobs.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+# keys that are specific to a job and do not change its results
+_JOB_SPECIFIC_KEYS = ("job_index", "job_prefix", "output_base_dir", "runner")
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_hash(path: str) -> str:
+    """Compute the sha256 hash of the content of a file."""
+    file_hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            file_hasher.update(chunk)
+
+    return file_hasher.hexdigest()
+
+
+def cache_key(params: Dict[str, Any], runner_hash: str) -> str:
+    """Compute the cache key of a job.
+
+    Parameters
+    ----------
+    params : Dict[str, Any]
+        The runner parameters of the job.
+    runner_hash : str
+        The hash of the content of the runner (see file_hash()).
+
+    Returns
+    -------
+    key : str
+        The cache key of the job.
+    """
+    job_params = {k: v for k, v in params.items() if k not in _JOB_SPECIFIC_KEYS}
+    key_source = json.dumps(
+        {"runner_hash": runner_hash, "params": job_params}, sort_keys=True
+    )
+
+    return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+
+def lookup(cache_dir: str, key: str) -> Optional[str]:
+    """Get the path of the cache entry with the given key or None if it is not cached."""
+    entry_path = os.path.join(cache_dir, key)
+    if not os.path.isdir(entry_path):
+        return None
+
+    # mark the entry as recently used for the eviction
+    os.utime(entry_path)
+
+    return entry_path
+
+
+def store(cache_dir: str, key: str, output_dir: str):
+    """Store the output directory of a job in the cache.
+
+    If the key is already cached, the existing entry is kept.
+    """
+    entry_path = os.path.join(cache_dir, key)
+    if os.path.isdir(entry_path):
+        return
+
+    tmp_path = os.path.join(cache_dir, f".{key}.{uuid.uuid4().hex}.tmp")
+    shutil.copytree(output_dir, tmp_path, symlinks=True)
+    try:
+        os.rename(tmp_path, entry_path)
+    except OSError:
+        # another job stored the same key in the meantime
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def restore(entry_path: str, output_dir: str, link: bool = False):
+    """Restore a cache entry into the output directory of a job.
+
+    Parameters
+    ----------
+    entry_path : str
+        The path of the cache entry (see lookup()).
+    output_dir : str
+        The output directory of the job. Must not exist yet.
+    link : bool
+        If True, the output directory is a symbolic link to the cache entry.
+        Otherwise, the cache entry is copied.
+    """
+    output_dir = output_dir.rstrip(os.path.sep)
+    if link:
+        os.symlink(entry_path, output_dir, target_is_directory=True)
+    else:
+        shutil.copytree(entry_path, output_dir, symlinks=True)
+
+
+def _entry_size(entry_path: str) -> int:
+    size = 0
+    for root, _, files in os.walk(entry_path):
+        for fname in files:
+            size += os.lstat(os.path.join(root, fname)).st_size
+
+    return size
+
+
+def evict(
+    cache_dir: str, max_size: Optional[int] = None, max_age: Optional[float] = None
+):
+    """Evict cache entries by age and total size.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The cache directory.
+    max_size : Optional[int]
+        The maximum total size of the cache in bytes. The least recently
+        used entries are evicted first. If None, the size is not limited.
+    max_age : Optional[float]
+        The maximum time in seconds since an entry was last used.
+        If None, the age is not limited.
+    """
+    now = time.time()
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.startswith(".") or not entry.is_dir(follow_symlinks=False):
+                continue
+            last_used = entry.stat(follow_symlinks=False).st_mtime
+            if max_age is not None and now - last_used > max_age:
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                entries.append((last_used, entry.path))
+
+    if max_size is None:
+        return
+
+    entries = [(last_used, path, _entry_size(path)) for last_used, path in entries]
+    total_size = sum(size for _, _, size in entries)
+    for _, path, size in sorted(entries):
+        if total_size <= max_size:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total_size -= size
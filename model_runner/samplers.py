@@ -0,0 +1,167 @@
+"""Samplers that select which combinations of the parameter grid are run.
+
+All samplers return the flat (0-based) grid indices of the selected
+combinations (see model_runner.params_store.unravel_grid_index()), sorted
+in grid order.
+"""
+import math
+import random
+from typing import Dict, List, Optional, Sequence
+
+from .params_store import ravel_grid_index
+
+SAMPLING_STRATEGIES = ("grid", "random", "latin_hypercube", "sobol")
+
+
+def grid_size(axis_sizes: Sequence[int]) -> int:
+    """Get the number of combinations of a parameter grid."""
+    n_combinations = 1
+    for size in axis_sizes:
+        n_combinations *= size
+    return n_combinations
+
+
+def sample_random(
+    axis_sizes: Sequence[int], n_samples: int, seed: Optional[int] = None
+) -> List[int]:
+    """Select n_samples distinct combinations uniformly at random."""
+    n_combinations = grid_size(axis_sizes)
+    if n_samples >= n_combinations:
+        return list(range(n_combinations))
+
+    # sampling from a range does not materialize the grid
+    rng = random.Random(seed)
+    return sorted(rng.sample(range(n_combinations), n_samples))
+
+
+def _points_to_flat_indices(
+    points: Sequence[Sequence[float]], axis_sizes: Sequence[int]
+) -> List[int]:
+    """Map points of the unit hypercube onto the (discrete) parameter grid.
+
+    Points that fall onto the same combination are only selected once.
+    """
+    flat_indices = set()
+    for point in points:
+        axis_indices = [
+            min(int(u * size), size - 1) for u, size in zip(point, axis_sizes)
+        ]
+        flat_indices.add(ravel_grid_index(axis_indices, axis_sizes))
+
+    return sorted(flat_indices)
+
+
+def sample_latin_hypercube(
+    axis_sizes: Sequence[int], n_samples: int, seed: Optional[int] = None
+) -> List[int]:
+    """Select up to n_samples combinations with latin hypercube sampling.
+
+    Every axis is divided into n_samples strata and each stratum is sampled
+    exactly once, so all values of an axis are covered as evenly as
+    possible. Samples that fall onto the same combination are merged, so
+    fewer than n_samples combinations may be returned.
+    """
+    rng = random.Random(seed)
+    strata = []
+    for _ in axis_sizes:
+        axis_strata = list(range(n_samples))
+        rng.shuffle(axis_strata)
+        strata.append(axis_strata)
+
+    points = [
+        [(axis_strata[i] + rng.random()) / n_samples for axis_strata in strata]
+        for i in range(n_samples)
+    ]
+
+    return _points_to_flat_indices(points, axis_sizes)
+
+
+def sample_sobol(
+    axis_sizes: Sequence[int], n_samples: int, seed: Optional[int] = None
+) -> List[int]:
+    """Select up to n_samples combinations from a scrambled Sobol sequence.
+
+    Requires scipy. Samples that fall onto the same combination are merged,
+    so fewer than n_samples combinations may be returned.
+    """
+    try:
+        from scipy.stats import qmc
+    except ImportError:
+        raise ImportError(
+            'the "sobol" sampling strategy requires scipy. Install it with "pip install scipy".'
+        )
+
+    sampler = qmc.Sobol(d=len(axis_sizes), scramble=True, seed=seed)
+    # Sobol sequences are balanced for powers of 2
+    points = sampler.random_base2(m=max(0, math.ceil(math.log2(n_samples))))
+
+    return _points_to_flat_indices(points[:n_samples], axis_sizes)
+
+
+_SAMPLERS = {
+    "random": sample_random,
+    "latin_hypercube": sample_latin_hypercube,
+    "sobol": sample_sobol,
+}
+
+
+def select_flat_indices(
+    strategy: str,
+    axis_sizes: Sequence[int],
+    n_samples: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> Optional[List[int]]:
+    """Select the combinations of the parameter grid to run.
+
+    Parameters
+    ----------
+    strategy : str
+        The sampling strategy. One of SAMPLING_STRATEGIES.
+    axis_sizes : Sequence[int]
+        The number of values of each parameter axis.
+    n_samples : Optional[int]
+        The number of combinations to select. Ignored for "grid".
+    seed : Optional[int]
+        The seed of the random number generator.
+
+    Returns
+    -------
+    flat_indices : Optional[List[int]]
+        The flat grid indices of the selected combinations or None if
+        all combinations are run (i.e., for "grid").
+    """
+    if strategy == "grid":
+        return None
+    if strategy not in _SAMPLERS:
+        raise ValueError(f'"{strategy}" is not a supported sampling strategy')
+
+    return _SAMPLERS[strategy](axis_sizes, n_samples, seed=seed)
+
+
+def top_fraction(
+    scores: Dict[int, Optional[float]], n_keep: int, mode: str = "min"
+) -> List[int]:
+    """Get the keys of the n_keep best scores.
+
+    Parameters
+    ----------
+    scores : Dict[int, Optional[float]]
+        The score of each candidate. Candidates without a score (e.g.,
+        because the job failed) are ranked last.
+    n_keep : int
+        The number of candidates to keep.
+    mode : str
+        "min" if lower scores are better, "max" if higher scores are better.
+
+    Returns
+    -------
+    kept : List[int]
+        The keys of the kept candidates, sorted.
+    """
+    sign = 1 if mode == "min" else -1
+    ranked = sorted(
+        scores,
+        key=lambda k: (scores[k] is None, 0 if scores[k] is None else sign * scores[k]),
+    )
+
+    return sorted(ranked[:n_keep])
@@ -0,0 +1,3 @@
+from .backends import FakeLSFBackend, LSFBackend, SubmissionError
+from .local import LocalBackend
+from .monitor import monitor_jobs, submit_jobs, watch_job
@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+from model_runner.submitter.backends import (
+    FakeLSFBackend,
+    parse_array_indices,
+    parse_bjobs_json,
+    parse_job_id,
+)
+
+
+def test_parse_job_id():
+    assert parse_job_id("Job <123456> is submitted to queue <normal.4h>.\n") == 123456
+
+
+def test_parse_bjobs_json():
+    bjobs_output = json.dumps(
+        {
+            "COMMAND": "bjobs",
+            "JOBS": 3,
+            "RECORDS": [
+                {"JOBID": "42", "JOBINDEX": "1", "STAT": "DONE"},
+                {"JOBID": "42", "JOBINDEX": "2", "STAT": "RUN"},
+                {"JOBID": "42", "JOBINDEX": "3", "STAT": "PEND"},
+            ],
+        }
+    )
+    assert parse_bjobs_json(bjobs_output) == {1: "DONE", 2: "RUN", 3: "PEND"}
+
+
+def test_parse_array_indices():
+    assert parse_array_indices("1-3") == [1, 2, 3]
+    assert parse_array_indices("1,4,7-9") == [1, 4, 7, 8, 9]
+
+
+def test_fake_lsf_backend(tmp_path):
+    backend = FakeLSFBackend()
+    logfile = (tmp_path / "log").as_posix()
+    command = (
+        f'bsub -J "test[1-3,5]%2" -o "{logfile}%I" -W "10"'
+        ' "echo \\\\$LSB_JOBINDEX; test \\\\$LSB_JOBINDEX -ne 3"'
+    )
+
+    async def _submit_and_wait():
+        job_id = await backend.submit(command)
+        while not backend.jobs[job_id].is_finished():
+            await asyncio.sleep(0.01)
+        return job_id, await backend.query(job_id)
+
+    job_id, states = asyncio.run(_submit_and_wait())
+
+    assert job_id == 1
+    assert states == {1: "DONE", 2: "DONE", 3: "EXIT", 5: "DONE"}
+    assert (tmp_path / "log5").read_text() == "5\n"
+
+
+def test_fake_lsf_backend_dependency_and_kill(tmp_path):
+    backend = FakeLSFBackend()
+    marker = tmp_path / "marker"
+
+    async def _run():
+        first = await backend.submit('bsub -J "first[1-2]" "sleep 60"')
+        second = await backend.submit(
+            f'bsub -J "second" -w "ended(first)" "touch {marker.as_posix()}"'
+        )
+        await asyncio.sleep(0.2)
+        # the dependent job waits for the first job
+        assert set((await backend.query(first)).values()) == {"RUN"}
+        assert await backend.query(second) == {0: "PEND"}
+
+        await backend.kill(first)
+        while not backend.jobs[second].is_finished():
+            await asyncio.sleep(0.01)
+        return await backend.query(first), await backend.query(second)
+
+    first_states, second_states = asyncio.run(_run())
+
+    assert first_states == {1: "EXIT", 2: "EXIT"}
+    assert second_states == {0: "DONE"}
+    assert marker.is_file()
+
+
+def test_fake_lsf_backend_kill_running(tmp_path):
+    backend = FakeLSFBackend()
+    marker = tmp_path / "marker"
+
+    async def _run():
+        job_id = await backend.submit(
+            f'bsub -J "a" "(sleep 0.5; touch {marker.as_posix()}) & wait"'
+        )
+        while await backend.query(job_id) != {0: "RUN"}:
+            await asyncio.sleep(0.01)
+
+        await backend.kill(job_id)
+        await backend.jobs[job_id].task
+        await asyncio.sleep(1)
+        return await backend.query(job_id)
+
+    # the commands started by the shell are killed with it
+    assert asyncio.run(_run()) == {0: "EXIT"}
+    assert not marker.exists()
+
+
+def test_fake_lsf_backend_elementwise_dependency(tmp_path):
+    backend = FakeLSFBackend()
+
+    async def _run():
+        first = await backend.submit(
+            'bsub -J "first[1-3]" "test \\$LSB_JOBINDEX -ne 2 || sleep 60"'
+        )
+        second = await backend.submit(
+            f'bsub -J "second[1-3]" -w "done({first}[*])" "exit 0"'
+        )
+        while {backend.jobs[second].states[i] for i in (1, 3)} != {"DONE"}:
+            await asyncio.sleep(0.01)
+        # the elements only wait for their own element of the first job array
+        assert await backend.query(second) == {1: "DONE", 2: "PEND", 3: "DONE"}
+
+        await backend.kill(first)
+        while not backend.jobs[second].is_finished():
+            await asyncio.sleep(0.01)
+        return await backend.query(second)
+
+    # the dependency of the killed element can never be met
+    assert asyncio.run(_run()) == {1: "DONE", 2: "EXIT", 3: "DONE"}
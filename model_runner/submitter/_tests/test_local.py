@@ -0,0 +1,148 @@
+import asyncio
+import os
+import time
+
+from model_runner.params_store import write_indexed_params
+from model_runner.submitter import LocalBackend, monitor_jobs
+
+RUNNER_SOURCE = """
+import argparse
+import os
+import sys
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--output_base_dir", type=str)
+parser.add_argument("--exit_code", type=int)
+args = parser.parse_args()
+
+os.makedirs(args.output_base_dir)
+print("running", os.environ["LSB_JOBINDEX"])
+sys.exit(args.exit_code)
+"""
+
+
+def test_local_backend(tmp_path):
+    runner = tmp_path / "runner.py"
+    runner.write_text(RUNNER_SOURCE)
+    output_base_dir = tmp_path.as_posix() + os.path.sep
+    records = [
+        {
+            "runner": runner.as_posix(),
+            "job_prefix": "test_job",
+            "output_base_dir": output_base_dir,
+            "job_index": i,
+            "exit_code": 3 if i == 2 else 0,
+        }
+        for i in range(1, 5)
+    ]
+    store_path = tmp_path / "params.jsonl"
+    write_indexed_params(records, store_path)
+
+    logfile = (tmp_path / "log").as_posix()
+    command = (
+        f'bsub -J "test_job[1-4]%2" -o "{logfile}%I" -n "1"'
+        f' "model_dispatcher --job_id \\\\$LSB_JOBINDEX --params {store_path.as_posix()}"'
+    )
+    backend = LocalBackend(max_workers=2)
+
+    async def _submit_and_monitor():
+        job_id = await backend.submit(command)
+        await monitor_jobs(backend, [job_id], poll_interval=0.05)
+        return await backend.query(job_id)
+
+    try:
+        states = asyncio.run(_submit_and_monitor())
+    finally:
+        backend.close()
+
+    assert states == {1: "DONE", 2: "EXIT", 3: "DONE", 4: "DONE"}
+    for job_index in range(1, 5):
+        assert (tmp_path / f"test_job{job_index}").is_dir()
+        log = (tmp_path / f"log{job_index}").read_text()
+        assert f"running {job_index}" in log
+    assert "job 2 finished with exit code 3" in (tmp_path / "log2").read_text()
+
+
+def test_local_backend_failing_dispatcher(tmp_path):
+    logfile = (tmp_path / "log").as_posix()
+    missing_store_path = (tmp_path / "missing.jsonl").as_posix()
+    command = (
+        f'bsub -J "test_job[1-2]" -o "{logfile}%I" -n "1"'
+        f' "model_dispatcher --job_id \\\\$LSB_JOBINDEX --params {missing_store_path}"'
+    )
+    backend = LocalBackend(max_workers=2)
+
+    async def _submit_and_monitor():
+        job_id = await backend.submit(command)
+        await asyncio.wait_for(
+            monitor_jobs(backend, [job_id], poll_interval=0.05), timeout=30
+        )
+        return await backend.query(job_id)
+
+    try:
+        states = asyncio.run(_submit_and_monitor())
+    finally:
+        backend.close()
+
+    # the elements fail instead of running forever
+    assert states == {1: "EXIT", 2: "EXIT"}
+    assert "Traceback" in (tmp_path / "log1").read_text()
+
+
+def test_local_backend_kill_running(tmp_path):
+    runner = tmp_path / "runner.py"
+    runner.write_text(
+        "import argparse, os, time\n"
+        "parser = argparse.ArgumentParser()\n"
+        'parser.add_argument("--output_base_dir", type=str)\n'
+        "args = parser.parse_args()\n"
+        "time.sleep(0.5)\n"
+        "os.makedirs(args.output_base_dir)\n"
+    )
+    records = [
+        {
+            "runner": runner.as_posix(),
+            "job_prefix": "test_job",
+            "output_base_dir": tmp_path.as_posix() + os.path.sep,
+            "job_index": 1,
+        }
+    ]
+    store_path = tmp_path / "params.jsonl"
+    write_indexed_params(records, store_path)
+    command = (
+        'bsub -J "test_job[1]" -n "1"'
+        f' "model_dispatcher --job_id \\\\$LSB_JOBINDEX --params {store_path.as_posix()}"'
+    )
+    backend = LocalBackend(max_workers=1)
+
+    async def _submit_and_kill():
+        job_id = await backend.submit(command)
+        while await backend.query(job_id) != {1: "RUN"}:
+            await asyncio.sleep(0.01)
+        # the dispatcher started the runner
+        await asyncio.sleep(0.2)
+
+        start_time = time.monotonic()
+        await backend.kill(job_id)
+        await backend.jobs[job_id].task
+        kill_time = time.monotonic() - start_time
+        await asyncio.sleep(1)
+        return await backend.query(job_id), kill_time
+
+    try:
+        states, kill_time = asyncio.run(_submit_and_kill())
+    finally:
+        backend.close()
+
+    # the running element is killed together with its runner
+    assert states == {1: "EXIT"}
+    assert kill_time < 0.5
+    assert not (tmp_path / "test_job1").exists()
+
+
+def test_local_backend_concurrency_limit():
+    backend = LocalBackend(max_workers=8)
+
+    assert backend._concurrency_limit(4, {"-n": ["1"]}) == 4
+    assert backend._concurrency_limit(4, {"-n": ["4"]}) == 2
+    assert backend._concurrency_limit(4, {"-n": ["16"]}) == 1
@@ -0,0 +1,195 @@
+import asyncio
+
+import pytest
+
+from model_runner.submitter import (
+    FakeLSFBackend,
+    SubmissionError,
+    monitor_jobs,
+    submit_jobs,
+    watch_job,
+)
+
+
+class _ScriptedBackend:
+    """Backend that replays a fixed sequence of job states."""
+
+    def __init__(self, states):
+        self.states = list(states)
+        self.n_queries = 0
+
+    async def query(self, job_id):
+        self.n_queries += 1
+        return self.states.pop(0) if len(self.states) > 1 else self.states[0]
+
+
+def test_watch_job():
+    backend = _ScriptedBackend(
+        [
+            {1: "PEND", 2: "PEND"},
+            {1: "RUN", 2: "PEND"},
+            {1: "RUN", 2: "PEND"},
+            {1: "DONE", 2: "RUN"},
+            {1: "DONE", 2: "EXIT"},
+        ]
+    )
+
+    async def _collect():
+        return [
+            (t.index, t.old_state, t.new_state)
+            async for t in watch_job(backend, 7, poll_interval=0.001)
+        ]
+
+    transitions = asyncio.run(_collect())
+
+    assert transitions == [
+        (1, None, "PEND"),
+        (2, None, "PEND"),
+        (1, "PEND", "RUN"),
+        (1, "RUN", "DONE"),
+        (2, "PEND", "RUN"),
+        (2, "RUN", "EXIT"),
+    ]
+    assert backend.n_queries == 5
+
+
+def test_watch_job_not_found():
+    backend = FakeLSFBackend()
+
+    async def _collect():
+        job_id = await backend.submit('bsub -J "a[1-2]" "sleep 0.2"')
+        job = backend.jobs[job_id]
+        transitions = []
+        async for t in watch_job(backend, job_id, poll_interval=0.01):
+            transitions.append((t.index, t.old_state, t.new_state))
+            # LSF purges the job while it is watched
+            backend.jobs.pop(job_id, None)
+        await job.task
+        return transitions
+
+    transitions = asyncio.run(_collect())
+
+    # the unfinished elements are considered failed
+    assert [t[2] for t in transitions[-2:]] == ["EXIT", "EXIT"]
+    assert {t[0]: t[2] for t in transitions} == {1: "EXIT", 2: "EXIT"}
+
+    async def _watch_unknown_job():
+        async for _ in watch_job(backend, 99, poll_interval=0.01):
+            pass
+
+    with pytest.raises(SubmissionError, match="job 99 was not found"):
+        asyncio.run(_watch_unknown_job())
+
+
+def test_submit_and_monitor_fake_lsf(capsys):
+    backend = FakeLSFBackend()
+
+    async def _run():
+        job_ids = await submit_jobs(
+            backend,
+            ['bsub -J "a[1-4]%2" "exit 0"', 'bsub -J "b[1-2]" "exit 1"'],
+        )
+        return await monitor_jobs(backend, job_ids, poll_interval=0.01)
+
+    final_states = asyncio.run(_run())
+
+    assert final_states == {
+        1: {1: "DONE", 2: "DONE", 3: "DONE", 4: "DONE"},
+        2: {1: "EXIT", 2: "EXIT"},
+    }
+    # states between two polls may be skipped
+    output_lines = capsys.readouterr().out.splitlines()
+    assert any(
+        line.startswith("job 2[1]: ") and line.endswith("-> EXIT")
+        for line in output_lines
+    )
+
+
+def test_submit_jobs_job_id_placeholder():
+    backend = FakeLSFBackend()
+
+    async def _run():
+        job_ids = await submit_jobs(
+            backend,
+            [
+                'bsub -J "a[1-2]" "exit 0"',
+                'bsub -J "b[1-2]" "exit 0"',
+                'bsub -J "c[1-2]" -w "ended(<job_id:1>[*])" "exit 0"',
+            ],
+        )
+        await monitor_jobs(backend, job_ids, poll_interval=0.01)
+        return job_ids
+
+    job_ids = asyncio.run(_run())
+
+    assert backend.jobs[job_ids[2]].states == {1: "DONE", 2: "DONE"}
+
+
+def test_submit_jobs_concurrently():
+    backend = FakeLSFBackend()
+    submitted = []
+    n_submitting = 0
+    max_submitting = 0
+    submit = backend.submit
+
+    async def _submit(bsub_command):
+        nonlocal n_submitting, max_submitting
+        n_submitting += 1
+        max_submitting = max(max_submitting, n_submitting)
+        await asyncio.sleep(0.01)
+        n_submitting -= 1
+        submitted.append(bsub_command.split('"')[1])
+        return await submit(bsub_command)
+
+    backend.submit = _submit
+
+    async def _run():
+        job_ids = await submit_jobs(
+            backend,
+            [
+                'bsub -J "a[1-2]" "exit 0"',
+                'bsub -J "a[1-2]" "exit 0"',
+                'bsub -J "b" -w "ended(a)" "exit 0"',
+                'bsub -J "c[1-2]" -w "ended(<job_id:1>[*])" "exit 0"',
+            ],
+        )
+        await monitor_jobs(backend, job_ids, poll_interval=0.01)
+        return job_ids
+
+    job_ids = asyncio.run(_run())
+
+    # the chunks are submitted together, jobs with dependencies after them
+    assert max_submitting == 2
+    assert submitted[2:] == ["b", "c[1-2]"]
+    assert sorted(job_ids) == [1, 2, 3, 4]
+    assert backend.jobs[job_ids[3]].states == {1: "DONE", 2: "DONE"}
+
+
+def test_monitor_jobs_stop_condition(tmp_path, capsys):
+    backend = FakeLSFBackend()
+    stop_file = tmp_path / "stop"
+
+    async def _run():
+        job_ids = await submit_jobs(
+            backend,
+            [
+                f'bsub -J "a[1-4]%1" "touch {stop_file.as_posix()}; sleep 60"',
+                'bsub -J "b" -w "ended(a)" "exit 0"',
+            ],
+        )
+        return await monitor_jobs(
+            backend,
+            job_ids,
+            poll_interval=0.01,
+            stop_condition=stop_file.exists,
+            stop_job_ids=job_ids[:1],
+        )
+
+    final_states = asyncio.run(_run())
+
+    # the running and pending elements were killed, the dependent job still ran
+    assert final_states == {
+        1: {1: "EXIT", 2: "EXIT", 3: "EXIT", 4: "EXIT"},
+        2: {0: "DONE"},
+    }
+    assert "stop condition met" in capsys.readouterr().out
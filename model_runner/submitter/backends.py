@@ -0,0 +1,324 @@
+import asyncio
+import contextlib
+import json
+import os
+import re
+import shlex
+import signal
+import traceback
+from typing import IO, Awaitable, Dict, List, Optional, Tuple
+
+# LSF job states after which a job does not change anymore
+FINAL_STATES = ("DONE", "EXIT")
+
+_JOB_ID_PATTERN = re.compile(r"Job <(\d+)>")
+_ARRAY_PATTERN = re.compile(
+    r"^(?P<name>[^\[]+)(\[(?P<indices>[^\]]+)\])?(%(?P<limit>\d+))?$"
+)
+_DEPENDENCY_PATTERN = re.compile(r"(ended|done)\(([^)\[]+)(\[\*\])?\)")
+
+
+class SubmissionError(RuntimeError):
+    """Raised when a command of the batch system fails."""
+
+
+def parse_job_id(bsub_output: str) -> int:
+    """Parse the job ID from the reply of bsub (e.g., "Job <123> is submitted to queue <normal>.")."""
+    match = _JOB_ID_PATTERN.search(bsub_output)
+    if match is None:
+        raise SubmissionError(f"could not parse the job ID from: {bsub_output}")
+
+    return int(match.group(1))
+
+
+def parse_bjobs_json(bjobs_output: str) -> Dict[int, str]:
+    """Parse the state of each job array element from the output of bjobs -json.
+
+    Parameters
+    ----------
+    bjobs_output : str
+        The output of bjobs -json -o "jobid jobindex stat".
+
+    Returns
+    -------
+    states : Dict[int, str]
+        The LSF state (e.g., "PEND", "RUN", "DONE" or "EXIT") of each
+        element. Jobs that are not arrays have the index 0.
+    """
+    states = {}
+    for record in json.loads(bjobs_output).get("RECORDS", []):
+        if "ERROR" in record:
+            continue
+        index = record.get("JOBINDEX") or 0
+        states[int(index)] = record["STAT"]
+
+    return states
+
+
+def parse_array_indices(index_list: str) -> List[int]:
+    """Parse LSF job array indices (e.g., "1,4,7-9") into a list of indices."""
+    indices = []
+    for part in index_list.split(","):
+        if "-" in part:
+            start, stop = part.split("-")
+            indices.extend(range(int(start), int(stop) + 1))
+        else:
+            indices.append(int(part))
+
+    return indices
+
+
+class LSFBackend:
+    """Submits, queries and kills jobs with the LSF commands bsub, bjobs and bkill.
+
+    The commands are run with _run(), which can be overridden to run them
+    in another way (see FakeLSFBackend).
+    """
+
+    async def _run(self, command: str) -> str:
+        """Run a shell command and return its stdout."""
+        process = await asyncio.create_subprocess_shell(
+            command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise SubmissionError(
+                f"{command} failed with exit code {process.returncode}: {stderr.decode()}"
+            )
+
+        return stdout.decode()
+
+    async def submit(self, bsub_command: str) -> int:
+        """Submit a job with a bsub command and return its job ID."""
+        return parse_job_id(await self._run(bsub_command))
+
+    async def query(self, job_id: int) -> Dict[int, str]:
+        """Get the state of each element of a job (see parse_bjobs_json())."""
+        bjobs_output = await self._run(
+            f'bjobs -json -a -o "jobid jobindex stat" {job_id}'
+        )
+        return parse_bjobs_json(bjobs_output)
+
+    async def kill(self, job_id: int):
+        """Kill all elements of a job."""
+        await self._run(f"bkill {job_id}")
+
+    def close(self):
+        """Release the resources of the backend."""
+
+
+def _kill_session(pid: int):
+    """Kill a process that leads its own session together with the processes it started."""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        # the process has not started its session yet
+        with contextlib.suppress(ProcessLookupError):
+            os.kill(pid, signal.SIGKILL)
+
+
+class _FakeJob:
+    def __init__(self, job_id: int, name: str, indices: List[int]):
+        self.job_id = job_id
+        self.name = name
+        self.states = {index: "PEND" for index in indices}
+        self.processes = {}
+        self.task = None
+
+    def is_finished(self) -> bool:
+        return all(state in FINAL_STATES for state in self.states.values())
+
+    def is_done(self) -> bool:
+        return all(state == "DONE" for state in self.states.values())
+
+
+class FakeLSFBackend(LSFBackend):
+    """Local stand-in for LSF that runs the elements of job arrays as local subprocesses.
+
+    bsub, bjobs and bkill commands are emulated, so the complete submission
+    and monitoring lifecycle can be run without a cluster. Of the bsub
+    options, only the job name and array indices with the limit of
+    concurrently running elements (-J), the output file (-o) and the
+    dependency conditions ended() and done() (-w) on job names or IDs are
+    used. A dependency on "name[*]" is met element by element, i.e.,
+    element i waits for element i of the other job array. The elements
+    get the environment variables LSB_JOBID and LSB_JOBINDEX. The jobs run
+    in the event loop of the caller, which has to keep running (e.g., by
+    monitoring the jobs) until they are finished.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self._next_job_id = 1
+
+    async def _run(self, command: str) -> str:
+        argv = shlex.split(command)
+        if argv[0] == "bsub":
+            return self._bsub(argv[1:])
+        elif argv[0] == "bjobs":
+            return self._bjobs(int(argv[-1]))
+        elif argv[0] == "bkill":
+            return self._bkill(int(argv[-1]))
+
+        raise SubmissionError(f"{argv[0]} is not supported by the FakeLSFBackend")
+
+    def _bsub(self, args: List[str]) -> str:
+        options = {}
+        i = 0
+        while i < len(args) - 1:
+            options.setdefault(args[i], []).append(args[i + 1])
+            i += 2
+        # the command is the last argument, the job index is expanded when it is run
+        command = args[-1].replace("\\$", "$")
+
+        match = _ARRAY_PATTERN.match(options.get("-J", ["fake_job"])[0])
+        name = match.group("name")
+        indices = [0]
+        if match.group("indices") is not None:
+            indices = parse_array_indices(match.group("indices"))
+        limit = int(match.group("limit") or len(indices))
+
+        job_id = self._next_job_id
+        self._next_job_id += 1
+        job = _FakeJob(job_id, name, indices)
+        self.jobs[job_id] = job
+        job.task = asyncio.ensure_future(
+            self._run_job(
+                job,
+                command,
+                logfile=options.get("-o", [None])[0],
+                limit=self._concurrency_limit(limit, options),
+                dependency=options.get("-w", [None])[0],
+            )
+        )
+
+        return f"Job <{job_id}> is submitted to default queue <normal>."
+
+    def _concurrency_limit(self, limit: int, options: Dict[str, List[str]]) -> int:
+        """Get the number of elements of a job that may run concurrently."""
+        return limit
+
+    async def _execute(
+        self, command: str, env: Dict[str, str], log: Optional[IO[bytes]]
+    ) -> Tuple[Optional[asyncio.subprocess.Process], Awaitable[int]]:
+        """Start the command of an element and wait for its exit code.
+
+        The process is returned as well so that it can be killed. It leads
+        its own session, so that the shell is killed with the command.
+        """
+        process = await asyncio.create_subprocess_shell(
+            command, env=env, stdout=log, stderr=log, start_new_session=True
+        )
+        return process, process.wait()
+
+    def _dependency_met(
+        self, dependency: str, index: Optional[int] = None
+    ) -> Optional[bool]:
+        """Check a dependency of a job (or of its element index); None means that it can never be met."""
+        for condition, name, elementwise in _DEPENDENCY_PATTERN.findall(dependency):
+            if name.isdigit():
+                jobs = [self.jobs[int(name)]] if int(name) in self.jobs else []
+            else:
+                jobs = [job for job in self.jobs.values() if job.name == name]
+            if elementwise:
+                states = [job.states[index] for job in jobs if index in job.states]
+            else:
+                states = [state for job in jobs for state in job.states.values()]
+            if not all(state in FINAL_STATES for state in states):
+                return False
+            if condition == "done" and not all(state == "DONE" for state in states):
+                return None
+
+        return True
+
+    async def _wait_for_dependency(
+        self, dependency: str, index: Optional[int] = None
+    ) -> bool:
+        """Wait until a dependency is met; False means that it can never be met."""
+        while True:
+            dependency_met = self._dependency_met(dependency, index)
+            if dependency_met is None:
+                return False
+            elif dependency_met:
+                return True
+            await asyncio.sleep(0.05)
+
+    async def _run_job(
+        self,
+        job: _FakeJob,
+        command: str,
+        logfile: Optional[str],
+        limit: int,
+        dependency: Optional[str],
+    ):
+        elementwise = dependency is not None and "[*]" in dependency
+        if dependency is not None and not elementwise:
+            if not await self._wait_for_dependency(dependency):
+                job.states = {index: "EXIT" for index in job.states}
+                return
+
+        semaphore = asyncio.Semaphore(limit)
+
+        async def _run_element(index: int):
+            if elementwise and not await self._wait_for_dependency(dependency, index):
+                job.states[index] = "EXIT"
+                return
+            async with semaphore:
+                if job.states[index] != "PEND":
+                    # killed before it started
+                    return
+                env = dict(os.environ)
+                env["LSB_JOBID"] = str(job.job_id)
+                env["LSB_JOBINDEX"] = str(index)
+                log = None
+                if logfile is not None:
+                    log = open(
+                        logfile.replace("%I", str(index)).replace(
+                            "%J", str(job.job_id)
+                        ),
+                        "ab",
+                    )
+                try:
+                    job.states[index] = "RUN"
+                    process, exit_code_future = await self._execute(command, env, log)
+                    if process is not None:
+                        job.processes[index] = process
+                    exit_code = await exit_code_future
+                except Exception:
+                    # the element failed to run (e.g., its worker process died),
+                    # it must not stay in the state RUN
+                    if log is not None:
+                        log.write(traceback.format_exc().encode())
+                    exit_code = 1
+                finally:
+                    if log is not None:
+                        log.close()
+                job.states[index] = "DONE" if exit_code == 0 else "EXIT"
+
+        await asyncio.gather(*(_run_element(index) for index in job.states))
+
+    def _bjobs(self, job_id: int) -> str:
+        job = self.jobs.get(job_id)
+        if job is None:
+            records = [{"JOBID": str(job_id), "ERROR": "Job not found"}]
+        else:
+            records = [
+                {"JOBID": str(job_id), "JOBINDEX": str(index), "STAT": state}
+                for index, state in job.states.items()
+            ]
+
+        return json.dumps(
+            {"COMMAND": "bjobs", "JOBS": len(records), "RECORDS": records}
+        )
+
+    def _bkill(self, job_id: int) -> str:
+        job = self.jobs[job_id]
+        for index, state in job.states.items():
+            if state == "PEND":
+                job.states[index] = "EXIT"
+            elif state == "RUN" and index in job.processes:
+                _kill_session(job.processes[index].pid)
+
+        return f"Job <{job_id}> is being terminated"
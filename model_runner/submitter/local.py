@@ -0,0 +1,140 @@
+import asyncio
+import multiprocessing
+import os
+import shlex
+import sys
+import traceback
+from multiprocessing.process import BaseProcess
+from typing import IO, Awaitable, Dict, List, Optional, Tuple
+
+from .backends import FakeLSFBackend
+
+
+def _run_dispatcher(
+    argv: List[str], env: Dict[str, str], logfile: Optional[str]
+) -> int:
+    """Run model_dispatcher in a worker process of the pool and return its exit code.
+
+    stdout and stderr of the dispatcher and of the runners it starts are
+    redirected to the logfile, like the output of an LSF job.
+    """
+    from ..dispatcher import main as dispatcher_main
+
+    saved_environ = dict(os.environ)
+    saved_argv = sys.argv
+    saved_streams = (sys.stdout, sys.stderr)
+    saved_fds = (os.dup(1), os.dup(2))
+    log = None
+    try:
+        os.environ.clear()
+        os.environ.update(env)
+        sys.argv = argv
+        if logfile is not None:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            log = open(logfile, "a")
+            os.dup2(log.fileno(), 1)
+            os.dup2(log.fileno(), 2)
+            sys.stdout = sys.stderr = log
+
+        try:
+            dispatcher_main()
+            exit_code = 0
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                exit_code = e.code or 0
+            else:
+                exit_code = 1
+        except Exception:
+            # the dispatcher failed (e.g., on a missing params file), like a
+            # failed LSF job its traceback is in the log
+            traceback.print_exc()
+            exit_code = 1
+    finally:
+        if log is not None:
+            log.flush()
+        sys.stdout, sys.stderr = saved_streams
+        os.dup2(saved_fds[0], 1)
+        os.dup2(saved_fds[1], 2)
+        for fd in saved_fds:
+            os.close(fd)
+        if log is not None:
+            log.close()
+        sys.argv = saved_argv
+        os.environ.clear()
+        os.environ.update(saved_environ)
+
+    return exit_code
+
+
+def _run_dispatcher_session(
+    argv: List[str], env: Dict[str, str], logfile: Optional[str]
+):
+    """Run model_dispatcher in a new session and exit with its exit code.
+
+    The element can be killed together with the runners it started by
+    killing the process group of the session.
+    """
+    os.setsid()
+    sys.exit(_run_dispatcher(argv, env, logfile))
+
+
+class LocalBackend(FakeLSFBackend):
+    """Runs job arrays on the local machine with a process per element.
+
+    The job array is submitted with the same bsub command as on the
+    cluster. Each element runs model_dispatcher in a process forked from
+    model_runner (in its own session, so that bkill kills it with its
+    runners), so the runner is started with create_run_command() exactly
+    as on the cluster, and writes its log to the file of the bsub -o
+    option. At most njobs_parallel elements (%N of the job name) run at the
+    same time, the elements are limited to the number of CPUs of the
+    machine divided by the processor_cores of each element (bsub -n), and
+    at most max_workers elements of all jobs run at the same time.
+    Commands other than model_dispatcher are run in a shell.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        super().__init__()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._slots = None
+
+    def _concurrency_limit(self, limit: int, options: Dict[str, List[str]]) -> int:
+        processor_cores = int(options.get("-n", ["1"])[0])
+        return max(1, min(limit, self.max_workers // processor_cores))
+
+    async def _execute(
+        self, command: str, env: Dict[str, str], log: Optional[IO[bytes]]
+    ) -> Tuple[Optional[BaseProcess], Awaitable[int]]:
+        argv = shlex.split(command)
+        if argv[0] != "model_dispatcher":
+            return await super()._execute(command, env, log)
+
+        argv = [
+            arg.replace("$LSB_JOBINDEX", env["LSB_JOBINDEX"]).replace(
+                "$LSB_JOBID", env["LSB_JOBID"]
+            )
+            for arg in argv
+        ]
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        await self._slots.acquire()
+        process = multiprocessing.get_context().Process(
+            target=_run_dispatcher_session,
+            args=(argv, env, None if log is None else log.name),
+        )
+        try:
+            process.start()
+        except BaseException:
+            self._slots.release()
+            raise
+
+        async def _wait() -> int:
+            try:
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(None, process.join)
+                return process.exitcode
+            finally:
+                self._slots.release()
+
+        return process, _wait()
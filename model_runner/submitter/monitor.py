@@ -0,0 +1,198 @@
+import asyncio
+import re
+from typing import AsyncIterator, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from .backends import FINAL_STATES, LSFBackend, SubmissionError
+
+# placeholder for the job ID of the command at a position of the submitted commands
+_JOB_ID_PLACEHOLDER = re.compile(r"<job_id:(\d+)>")
+
+
+class StateTransition(NamedTuple):
+    """A change of the state of a job array element."""
+
+    job_id: int
+    index: int
+    old_state: Optional[str]
+    new_state: str
+
+
+async def watch_job(
+    backend: LSFBackend,
+    job_id: int,
+    poll_interval: float = 30,
+    max_poll_interval: float = 600,
+    backoff: float = 2,
+) -> AsyncIterator[StateTransition]:
+    """Poll the state of a job and stream the state transitions of its elements.
+
+    The polling interval starts at poll_interval and grows by the factor
+    backoff (up to max_poll_interval) while no element changes its state.
+    It is reset as soon as a transition is observed. The stream ends when
+    all elements are finished (i.e., DONE or EXIT) or when the job is no
+    longer found (e.g., LSF purged it after CLEAN_PERIOD). The elements that
+    were not finished when the job was last found are then considered
+    failed (EXIT), as their final state is unknown.
+
+    Parameters
+    ----------
+    backend : LSFBackend
+        The backend to query the job state with.
+    job_id : int
+        The ID of the job.
+    poll_interval : float
+        The initial polling interval in seconds.
+    max_poll_interval : float
+        The maximum polling interval in seconds.
+    backoff : float
+        The factor by which the polling interval grows.
+
+    Yields
+    ------
+    transition : StateTransition
+        The state transitions, ordered by element index within each poll.
+
+    Raises
+    ------
+    SubmissionError
+        If the job is not found at all.
+    """
+    states = {}
+    interval = poll_interval
+    while True:
+        current_states = await backend.query(job_id)
+        if not current_states:
+            if not states:
+                raise SubmissionError(f"job {job_id} was not found")
+            for index, state in sorted(states.items()):
+                if state not in FINAL_STATES:
+                    yield StateTransition(job_id, index, state, "EXIT")
+            return
+
+        changed = False
+        for index, state in sorted(current_states.items()):
+            if states.get(index) != state:
+                changed = True
+                yield StateTransition(job_id, index, states.get(index), state)
+        states = current_states
+
+        if all(state in FINAL_STATES for state in states.values()):
+            return
+
+        interval = (
+            poll_interval if changed else min(interval * backoff, max_poll_interval)
+        )
+        await asyncio.sleep(interval)
+
+
+async def monitor_jobs(
+    backend: LSFBackend,
+    job_ids: Iterable[int],
+    poll_interval: float = 30,
+    max_poll_interval: float = 600,
+    verbose: bool = True,
+    stop_condition: Optional[Callable[[], bool]] = None,
+    stop_job_ids: Optional[Iterable[int]] = None,
+) -> Dict[int, Dict[int, str]]:
+    """Monitor several jobs concurrently until all of their elements are finished.
+
+    Parameters
+    ----------
+    backend : LSFBackend
+        The backend to query the job states with.
+    job_ids : Iterable[int]
+        The IDs of the jobs.
+    poll_interval : float
+        The initial polling interval in seconds (see watch_job()).
+    max_poll_interval : float
+        The maximum polling interval in seconds.
+    verbose : bool
+        If True, each state transition is printed.
+    stop_condition : Optional[Callable[[], bool]]
+        Checked every poll_interval seconds while the jobs are monitored.
+        Once it returns True, the jobs in stop_job_ids are killed
+        (e.g., when a sweep was stopped early).
+    stop_job_ids : Optional[Iterable[int]]
+        The IDs of the jobs to kill once stop_condition is met.
+        If None, all jobs are killed.
+
+    Returns
+    -------
+    final_states : Dict[int, Dict[int, str]]
+        The final state of each element of each job.
+    """
+
+    async def _monitor(job_id: int) -> Dict[int, str]:
+        states = {}
+        async for transition in watch_job(
+            backend,
+            job_id,
+            poll_interval=poll_interval,
+            max_poll_interval=max_poll_interval,
+        ):
+            states[transition.index] = transition.new_state
+            if verbose:
+                print(
+                    f"job {transition.job_id}[{transition.index}]: "
+                    f"{transition.old_state or 'SUBMITTED'} -> {transition.new_state}",
+                    flush=True,
+                )
+        return states
+
+    async def _kill_when_stopped(kill_job_ids: List[int]):
+        while not stop_condition():
+            await asyncio.sleep(poll_interval)
+        if verbose:
+            print("stop condition met, killing the remaining jobs", flush=True)
+        for job_id in kill_job_ids:
+            try:
+                await backend.kill(job_id)
+            except SubmissionError:
+                # the job already finished
+                pass
+
+    job_ids = list(job_ids)
+    stop_task = None
+    if stop_condition is not None:
+        stop_task = asyncio.ensure_future(
+            _kill_when_stopped(job_ids if stop_job_ids is None else list(stop_job_ids))
+        )
+    try:
+        final_states = await asyncio.gather(*(_monitor(job_id) for job_id in job_ids))
+    finally:
+        if stop_task is not None:
+            stop_task.cancel()
+
+    return dict(zip(job_ids, final_states))
+
+
+async def submit_jobs(backend: LSFBackend, bsub_commands: Iterable[str]) -> List[int]:
+    """Submit bsub commands and return their job IDs in the order of the commands.
+
+    Commands with a dependency (bsub -w) are only submitted after all
+    commands before them, so that jobs can depend on the jobs submitted
+    before them. The commands between them (e.g., the chunks of a split
+    job array) are submitted concurrently. A placeholder <job_id:{position}>
+    in a command is replaced by the job ID of the command at that position
+    (e.g., in a dependency on the elements of an earlier job array).
+    """
+    bsub_commands = list(bsub_commands)
+    job_ids = [None] * len(bsub_commands)
+
+    async def _submit(position: int):
+        bsub_command = _JOB_ID_PLACEHOLDER.sub(
+            lambda match: str(job_ids[int(match.group(1))]), bsub_commands[position]
+        )
+        job_id = await backend.submit(bsub_command)
+        print(f"submitted job {job_id}", flush=True)
+        job_ids[position] = job_id
+
+    groups = []
+    for position, bsub_command in enumerate(bsub_commands):
+        if len(groups) == 0 or " -w " in bsub_command:
+            groups.append([])
+        groups[-1].append(position)
+    for group in groups:
+        await asyncio.gather(*(_submit(position) for position in group))
+
+    return job_ids
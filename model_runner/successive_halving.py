@@ -0,0 +1,168 @@
+"""Successive halving search over the parameter grid.
+
+The search runs in rounds. Each round is a job array with the job prefix
+``{job_prefix}_r{round}``, whose jobs run with the budget of the round
+(e.g., the number of epochs) as an additional runner argument. A small
+promotion job is submitted with each round. It waits for the round to end,
+reads the metric from the metrics file of each job, and submits the next
+round with the best 1/eta of the combinations and eta times the budget.
+The combinations and budget of every round are kept in the state file
+``{output_base_dir}{job_prefix}_halving.json``.
+"""
+import json
+import os
+from typing import Any, Dict, List, Tuple
+
+from .metrics import read_metric
+from .samplers import top_fraction
+from .utils import (
+    _runner_params_path,
+    _select_flat_indices,
+    _write_job_arrays,
+    _write_runner_params,
+)
+from .validator import ConfigModel
+
+
+def halving_state_path(array_config: ConfigModel) -> str:
+    """Get the path of the state file of a successive halving search."""
+    return os.path.join(
+        array_config.output_base_dir, f"{array_config.job_prefix}_halving.json"
+    )
+
+
+def _load_state(array_config: ConfigModel) -> Dict[str, Any]:
+    with open(halving_state_path(array_config), "r") as f_state:
+        return json.load(f_state)
+
+
+def _save_state(array_config: ConfigModel, state: Dict[str, Any]):
+    with open(halving_state_path(array_config), "w") as f_state:
+        json.dump(state, f_state, indent=4)
+
+
+def _round_config(array_config: ConfigModel, round_index: int) -> ConfigModel:
+    """Get the config of the job array of a round."""
+    return array_config.copy(
+        update={"job_prefix": f"{array_config.job_prefix}_r{round_index}"}
+    )
+
+
+def submitted_rounds(array_config: ConfigModel) -> List[Tuple[int, ConfigModel]]:
+    """Get the index and config of the job array of every submitted round.
+
+    Returns an empty list if the first round was not submitted yet.
+    """
+    if not os.path.exists(halving_state_path(array_config)):
+        return []
+
+    return [
+        (r["round"], _round_config(array_config, r["round"]))
+        for r in _load_state(array_config)["rounds"]
+    ]
+
+
+def round_budget(array_config: ConfigModel, round_index: int) -> int:
+    """Get the budget of a round, which grows by eta from round to round."""
+    search = array_config.search
+    return min(search.min_budget * search.eta**round_index, search.max_budget)
+
+
+def _promote(array_config: ConfigModel, previous_round: Dict[str, Any]) -> List[int]:
+    """Select the flat grid indices of the best combinations of the previous round."""
+    search = array_config.search
+    round_config = _round_config(array_config, previous_round["round"])
+
+    scores = {}
+    for job_index, flat_index in enumerate(previous_round["flat_indices"], start=1):
+        output_dir = (
+            f"{round_config.output_base_dir}{round_config.job_prefix}{job_index}"
+        )
+        scores[flat_index] = read_metric(
+            output_dir, search.metric, metrics_file=search.metrics_file
+        )
+    n_keep = max(1, len(scores) // search.eta)
+
+    return top_fraction(scores, n_keep, mode=search.mode)
+
+
+def _write_promotion_job(
+    array_config: ConfigModel, config_path: str, round_index: int
+) -> str:
+    """Write the command of the job that promotes the combinations of a round.
+
+    The job waits until all jobs of the previous round ended and then runs
+    model_runner to submit the next round.
+    """
+    job_prefix = array_config.job_prefix
+    previous_round_name = f"{job_prefix}_r{round_index - 1}"
+    logfile_dir = os.path.join(array_config.job_parameters.logfile_dir, job_prefix)
+
+    promotion_command = f'bsub -J "{job_prefix}_promote_r{round_index}"'
+    promotion_command += f' -w "ended({previous_round_name})"'
+    promotion_command += f' -o "{logfile_dir}_promote_r{round_index}"'
+    promotion_command += ' -W "30"'
+    promotion_command += ' -n "1"'
+    promotion_command += ' -R "rusage[mem=1000]"'
+    promotion_command += (
+        f' "model_runner --params {config_path} --halving_round {round_index}"'
+    )
+
+    return promotion_command
+
+
+def submit_round(
+    array_config: ConfigModel, config_path: str, round_index: int = 0
+) -> List[str]:
+    """Write the runner parameters of a round and build its submission commands.
+
+    Parameters
+    ----------
+    array_config : ConfigModel
+        The parameters for the job array. The search strategy must be
+        "successive_halving".
+    config_path : str
+        The path to the config file. It is passed to the promotion job.
+    round_index : int
+        The index of the round to submit. The first round (0) runs a random
+        subset of n_samples combinations, the following rounds run the best
+        combinations of the previous round.
+
+    Returns
+    -------
+    commands : List[str]
+        The bsub commands of the job array of the round and, unless it is
+        the last round, of the promotion job of the next round.
+    """
+    if round_index == 0:
+        state = {"rounds": []}
+        flat_indices = _select_flat_indices(array_config)
+    else:
+        state = _load_state(array_config)
+        previous_round = state["rounds"][round_index - 1]
+        flat_indices = _promote(array_config, previous_round)
+        state["rounds"] = state["rounds"][:round_index]
+
+    budget = round_budget(array_config, round_index)
+    state["rounds"].append(
+        {"round": round_index, "budget": budget, "flat_indices": flat_indices}
+    )
+    _save_state(array_config, state)
+
+    round_config = _round_config(array_config, round_index)
+    runner_params_path = _runner_params_path(round_config)
+    n_jobs = _write_runner_params(
+        round_config,
+        runner_params_path,
+        flat_indices=flat_indices,
+        extra_params={array_config.search.budget_parameter: budget},
+    )
+    commands = _write_job_arrays(round_config, runner_params_path, n_jobs=n_jobs)
+
+    is_last_round = (budget >= array_config.search.max_budget) or (n_jobs <= 1)
+    if not is_last_round:
+        commands.append(
+            _write_promotion_job(array_config, config_path, round_index + 1)
+        )
+
+    return commands
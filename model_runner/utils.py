@@ -1,9 +1,26 @@
 import json
+import math
 import os
+from functools import partial
 from itertools import product
-from typing import Any, Dict, List, Tuple, Union
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
+from .constraints import filter_flat_indices
+from .params_store import (
+    COMPACT_SUFFIX,
+    GRID_SPEC_SUFFIX,
+    count_job_params,
+    iter_job_params,
+    unravel_grid_index,
+    write_compact_params,
+    write_grid_spec,
+    write_index_map,
+    write_indexed_params,
+)
+from .result_cache import cache_key, evict, file_hash, lookup, restore
+from .samplers import select_flat_indices
 from .validator import ConfigModel
+from .validator.validator_utils import JobArrayModel, StageModel, entrypoint_file, which
 
 
 def _create_runner_param(
@@ -27,19 +44,41 @@ def _create_runner_param(
     return params
 
 
-def _create_runner_params(
+def _iter_runner_params(
     job_params: Dict[str, List[Any]],
     job_prefix: str,
     runner: str,
     output_base_dir: str,
-) -> Dict[int, Dict[str, Any]]:
+    flat_indices: Optional[Iterable[int]] = None,
+    extra_params: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Lazily generate the (job_index, runner_params) of every job in the grid.
+
+    Only one combination of the parameter grid is held in memory at a time.
+    If flat_indices is given, only the combinations with these flat grid
+    indices (see model_runner.params_store.unravel_grid_index()) are
+    generated, in the given order. The extra_params are added to the
+    parameters of every job.
+    """
     param_names = list(job_params.keys())
     param_values = list(job_params.values())
 
-    param_combinations = product(*param_values)
+    if flat_indices is None:
+        param_combinations = product(*param_values)
+    else:
+        axis_sizes = [len(values) for values in param_values]
+        param_combinations = (
+            tuple(
+                values[i]
+                for values, i in zip(
+                    param_values, unravel_grid_index(flat_index, axis_sizes)
+                )
+            )
+            for flat_index in flat_indices
+        )
 
-    runner_params = {
-        i: _create_runner_param(
+    for i, values in enumerate(param_combinations, start=1):
+        params = _create_runner_param(
             param_names=param_names,
             param_values=values,
             job_prefix=job_prefix,
@@ -47,17 +86,111 @@ def _create_runner_params(
             output_base_dir=output_base_dir,
             job_index=i,
         )
-        for i, values in enumerate(param_combinations, start=1)
-    }
+        if extra_params is not None:
+            params.update(extra_params)
+        yield i, params
+
+
+def _create_runner_params(
+    job_params: Dict[str, List[Any]],
+    job_prefix: str,
+    runner: str,
+    output_base_dir: str,
+) -> Dict[int, Dict[str, Any]]:
+    runner_params = dict(
+        _iter_runner_params(
+            job_params,
+            job_prefix=job_prefix,
+            runner=runner,
+            output_base_dir=output_base_dir,
+        )
+    )
 
     return runner_params
 
 
+def _stream_json_export(
+    runner_params: Iterator[Tuple[int, Dict[str, Any]]], f_out: IO[str]
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Write the runner params to f_out as a JSON object while passing them on.
+
+    Each job is written on its own line as soon as it is generated, so the
+    export does not need the full grid in memory.
+    """
+    separator = "\n"
+    f_out.write("{")
+    for job_index, params in runner_params:
+        f_out.write(f'{separator}"{job_index}": {json.dumps(params)}')
+        separator = ",\n"
+        yield job_index, params
+    f_out.write("\n}\n")
+
+
+def _select_flat_indices(array_config: ConfigModel) -> Optional[Iterable[int]]:
+    """Select the combinations of the parameter grid to run with the search strategy.
+
+    Returns the flat grid indices of the selected combinations or None
+    if all combinations are run. For "successive_halving", the combinations
+    of the first round are selected at random. Combinations that violate
+    the exclude rules or conditional_axes of the array_config are left out
+    (see model_runner.constraints), so a sampler may end up with fewer
+    than n_samples combinations. The indices of a constrained grid are
+    generated lazily.
+    """
+    search = array_config.search
+    axis_sizes = [len(values) for values in array_config.runner_parameters.values()]
+    strategy = "random" if search.strategy == "successive_halving" else search.strategy
+
+    flat_indices = select_flat_indices(
+        strategy, axis_sizes, n_samples=search.n_samples, seed=search.seed
+    )
+    if len(array_config.exclude) == 0 and len(array_config.conditional_axes) == 0:
+        return flat_indices
+
+    valid_flat_indices = filter_flat_indices(
+        array_config.runner_parameters,
+        exclude=array_config.exclude,
+        conditional_axes=array_config.conditional_axes,
+        flat_indices=flat_indices,
+    )
+
+    return valid_flat_indices if flat_indices is None else list(valid_flat_indices)
+
+
+def _runner_params_path(array_config: ConfigModel) -> str:
+    """Get the path of the runner parameters store of a job array.
+
+    The extension of the file encodes the format of the store
+    (see model_runner.params_store).
+    """
+    if array_config.runner_params_format == "grid":
+        extension = GRID_SPEC_SUFFIX
+    elif array_config.runner_params_format == "compact":
+        extension = COMPACT_SUFFIX
+    else:
+        extension = ".jsonl"
+    runner_params_fname = f"{array_config.job_prefix}_runner_parameters{extension}"
+
+    return os.path.join(array_config.output_base_dir, runner_params_fname)
+
+
 def _write_runner_params(
-    array_config: ConfigModel, output_path: Union[str, os.PathLike]
-):
+    array_config: ConfigModel,
+    output_path: Union[str, os.PathLike],
+    json_export_path: Optional[Union[str, os.PathLike]] = None,
+    flat_indices: Optional[Iterable[int]] = None,
+    extra_params: Optional[Dict[str, Any]] = None,
+) -> int:
     """Write the parameters file for the job array runners to disk
 
+    The parameters are written to an indexed store or, if
+    array_config.runner_params_format is "grid" or "compact", to a grid
+    spec or a compact store (see model_runner.params_store) so that each job of the array only has to
+    read its own parameters. The parameter grid is generated and written
+    lazily, so the memory usage does not grow with the size of the grid.
+    Only the combinations selected by the search strategy of the array_config
+    (see _select_flat_indices()) are written.
+
     Parameters
     ----------
     array_config : ConfigModel
@@ -68,21 +201,200 @@ def _write_runner_params(
 
     output_path : os.PathLike
         The path to the file to save the job array parameters to.
-        Should have the extension .json.
+        Should have the extension .jsonl (.grid.json for grid specs and
+        .compact for compact stores).
+
+    json_export_path : Optional[os.PathLike]
+        If set, the job array parameters are additionally exported to this
+        path as a human readable JSON file. Should have the extension .json.
+        Grid specs are human readable and are not exported.
+
+    flat_indices : Optional[Iterable[int]]
+        The flat grid indices of the combinations to write. If None, they
+        are selected with the search strategy of the array_config.
+
+    extra_params : Optional[Dict[str, Any]]
+        Parameters that are added to the parameters of every job.
+
+    Returns
+    -------
+    n_jobs : int
+        The number of jobs in the job array.
     """
     job_params = array_config.runner_parameters
-    runner_params = _create_runner_params(
+    if flat_indices is None:
+        flat_indices = _select_flat_indices(array_config)
+
+    # the parameters that are shared by all jobs
+    constants = {
+        "job_prefix": array_config.job_prefix,
+        "runner": array_config.runner,
+        "output_base_dir": array_config.output_base_dir,
+    }
+    if extra_params is not None:
+        constants.update(extra_params)
+
+    if array_config.runner_params_format == "grid":
+        return write_grid_spec(
+            job_params,
+            constants=constants,
+            store_path=output_path,
+            flat_indices=flat_indices,
+        )
+
+    runner_params = _iter_runner_params(
         job_params,
         job_prefix=array_config.job_prefix,
         runner=array_config.runner,
         output_base_dir=array_config.output_base_dir,
+        flat_indices=flat_indices,
+        extra_params=extra_params,
     )
 
-    with open(output_path, "w") as f_out:
-        json.dump(runner_params, f_out, indent=4, sort_keys=True)
+    if array_config.runner_params_format == "compact":
+        write_params = partial(
+            write_compact_params,
+            constants=constants,
+            compression=array_config.runner_params_compression,
+        )
+    else:
+        write_params = write_indexed_params
+
+    if json_export_path is None:
+        return write_params(
+            (params for _, params in runner_params), store_path=output_path
+        )
+
+    with open(json_export_path, "w") as f_out:
+        return write_params(
+            (params for _, params in _stream_json_export(runner_params, f_out)),
+            store_path=output_path,
+        )
+
+
+def _runner_hash(array_config: ConfigModel) -> str:
+    """Compute the hash of the content of the runner of a job array."""
+    if array_config.runner_type == "python_entrypoint":
+        return file_hash(entrypoint_file(array_config.runner))
+    return file_hash(which(array_config.runner))
 
 
-def _write_job_array(array_config: ConfigModel, runner_params_path: str) -> str:
+def _restore_cached_results(
+    array_config: ConfigModel,
+    runner_params_path: str,
+    skip_jobs: Optional[Set[int]] = None,
+) -> List[int]:
+    """Restore the results of jobs that are in the result cache.
+
+    Expired entries are evicted from the cache first. The results of a job
+    are only restored if its output directory does not exist yet.
+
+    Parameters
+    ----------
+    array_config : ConfigModel
+        The parameters for the job array. array_config.result_cache must be set.
+
+    runner_params_path: str
+        Path to the runner parameters store.
+
+    skip_jobs: Optional[Set[int]]
+        The indices of jobs that should not be restored (e.g., because they
+        already completed).
+
+    Returns
+    -------
+    cached_jobs : List[int]
+        The indices of the jobs whose results were restored from the cache.
+    """
+    result_cache = array_config.result_cache
+    evict(
+        result_cache.cache_dir,
+        max_size=None
+        if result_cache.max_size is None
+        else result_cache.max_size * 1024**2,
+        max_age=None if result_cache.max_age is None else result_cache.max_age * 86400,
+    )
+
+    runner_hash = _runner_hash(array_config)
+    skip_jobs = set() if skip_jobs is None else skip_jobs
+    cached_jobs = []
+    for params in iter_job_params(runner_params_path):
+        job_index = params["job_index"]
+        output_dir = f"{params['output_base_dir']}{params['job_prefix']}{job_index}"
+        if job_index in skip_jobs or os.path.lexists(output_dir):
+            continue
+
+        entry_path = lookup(result_cache.cache_dir, cache_key(params, runner_hash))
+        if entry_path is not None:
+            restore(entry_path, output_dir, link=result_cache.link)
+            cached_jobs.append(job_index)
+
+    return cached_jobs
+
+
+def _format_array_indices(indices: Iterable[int]) -> str:
+    """Format job array indices with the LSF index list syntax (e.g., "1,4,7-9")."""
+    ranges = []
+    for index in sorted(set(indices)):
+        if ranges and index == ranges[-1][1] + 1:
+            ranges[-1][1] = index
+        else:
+            ranges.append([index, index])
+
+    return ",".join(
+        str(start) if start == stop else f"{start}-{stop}" for start, stop in ranges
+    )
+
+
+def _array_indices_of_jobs(job_indices: Iterable[int], pack_size: int) -> List[int]:
+    """Get the job array elements that run the given jobs."""
+    return sorted({(job_index - 1) // pack_size + 1 for job_index in job_indices})
+
+
+def _resource_options(job_parameters: JobArrayModel) -> str:
+    """Write the bsub options of the resource requests of a job."""
+    memory = job_parameters.memory
+    processor_cores = job_parameters.processor_cores
+    run_time = job_parameters.run_time
+    scratch = job_parameters.scratch
+    ngpus = job_parameters.ngpus
+    gpu_type = job_parameters.gpu_type
+
+    resource_options = f' -W "{run_time}"'
+    resource_options += f' -n "{processor_cores}"'
+
+    if ngpus is None:
+        resource_options += f' -R "rusage[scratch={scratch}, mem={memory}]"'
+    else:
+        resource_options += (
+            f' -R "rusage[scratch={scratch}, mem={memory}, ngpus_excl_p={ngpus}]"'
+        )
+
+    if gpu_type is not None:
+        resource_options += f' -R "select[gpu_model0=={gpu_type}]"'
+
+        # currently specifiers for RTX2080Ti specifiers vary depending on the GPU driver version. Furthermore,
+        # both old an new GPU drivers are currently installed on euler
+        # (see https://scicomp.ethz.ch/wiki/Change_of_GPU_specifiers_in_the_batch_system).
+        if gpu_type == "NVIDIAGeForceRTX2080Ti":
+            resource_options += ' -R "select[gpu_driver>460]"'
+        elif gpu_type == "GeForceRTX2080Ti":
+            resource_options += ' -R "select[gpu_driver<460]"'
+
+    return resource_options
+
+
+def _write_job_array(
+    array_config: ConfigModel,
+    runner_params_path: str,
+    n_jobs: Optional[int] = None,
+    array_indices: Optional[Iterable[int]] = None,
+    skip_completed: bool = False,
+    profile_index: Optional[int] = None,
+    stage: Optional[StageModel] = None,
+    dependency: Optional[str] = None,
+    chunk_index: Optional[int] = None,
+) -> str:
     """
     Write job array command as defined in https://github.com/kevinyamauchi/model-runner/issues/7.
 
@@ -96,53 +408,481 @@ def _write_job_array(array_config: ConfigModel, runner_params_path: str) -> str:
         the combinations of all of the parameters.
 
     runner_params_path: str
-        Path to runner dictionary.
+        Path to the runner parameters store.
+
+    n_jobs: Optional[int]
+        The number of jobs in the job array as returned by _write_runner_params().
+        If None, it is read from the runner parameters store.
+
+    array_indices: Optional[Iterable[int]]
+        The indices of the job array elements to submit. If None,
+        all elements are submitted.
+
+    skip_completed: bool
+        If True, the dispatcher skips jobs that already completed
+        successfully according to the ledger (see model_runner.ledger).
+
+    profile_index: Optional[int]
+        The index of the resource profile if the job array only runs the
+        jobs of one resource profile (see _write_job_arrays()). Its elements
+        are mapped to the jobs with the index map of the profile and its
+        logs are named {job_prefix}_p{profile_index}_{index}.
+
+    stage: Optional[StageModel]
+        The one_to_one pipeline stage that is run by the job array instead of
+        the runner of the config (see _write_pipeline()). The job array is
+        named {job_prefix}_{stage.name} and its dispatcher runs the runner of
+        the stage with the parameters of the jobs.
+
+    dependency: Optional[str]
+        The LSF dependency condition of the job array (bsub -w).
+
+    chunk_index: Optional[int]
+        The index of the chunk if the job array only runs one chunk of
+        max_array_size elements of a larger job array (see _job_array_specs()).
+        Its array_indices are relative to the chunk, the dispatcher adds
+        chunk_index * max_array_size to them, and its logs are named
+        {job_prefix}_c{chunk_index}_{index}.
 
     Return
     ------
     Job array str formated as in https://github.com/kevinyamauchi/model-runner/issues/7.
     """
-    job_prefix = array_config.job_prefix
-    logfile_dir = os.path.join(array_config.job_parameters.logfile_dir, job_prefix)
-    memory = array_config.job_parameters.memory
+    job_name = array_config.job_prefix
+    logfile_dir = os.path.join(array_config.job_parameters.logfile_dir, job_name)
+    if stage is not None:
+        job_name += f"_{stage.name}"
+        logfile_dir += f"_{stage.name}"
     njobs_parallel = array_config.job_parameters.njobs_parallel
-    processor_cores = array_config.job_parameters.processor_cores
-    run_time = array_config.job_parameters.run_time
-    scratch = array_config.job_parameters.scratch
-    ngpus = array_config.job_parameters.ngpus
-    gpu_type = array_config.job_parameters.gpu_type
+    pack_size = array_config.job_parameters.pack_size
+    pack_workers = array_config.job_parameters.pack_workers
 
-    with open(runner_params_path, "r") as f:
-        runner_params = json.load(f)
+    if n_jobs is None:
+        n_jobs = count_job_params(runner_params_path)
 
-    n_ids = len(runner_params)
+    # each element of the job array runs a pack of pack_size jobs
+    if array_indices is None:
+        array_indices = range(1, math.ceil(n_jobs / pack_size) + 1)
+    index_list = _format_array_indices(array_indices)
 
     # write command str
-    job_array_command = f'bsub -J "{job_prefix}[1-{n_ids}]%{njobs_parallel}"'
-    job_array_command += f' -o "{logfile_dir}%I"'
-    job_array_command += f' -W "{run_time}"'
-    job_array_command += f' -n "{processor_cores}"'
-
-    if ngpus is None:
-        job_array_command += f' -R "rusage[scratch={scratch}, mem={memory}]"'
+    job_array_command = f'bsub -J "{job_name}[{index_list}]%{njobs_parallel}"'
+    if dependency is not None:
+        job_array_command += f' -w "{dependency}"'
+    if profile_index is not None:
+        logfile_dir += f"_p{profile_index}"
+    if chunk_index is not None:
+        logfile_dir += f"_c{chunk_index}"
+    if stage is None and profile_index is None and chunk_index is None:
+        job_array_command += f' -o "{logfile_dir}%I"'
     else:
-        job_array_command += (
-            f' -R "rusage[scratch={scratch}, mem={memory}, ngpus_excl_p={ngpus}]"'
+        job_array_command += f' -o "{logfile_dir}_%I"'
+    job_array_command += _resource_options(array_config.job_parameters)
+    if stage is None and array_config.requeue is not None:
+        requeue = array_config.requeue
+        job_array_command += f' -wa "{requeue.signal}" -wt "{requeue.warning_time}"'
+        job_array_command += f' -Q "{requeue.exit_code}"'
+
+    dispatcher_command = "model_dispatcher --job_id \\$LSB_JOBINDEX"
+    if chunk_index is not None and chunk_index > 0:
+        index_offset = chunk_index * array_config.job_parameters.max_array_size
+        dispatcher_command += f" --index_offset {index_offset}"
+    dispatcher_command += f" --params {runner_params_path}"
+    if pack_size > 1:
+        dispatcher_command += f" --pack_size {pack_size} --pack_workers {pack_workers}"
+    if skip_completed:
+        dispatcher_command += " --skip_completed"
+    if profile_index is not None:
+        dispatcher_command += (
+            f" --index_map {_index_map_path(array_config, profile_index)}"
         )
+    if stage is not None:
+        # stages run scripts, their results are not cached
+        dispatcher_command += f" --runner {stage.runner} --stage {stage.name}"
+    elif array_config.runner_type == "python_entrypoint":
+        dispatcher_command += " --entrypoint"
+    if stage is None and len(array_config.preload_modules) > 0:
+        dispatcher_command += f" --preload {','.join(array_config.preload_modules)}"
+    if stage is None and array_config.early_stopping is not None:
+        early_stopping = array_config.early_stopping
+        dispatcher_command += f" --stop_metric {early_stopping.metric}"
+        dispatcher_command += f" --stop_threshold {early_stopping.threshold}"
+        dispatcher_command += f" --stop_mode {early_stopping.mode}"
+        dispatcher_command += f" --metrics_file {early_stopping.metrics_file}"
+    if stage is None and array_config.requeue is not None:
+        requeue = array_config.requeue
+        dispatcher_command += f" --requeue_signal {requeue.signal}"
+        dispatcher_command += f" --requeue_exit_code {requeue.exit_code}"
+        dispatcher_command += f" --max_requeues {requeue.max_requeues}"
+    if array_config.data_staging:
+        dispatcher_command += " --stage_data"
+    if stage is None and array_config.result_cache is not None:
+        dispatcher_command += f" --result_cache {array_config.result_cache.cache_dir}"
+        dispatcher_command += f" --runner_hash {_runner_hash(array_config)}"
+    job_array_command += f' "{dispatcher_command}"'
 
-    if gpu_type is not None:
-        job_array_command += f' -R "select[gpu_model0=={gpu_type}]"'
+    return job_array_command
 
-        # currently specifiers for RTX2080Ti specifiers vary depending on the GPU driver version. Furthermore,
-        # both old an new GPU drivers are currently installed on euler
-        # (see https://scicomp.ethz.ch/wiki/Change_of_GPU_specifiers_in_the_batch_system).
-        if gpu_type == "NVIDIAGeForceRTX2080Ti":
-            job_array_command += ' -R "select[gpu_driver>460]"'
-        elif gpu_type == "GeForceRTX2080Ti":
-            job_array_command += ' -R "select[gpu_driver<460]"'
 
-    job_array_command += (
-        f' "model_dispatcher --job_id \\$LSB_JOBINDEX --params {runner_params_path}"'
+def _index_map_path(array_config: ConfigModel, profile_index: int) -> str:
+    """Get the path of the index map of the job array of a resource profile."""
+    return os.path.join(
+        array_config.output_base_dir,
+        f"{array_config.job_prefix}_profile{profile_index}.idx",
     )
 
-    return job_array_command
+
+def _resource_profiles(
+    array_config: ConfigModel, runner_params_path: str
+) -> List[Tuple[JobArrayModel, List[int]]]:
+    """Group the jobs by their resource requests after applying the resource_overrides.
+
+    Parameters
+    ----------
+    array_config : ConfigModel
+        The parameters for the job array.
+
+    runner_params_path: str
+        Path to the runner parameters store.
+
+    Returns
+    -------
+    profiles : List[Tuple[JobArrayModel, List[int]]]
+        The job_parameters of each distinct combination of resource requests
+        and the indices of its jobs, in the order of their first job.
+    """
+    profiles = {}
+    for params in iter_job_params(runner_params_path):
+        overrides = {}
+        for rule in array_config.resource_overrides:
+            if all(params.get(k) in values for k, values in rule.when.items()):
+                overrides.update(rule.job_parameters)
+        profile_key = json.dumps(overrides, sort_keys=True)
+        if profile_key not in profiles:
+            profiles[profile_key] = (
+                array_config.job_parameters.copy(update=overrides),
+                [],
+            )
+        profiles[profile_key][1].append(params["job_index"])
+
+    return list(profiles.values())
+
+
+def _split_njobs_parallel(njobs_parallel: int, chunk_sizes: List[int]) -> List[int]:
+    """Split the limit of concurrently running elements across chunks by their size.
+
+    Every chunk may run at least one element.
+    """
+    n_elements = sum(chunk_sizes)
+    limits = []
+    previous_share = 0
+    n_chunk_elements = 0
+    for chunk_size in chunk_sizes:
+        n_chunk_elements += chunk_size
+        share = round(njobs_parallel * n_chunk_elements / n_elements)
+        limits.append(max(1, share - previous_share))
+        previous_share = share
+
+    return limits
+
+
+def _split_job_array_spec(
+    spec: Dict[str, Any], runner_params_path: str
+) -> List[Dict[str, Any]]:
+    """Split the arguments of a job array that exceeds max_array_size into chunks.
+
+    Each chunk runs at most max_array_size consecutive elements of the job
+    array with the relative indices 1 to max_array_size (see the chunk_index
+    of _write_job_array()), because LSF rejects array indices above its
+    MAX_JOB_ARRAY_SIZE. The njobs_parallel of the job array is split
+    across the chunks.
+    """
+    job_parameters = spec["array_config"].job_parameters
+    max_array_size = job_parameters.max_array_size
+    array_indices = spec.get("array_indices")
+    if array_indices is None:
+        n_jobs = spec["n_jobs"]
+        if n_jobs is None:
+            n_jobs = count_job_params(runner_params_path)
+        array_indices = range(1, math.ceil(n_jobs / job_parameters.pack_size) + 1)
+    if max_array_size is None or max(array_indices, default=0) <= max_array_size:
+        return [spec]
+
+    chunks = {}
+    for index in array_indices:
+        chunk_index = (index - 1) // max_array_size
+        chunks.setdefault(chunk_index, []).append(index - chunk_index * max_array_size)
+    limits = _split_njobs_parallel(
+        job_parameters.njobs_parallel, [len(indices) for indices in chunks.values()]
+    )
+
+    return [
+        {
+            **spec,
+            "array_config": spec["array_config"].copy(
+                update={
+                    "job_parameters": job_parameters.copy(
+                        update={"njobs_parallel": limit}
+                    )
+                }
+            ),
+            "array_indices": indices,
+            "chunk_index": chunk_index,
+        }
+        for (chunk_index, indices), limit in zip(chunks.items(), limits)
+    ]
+
+
+def _job_array_specs(
+    array_config: ConfigModel,
+    runner_params_path: str,
+    n_jobs: Optional[int] = None,
+    pending_jobs: Optional[Iterable[int]] = None,
+) -> List[Dict[str, Any]]:
+    """Get the arguments of _write_job_array() of each job array of a sweep.
+
+    See _write_job_arrays() for the parameters. The index maps of the
+    resource profiles are written as well. Job arrays with more than
+    max_array_size elements are split into chunks (see _split_job_array_spec()).
+    """
+    return [
+        chunk_spec
+        for spec in _profile_job_array_specs(
+            array_config, runner_params_path, n_jobs=n_jobs, pending_jobs=pending_jobs
+        )
+        for chunk_spec in _split_job_array_spec(spec, runner_params_path)
+    ]
+
+
+def _profile_job_array_specs(
+    array_config: ConfigModel,
+    runner_params_path: str,
+    n_jobs: Optional[int] = None,
+    pending_jobs: Optional[Iterable[int]] = None,
+) -> List[Dict[str, Any]]:
+    """Get the arguments of _write_job_array() of the job array of each resource profile."""
+    pack_size = array_config.job_parameters.pack_size
+    profiles = []
+    if len(array_config.resource_overrides) > 0:
+        profiles = _resource_profiles(array_config, runner_params_path)
+
+    if len(profiles) <= 1:
+        if len(profiles) == 1:
+            array_config = array_config.copy(update={"job_parameters": profiles[0][0]})
+        array_indices = None
+        if pending_jobs is not None:
+            array_indices = _array_indices_of_jobs(pending_jobs, pack_size)
+        return [
+            {
+                "array_config": array_config,
+                "n_jobs": n_jobs,
+                "array_indices": array_indices,
+            }
+        ]
+
+    pending_jobs = None if pending_jobs is None else set(pending_jobs)
+    specs = []
+    for profile_index, (job_parameters, job_indices) in enumerate(profiles):
+        write_index_map(_index_map_path(array_config, profile_index), job_indices)
+
+        array_indices = None
+        if pending_jobs is not None:
+            # the positions of the pending jobs in the index map
+            positions = [
+                position
+                for position, job_index in enumerate(job_indices, start=1)
+                if job_index in pending_jobs
+            ]
+            if len(positions) == 0:
+                continue
+            array_indices = _array_indices_of_jobs(positions, pack_size)
+
+        specs.append(
+            {
+                "array_config": array_config.copy(
+                    update={"job_parameters": job_parameters}
+                ),
+                "n_jobs": len(job_indices),
+                "array_indices": array_indices,
+                "profile_index": profile_index,
+            }
+        )
+
+    return specs
+
+
+def _write_job_arrays(
+    array_config: ConfigModel,
+    runner_params_path: str,
+    n_jobs: Optional[int] = None,
+    pending_jobs: Optional[Iterable[int]] = None,
+    skip_completed: bool = False,
+) -> List[str]:
+    """Write the job array commands of a sweep, one per resource profile.
+
+    Without resource_overrides, all jobs are run by a single job array (see
+    _write_job_array()). Otherwise, the jobs are grouped by their resource
+    requests and each group is run by its own job array with the same job
+    name, whose elements are mapped to the jobs of the group with an index
+    map (see model_runner.params_store.write_index_map()). Job arrays with
+    more elements than job_parameters.max_array_size are split into
+    several job arrays with the same job name.
+
+    Parameters
+    ----------
+    array_config : ConfigModel
+        The parameters for the job array.
+
+    runner_params_path: str
+        Path to the runner parameters store.
+
+    n_jobs: Optional[int]
+        The number of jobs as returned by _write_runner_params().
+        If None, it is read from the runner parameters store.
+
+    pending_jobs: Optional[Iterable[int]]
+        The indices of the jobs to run. If None, all jobs are run.
+
+    skip_completed: bool
+        If True, the dispatcher skips jobs that already completed
+        successfully according to the ledger (see model_runner.ledger).
+
+    Returns
+    -------
+    job_array_commands : List[str]
+        The bsub commands of the job arrays.
+    """
+    return [
+        _write_job_array(
+            runner_params_path=runner_params_path, skip_completed=skip_completed, **spec
+        )
+        for spec in _job_array_specs(
+            array_config, runner_params_path, n_jobs=n_jobs, pending_jobs=pending_jobs
+        )
+    ]
+
+
+def _write_aggregate_job(
+    array_config: ConfigModel,
+    runner_params_path: str,
+    stage: StageModel,
+    dependency: str,
+) -> str:
+    """Write the command of the single job of an aggregate pipeline stage.
+
+    The runner of the stage is called with the arguments --output_base_dir,
+    --job_prefix and --runner_params (the path to the runner parameters
+    store of the sweep, see model_runner.params_store.iter_job_params()).
+    """
+    job_prefix = array_config.job_prefix
+    logfile_dir = os.path.join(array_config.job_parameters.logfile_dir, job_prefix)
+    job_parameters = array_config.job_parameters.copy(update=stage.job_parameters)
+
+    aggregate_command = f'bsub -J "{job_prefix}_{stage.name}"'
+    aggregate_command += f' -w "{dependency}"'
+    aggregate_command += f' -o "{logfile_dir}_{stage.name}"'
+    aggregate_command += _resource_options(job_parameters)
+
+    runner_command = f"python {stage.runner}" if ".py" in stage.runner else stage.runner
+    runner_command += f" --output_base_dir {array_config.output_base_dir}"
+    runner_command += f" --job_prefix {job_prefix}"
+    runner_command += f" --runner_params {runner_params_path}"
+    aggregate_command += f' "{runner_command}"'
+
+    return aggregate_command
+
+
+def _write_pipeline(
+    array_config: ConfigModel,
+    runner_params_path: str,
+    n_jobs: Optional[int] = None,
+    pending_jobs: Optional[Iterable[int]] = None,
+    skip_completed: bool = False,
+) -> List[str]:
+    """Write the commands of the job arrays of a sweep and of its pipeline stages.
+
+    The stages are chained in their order, the first stage depends on the
+    job arrays of the sweep (see _write_job_arrays()). A one_to_one stage is
+    run by one job array per job array of the previous stage, with the same
+    elements. Each element waits for the same element of the previous
+    stage (bsub -w "ended(<job ID>[*])"), so the stage of a job starts as
+    soon as the job ended. The previous job arrays are referenced by
+    the placeholder <job_id:{position}> of their position in the returned
+    commands, which model_runner.submitter.submit_jobs() replaces with
+    their job ID. An aggregate stage is run by a single job that waits for
+    all job arrays of the previous stage (bsub -w "done(<job ID>) && ...").
+    Unlike a dependency on the job name, it does not match the jobs of an
+    earlier sweep with the same job prefix.
+
+    Parameters
+    ----------
+    array_config : ConfigModel
+        The parameters for the job array.
+
+    runner_params_path: str
+        Path to the runner parameters store.
+
+    n_jobs: Optional[int]
+        The number of jobs as returned by _write_runner_params().
+        If None, it is read from the runner parameters store.
+
+    pending_jobs: Optional[Iterable[int]]
+        The indices of the jobs to run. If None, all jobs are run.
+
+    skip_completed: bool
+        If True, the dispatchers skip jobs that already completed
+        successfully according to the ledger of their stage.
+
+    Returns
+    -------
+    commands : List[str]
+        The bsub commands in the order in which they have to be submitted.
+    """
+    specs = _job_array_specs(
+        array_config, runner_params_path, n_jobs=n_jobs, pending_jobs=pending_jobs
+    )
+    commands = [
+        _write_job_array(
+            runner_params_path=runner_params_path, skip_completed=skip_completed, **spec
+        )
+        for spec in specs
+    ]
+
+    previous_positions = list(range(len(commands)))
+    for stage in array_config.stages:
+        if stage.mode == "one_to_one":
+            positions = []
+            for spec, previous_position in zip(specs, previous_positions):
+                stage_parameters = spec["array_config"].job_parameters.copy(
+                    update=stage.job_parameters
+                )
+                stage_spec = {
+                    **spec,
+                    "array_config": spec["array_config"].copy(
+                        update={"job_parameters": stage_parameters}
+                    ),
+                }
+                positions.append(len(commands))
+                commands.append(
+                    _write_job_array(
+                        runner_params_path=runner_params_path,
+                        skip_completed=skip_completed,
+                        stage=stage,
+                        dependency=f"{stage.condition}(<job_id:{previous_position}>[*])",
+                        **stage_spec,
+                    )
+                )
+            previous_positions = positions
+        else:
+            dependency = " && ".join(
+                f"{stage.condition}(<job_id:{previous_position}>)"
+                for previous_position in previous_positions
+            )
+            previous_positions = [len(commands)]
+            commands.append(
+                _write_aggregate_job(
+                    array_config, runner_params_path, stage, dependency=dependency
+                )
+            )
+
+    return commands
@@ -0,0 +1,69 @@
+import os
+
+from model_runner.validator import path_cache
+from model_runner.validator.path_cache import DIR, FILE, PathKindCache
+
+
+def _make_tree(tmp_path):
+    (tmp_path / "data").mkdir()
+    for i in range(5):
+        (tmp_path / "data" / f"image_{i}.tif").touch()
+    (tmp_path / "data" / "nested").mkdir()
+    os.symlink(tmp_path / "data" / "nested", tmp_path / "data" / "link")
+    (tmp_path / "single.txt").touch()
+
+
+def test_path_kind_cache(tmp_path):
+    _make_tree(tmp_path)
+    data_dir = (tmp_path / "data").as_posix()
+    paths = [f"{data_dir}/image_{i}.tif" for i in range(5)] + [
+        f"{data_dir}/nested",
+        f"{data_dir}/link",
+        f"{data_dir}/missing.tif",
+        f"{data_dir}/nested/",
+        f"{data_dir}/image_0.tif/",
+        (tmp_path / "single.txt").as_posix(),
+        (tmp_path / "missing_dir" / "missing.tif").as_posix(),
+    ]
+
+    kinds = PathKindCache().kinds(paths)
+
+    assert kinds == dict(
+        zip(
+            paths,
+            [FILE] * 5 + [DIR, DIR, None, DIR, None, FILE, None],
+        )
+    )
+
+
+def test_path_kind_cache_batching(tmp_path, monkeypatch):
+    _make_tree(tmp_path)
+    data_dir = (tmp_path / "data").as_posix()
+    paths = [f"{data_dir}/image_{i}.tif" for i in range(5)]
+
+    calls = {"scandir": 0, "stat": 0}
+    scandir, stat = os.scandir, os.stat
+
+    def _scandir(*args, **kwargs):
+        calls["scandir"] += 1
+        return scandir(*args, **kwargs)
+
+    def _stat(*args, **kwargs):
+        calls["stat"] += 1
+        return stat(*args, **kwargs)
+
+    monkeypatch.setattr(path_cache.os, "scandir", _scandir)
+    monkeypatch.setattr(path_cache.os, "stat", _stat)
+    cache = PathKindCache()
+
+    # all paths of a directory are resolved with one scandir
+    assert set(cache.kinds(paths).values()) == {FILE}
+    assert calls == {"scandir": 1, "stat": 0}
+
+    # and then memoized until the cache is cleared
+    assert cache.kind(paths[0]) == FILE
+    assert calls == {"scandir": 1, "stat": 0}
+
+    cache.clear()
+    assert cache.kind(paths[0]) == FILE
+    assert calls == {"scandir": 1, "stat": 1}
@@ -38,6 +38,51 @@ def test_good_config(base_config):
     ), '"gpu_type" should be None.'
     assert config.dict()["job_parameters"]["ngpus"] is None, '"ngpus" should be None.'
 
+    # test resource_overrides
+    override_config = copy.deepcopy(base_config)
+    override_config["resource_overrides"] = [
+        {"when": {"batch_size": [32]}, "job_parameters": {"run_time": "4:00"}}
+    ]
+
+    config = ConfigModel(**override_config)
+    assert config.resource_overrides[0].job_parameters == {"run_time": 240}
+
+    # test resource_overrides of cpu config
+    override_config["job_parameters"] = cpu_config["job_parameters"]
+
+    config = ConfigModel(**override_config)
+    assert config.resource_overrides[0].job_parameters == {"run_time": 240}
+
+    # test python entrypoint runner
+    entrypoint_config = copy.deepcopy(base_config)
+    entrypoint_config["runner_type"] = "python_entrypoint"
+    entrypoint_config["runner"] = "json:dumps"
+
+    config = ConfigModel(**entrypoint_config)
+    assert config.runner == "json:dumps"
+
+    # test pipeline stages
+    stage_config = copy.deepcopy(base_config)
+    stage_config["stages"] = [
+        {
+            "name": "evaluate",
+            "runner": base_config["runner"],
+            "job_parameters": {"run_time": "0:30", "ngpus": 1},
+        },
+        {"name": "aggregate", "runner": base_config["runner"], "mode": "aggregate"},
+    ]
+
+    config = ConfigModel(**stage_config)
+    assert config.stages[0].job_parameters == {"run_time": 30, "ngpus": 1}
+    assert [stage.condition for stage in config.stages] == ["ended", "done"]
+
+    # test pipeline stages of cpu config
+    stage_config["job_parameters"] = cpu_config["job_parameters"]
+    stage_config["stages"][0]["job_parameters"] = {"run_time": "0:30"}
+
+    config = ConfigModel(**stage_config)
+    assert config.stages[0].job_parameters == {"run_time": 30}
+
 
 def test_bad_configs(base_config):
     # test gpu_type
@@ -60,6 +105,19 @@ def test_bad_configs(base_config):
     bad_config["job_parameters"].pop("run_time")
     bad_config["job_parameters"]["run_time"] = "3:120"
 
+    with pytest.raises(ValidationError):
+        _ = ConfigModel(**bad_config)
+
+    # test pack_size and pack_workers
+    bad_config = copy.deepcopy(base_config)
+    bad_config["job_parameters"]["pack_size"] = 0
+
+    with pytest.raises(ValidationError):
+        _ = ConfigModel(**bad_config)
+
+    bad_config = copy.deepcopy(base_config)
+    bad_config["job_parameters"]["pack_workers"] = 32
+
     with pytest.raises(ValidationError):
         _ = ConfigModel(**bad_config)
 
@@ -75,6 +133,43 @@ def test_bad_configs(base_config):
     with pytest.raises(ValidationError):
         _ = ConfigModel(**bad_config)
 
+    # test runner_params_format
+    bad_config = copy.deepcopy(base_config)
+    bad_config["runner_params_format"] = "yaml"
+
+    with pytest.raises(ValidationError):
+        _ = ConfigModel(**bad_config)
+
+    # test runner_params_compression
+    for runner_params_format, compression in [("indexed", "gzip"), ("compact", "lzma")]:
+        bad_config = copy.deepcopy(base_config)
+        bad_config["runner_params_format"] = runner_params_format
+        bad_config["runner_params_compression"] = compression
+
+        with pytest.raises(ValidationError):
+            _ = ConfigModel(**bad_config)
+
+    # test search
+    bad_search_configs = [
+        {"strategy": "bayesian", "n_samples": 4},
+        {"strategy": "random"},
+        {"strategy": "successive_halving", "n_samples": 4, "metric": "loss"},
+        {
+            "strategy": "successive_halving",
+            "n_samples": 4,
+            "budget_parameter": "epochs",
+            "min_budget": 10,
+            "max_budget": 1,
+            "metric": "loss",
+        },
+    ]
+    for search in bad_search_configs:
+        bad_config = copy.deepcopy(base_config)
+        bad_config["search"] = search
+
+        with pytest.raises(ValidationError):
+            _ = ConfigModel(**bad_config)
+
     # test runner
     bad_config = copy.deepcopy(base_config)
     bad_config.pop("runner")
@@ -82,3 +177,174 @@ def test_bad_configs(base_config):
 
     with pytest.raises(ValidationError):
         _ = ConfigModel(**bad_config)
+
+    # test python entrypoint runner
+    for runner in ["json", "json:", "no_such_module:main", "json.no_such_module:main"]:
+        bad_config = copy.deepcopy(base_config)
+        bad_config["runner_type"] = "python_entrypoint"
+        bad_config["runner"] = runner
+
+        with pytest.raises(ValidationError):
+            _ = ConfigModel(**bad_config)
+
+    bad_config = copy.deepcopy(base_config)
+    bad_config["runner_type"] = "python_entrypoint"
+    bad_config["runner"] = "json:dumps"
+    bad_config["job_parameters"]["pack_workers"] = 2
+
+    with pytest.raises(ValidationError):
+        _ = ConfigModel(**bad_config)
+
+    # test preload_modules
+    bad_config = copy.deepcopy(base_config)
+    bad_config["preload_modules"] = ["json", "no_such_module"]
+
+    with pytest.raises(ValidationError):
+        _ = ConfigModel(**bad_config)
+
+    # test runner_type
+    bad_config = copy.deepcopy(base_config)
+    bad_config["runner_type"] = "docker"
+
+    with pytest.raises(ValidationError):
+        _ = ConfigModel(**bad_config)
+
+    # test resource_overrides
+    bad_overrides = [
+        {"when": {}, "job_parameters": {"memory": 8000}},
+        {"when": {"epochs": [10]}, "job_parameters": {"memory": 8000}},
+        {"when": {"batch_size": [32]}, "job_parameters": {"logfile_dir": "/tmp"}},
+        {"when": {"batch_size": [32]}, "job_parameters": {"ngpus": None}},
+        {"when": {"batch_size": [32]}, "job_parameters": {"run_time": "3:120"}},
+    ]
+    for rule in bad_overrides:
+        bad_config = copy.deepcopy(base_config)
+        bad_config["resource_overrides"] = [rule]
+
+        with pytest.raises(ValidationError):
+            _ = ConfigModel(**bad_config)
+
+    # test early_stopping
+    bad_config = copy.deepcopy(base_config)
+    bad_config["early_stopping"] = {"metric": "loss", "threshold": 0.1, "mode": "best"}
+
+    with pytest.raises(ValidationError):
+        _ = ConfigModel(**bad_config)
+
+    bad_config["early_stopping"] = {"metric": "loss", "threshold": 0.1}
+    bad_config["search"] = {
+        "strategy": "successive_halving",
+        "n_samples": 4,
+        "budget_parameter": "epochs",
+        "min_budget": 1,
+        "max_budget": 9,
+        "metric": "loss",
+    }
+
+    with pytest.raises(ValidationError):
+        _ = ConfigModel(**bad_config)
+
+    # test exclude and conditional_axes
+    bad_constraints = [
+        {"exclude": [{}]},
+        {"exclude": [{"epochs": [10]}]},
+        {"exclude": [{"batch_size": [64]}]},
+        {"conditional_axes": {"epochs": {"batch_size": [32]}}},
+        {"conditional_axes": {"lr": {}}},
+        {"conditional_axes": {"lr": {"lr": [0.001]}}},
+        {"conditional_axes": {"lr": {"batch_size": [64]}}},
+    ]
+    for constraint in bad_constraints:
+        bad_config = copy.deepcopy(base_config)
+        bad_config.update(constraint)
+
+        with pytest.raises(ValidationError):
+            _ = ConfigModel(**bad_config)
+
+    # test max_array_size
+    bad_config = copy.deepcopy(base_config)
+    bad_config["job_parameters"]["max_array_size"] = 0
+
+    with pytest.raises(ValidationError):
+        _ = ConfigModel(**bad_config)
+
+    # test requeue
+    bad_requeues = [
+        {"signal": "NOSIGNAL"},
+        {"warning_time": 0},
+        {"warning_time": 180},
+        {"exit_code": 0},
+        {"max_requeues": -1},
+    ]
+    for requeue in bad_requeues:
+        bad_config = copy.deepcopy(base_config)
+        bad_config["requeue"] = requeue
+
+        with pytest.raises(ValidationError):
+            _ = ConfigModel(**bad_config)
+
+    bad_config = copy.deepcopy(base_config)
+    bad_config["requeue"] = {}
+    bad_config["preload_modules"] = ["json"]
+
+    with pytest.raises(ValidationError):
+        _ = ConfigModel(**bad_config)
+
+    # test data_staging
+    bad_config = copy.deepcopy(base_config)
+    bad_config["data_staging"] = True
+    bad_config["job_parameters"]["scratch"] = 0
+
+    with pytest.raises(ValidationError):
+        _ = ConfigModel(**bad_config)
+
+    # test stages
+    runner = base_config["runner"]
+    bad_stages = [
+        [{"name": "evaluate", "runner": "/non/existant/file"}],
+        [{"name": "eval-uate", "runner": runner}],
+        [{"name": "evaluate", "runner": runner, "mode": "many_to_many"}],
+        [{"name": "evaluate", "runner": runner, "condition": "exit"}],
+        [
+            {
+                "name": "evaluate",
+                "runner": runner,
+                "job_parameters": {"njobs_parallel": 8},
+            }
+        ],
+        [
+            {
+                "name": "evaluate",
+                "runner": runner,
+                "job_parameters": {"run_time": "3:120"},
+            }
+        ],
+        [
+            {"name": "evaluate", "runner": runner},
+            {"name": "evaluate", "runner": runner},
+        ],
+        [
+            {"name": "aggregate", "runner": runner, "mode": "aggregate"},
+            {"name": "evaluate", "runner": runner},
+        ],
+    ]
+    for stages in bad_stages:
+        bad_config = copy.deepcopy(base_config)
+        bad_config["stages"] = stages
+
+        with pytest.raises(ValidationError):
+            _ = ConfigModel(**bad_config)
+
+    bad_config = copy.deepcopy(base_config)
+    bad_config["stages"] = [{"name": "evaluate", "runner": runner}]
+    bad_config["search"] = {
+        "strategy": "successive_halving",
+        "n_samples": 4,
+        "budget_parameter": "epochs",
+        "min_budget": 1,
+        "max_budget": 9,
+        "metric": "loss",
+    }
+
+    with pytest.raises(ValidationError):
+        _ = ConfigModel(**bad_config)
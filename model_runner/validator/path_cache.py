@@ -0,0 +1,140 @@
+"""Batched and memoized file system checks for the config validation.
+
+On shared file systems (e.g., GPFS), every stat is a round trip to the
+metadata server, so checking hundreds of paths one at a time is slow. The
+checks are therefore batched: paths that share a parent directory are
+resolved with a single os.scandir of the parent, independent directories
+and paths are checked concurrently in a small thread pool, and every result
+is memoized until the cache is cleared (i.e., for one validation pass).
+"""
+import os
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+FILE = "file"
+DIR = "dir"
+OTHER = "other"
+
+_MAX_WORKERS = 8
+
+
+def _kind_of_mode(mode: int) -> str:
+    if stat.S_ISDIR(mode):
+        return DIR
+    elif stat.S_ISREG(mode):
+        return FILE
+    return OTHER
+
+
+def _stat_kind(path: str) -> Optional[str]:
+    """Get the kind of a single path with one stat (following symlinks)."""
+    try:
+        return _kind_of_mode(os.stat(path).st_mode)
+    except (OSError, ValueError):
+        return None
+
+
+def _scan_kinds(dir_path: str, names: Iterable[str]) -> Dict[str, Optional[str]]:
+    """Get the kinds of several entries of a directory with one os.scandir."""
+    names = set(names)
+    try:
+        with os.scandir(dir_path or os.curdir) as dir_entries:
+            entries = {
+                entry.name: entry for entry in dir_entries if entry.name in names
+            }
+    except (FileNotFoundError, NotADirectoryError):
+        return {name: None for name in names}
+    except OSError:
+        # e.g., a directory that can be traversed but not listed
+        return {name: _stat_kind(os.path.join(dir_path, name)) for name in names}
+
+    kinds = {}
+    for name in names:
+        entry = entries.get(name)
+        if entry is None:
+            kinds[name] = None
+            continue
+        try:
+            # only symlinks need an additional stat
+            if entry.is_dir():
+                kinds[name] = DIR
+            elif entry.is_file():
+                kinds[name] = FILE
+            else:
+                kinds[name] = OTHER
+        except OSError:
+            kinds[name] = None
+
+    return kinds
+
+
+class PathKindCache:
+    """Memoized kinds ("file", "dir", "other" or None if missing) of paths."""
+
+    def __init__(self):
+        self._kinds = {}
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Forget all results, e.g., at the start of a validation pass."""
+        with self._lock:
+            self._kinds.clear()
+
+    def kinds(self, paths: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Get the kinds of paths, checking the unknown ones in batches.
+
+        Parameters
+        ----------
+        paths : Iterable[str]
+            The paths to check. Symlinks are followed.
+
+        Returns
+        -------
+        kinds : Dict[str, Optional[str]]
+            The kind of each path: "file", "dir", "other" or None if the
+            path does not exist.
+        """
+        paths = list(paths)
+        with self._lock:
+            unknown = [p for p in dict.fromkeys(paths) if p not in self._kinds]
+
+        # group the unknown paths by their parent directory
+        groups = {}
+        for path in unknown:
+            dir_path, name = os.path.split(path)
+            if name in ("", os.curdir, os.pardir):
+                # e.g., directories with a trailing separator are checked with a stat
+                groups.setdefault(None, {})[path] = path
+            else:
+                groups.setdefault(dir_path, {})[name] = path
+
+        def _check_group(dir_path, names):
+            if dir_path is None or len(names) == 1:
+                # a single stat is cheaper than listing the parent
+                return {name: _stat_kind(path) for name, path in names.items()}
+            return _scan_kinds(dir_path, names)
+
+        results = {}
+        if len(groups) > 0:
+            with ThreadPoolExecutor(max_workers=min(_MAX_WORKERS, len(groups))) as pool:
+                futures = {
+                    dir_path: pool.submit(_check_group, dir_path, names)
+                    for dir_path, names in groups.items()
+                }
+            for dir_path, future in futures.items():
+                for name, kind in future.result().items():
+                    results[groups[dir_path][name]] = kind
+
+        with self._lock:
+            self._kinds.update(results)
+            return {path: self._kinds[path] for path in paths}
+
+    def kind(self, path: str) -> Optional[str]:
+        """Get the kind of a single path (see kinds())."""
+        return self.kinds([path])[path]
+
+
+# shared by all validators, cleared by ConfigModel at the start and end of a validation pass
+path_kind_cache = PathKindCache()
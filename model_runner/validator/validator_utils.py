@@ -1,8 +1,13 @@
 import json
 import os
+import signal
+import sys
+from importlib.machinery import PathFinder
 from typing import Any, Dict, List, Optional, Union
 
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, root_validator, validator
+
+from .path_cache import DIR, FILE, path_kind_cache
 
 
 def which(program: str) -> Optional[str]:
@@ -10,24 +15,55 @@ def which(program: str) -> Optional[str]:
     Test if program is a file or an executable.
     """
 
-    def is_exe(fpath):
-        return os.path.isfile(
-            fpath
+    def is_exe(kind):
+        return (
+            kind == FILE
         )  # and os.access(fpath, os.X_OK) TODO: pytest fixture with executable permission
 
     fpath, fname = os.path.split(program)
     if fpath:
-        if is_exe(program):
+        if is_exe(path_kind_cache.kind(program)):
             return program
     else:
-        for path in os.environ["PATH"].split(os.pathsep):
-            exe_file = os.path.join(path, program)
-            if is_exe(exe_file):
+        # all $PATH entries are checked concurrently
+        exe_files = [
+            os.path.join(path, program) for path in os.environ["PATH"].split(os.pathsep)
+        ]
+        kinds = path_kind_cache.kinds(exe_files)
+        for exe_file in exe_files:
+            if is_exe(kinds[exe_file]):
                 return exe_file
 
     return None
 
 
+def module_file(module_name: str) -> Optional[str]:
+    """
+    Find the source file of a python module without importing it.
+    """
+    # like the dispatcher, also search the current working directory
+    search_path = [os.getcwd()] + sys.path
+    spec = None
+    for name in module_name.split("."):
+        spec = PathFinder.find_spec(name, search_path)
+        if spec is None:
+            return None
+        search_path = spec.submodule_search_locations or []
+
+    return None if spec is None else spec.origin
+
+
+def entrypoint_file(entrypoint: str) -> Optional[str]:
+    """
+    Find the source file of the module of a python entrypoint ("module:function") without importing it.
+    """
+    module_name, _, function_name = entrypoint.partition(":")
+    if not (module_name and function_name):
+        return None
+
+    return module_file(module_name)
+
+
 class JobArrayModel(BaseModel):
     """
     pydantic BaseModel that handles the job_parameters.
@@ -50,6 +86,14 @@ class JobArrayModel(BaseModel):
         Number of jobs the job array will submit in parallel.
     logfile_dir: str
         Path to directory to which lsf output files are saved.
+    pack_size: int
+        Number of jobs (i.e. parameter combinations) that are run inside a single element of the job array.
+    pack_workers: int
+        Number of jobs of a pack that are run concurrently. Must not exceed processor_cores.
+    max_array_size: Optional[int]
+        Maximum number of elements of a job array (e.g., 1000, the default MAX_JOB_ARRAY_SIZE of LSF). Larger job
+        arrays are split into several job arrays that share njobs_parallel. If None (default), job arrays are not
+        split.
     """
 
     run_time: Union[str, int]
@@ -60,13 +104,16 @@ class JobArrayModel(BaseModel):
     logfile_dir: str
     gpu_type: Optional[str] = None
     ngpus: Optional[int] = None
+    pack_size: int = 1
+    pack_workers: int = 1
+    max_array_size: Optional[int] = None
 
     @validator("logfile_dir")
     def logfile_dir_is_dir(cls, v):
         """
         Validate if logfile_dir is an existing directory.
         """
-        if not os.path.isdir(v):
+        if path_kind_cache.kind(v) != DIR:
             raise ValueError(f'"{v}" is not a directory.')
         elif not v.endswith(os.path.sep):
             v += os.path.sep
@@ -83,6 +130,41 @@ class JobArrayModel(BaseModel):
 
         return v
 
+    @validator("pack_size")
+    def pack_size_is_positive(cls, v):
+        """
+        Validate if pack_size is at least 1.
+        """
+        if v < 1:
+            raise ValueError(f"pack_size must be at least 1, but is {v}.")
+
+        return v
+
+    @validator("pack_workers")
+    def pack_workers_fit_processor_cores(cls, v, values):
+        """
+        Validate if pack_workers is at least 1 and does not exceed processor_cores.
+        """
+        processor_cores = values.get("processor_cores")
+        if v < 1:
+            raise ValueError(f"pack_workers must be at least 1, but is {v}.")
+        elif (processor_cores is not None) and (v > processor_cores):
+            raise ValueError(
+                f"pack_workers ({v}) must not exceed processor_cores ({processor_cores})."
+            )
+
+        return v
+
+    @validator("max_array_size")
+    def max_array_size_is_positive(cls, v):
+        """
+        Validate if max_array_size is at least 1.
+        """
+        if v is not None and v < 1:
+            raise ValueError(f"max_array_size must be at least 1, but is {v}.")
+
+        return v
+
     @validator("gpu_type")
     def gpu_type_exists(cls, v):
         """
@@ -149,14 +231,418 @@ class JobArrayModel(BaseModel):
         return v
 
 
+class ResultCacheModel(BaseModel):
+    """
+    pydantic BaseModel that handles the result_cache.
+
+    Parameters
+    ----------
+    cache_dir: str
+        Path to the directory in which the results of finished jobs are cached.
+    link: bool
+        If True, cached results are symlinked into the output folder of a job. Otherwise, they are copied.
+    max_size: int
+        Maximum total size of the cache in MB. The least recently used results are evicted first.
+    max_age: int
+        Maximum number of days since a cached result was last used before it is evicted.
+    """
+
+    cache_dir: str
+    link: bool = False
+    max_size: Optional[int] = None
+    max_age: Optional[int] = None
+
+    @validator("cache_dir")
+    def cache_dir_is_dir(cls, v):
+        """
+        Validate if cache_dir is an existing directory.
+        """
+        if path_kind_cache.kind(v) != DIR:
+            raise ValueError(f'"{v}" is not a directory.')
+
+        return v
+
+
+class SearchModel(BaseModel):
+    """
+    pydantic BaseModel that handles the search strategy.
+
+    Parameters
+    ----------
+    strategy: str
+        How the combinations of the parameter grid are selected. "grid" (default) runs all combinations,
+        "random", "latin_hypercube" and "sobol" run n_samples combinations and "successive_halving" runs rounds of
+        n_samples combinations with an increasing budget, keeping the best 1/eta combinations after each round.
+    n_samples: int
+        Number of combinations to run (of the first round for "successive_halving").
+    seed: int
+        Seed of the random number generator.
+    budget_parameter: str
+        Runner argument that receives the budget (e.g., the number of epochs) for "successive_halving".
+    min_budget: int
+        Budget of the first round for "successive_halving".
+    max_budget: int
+        Maximum budget for "successive_halving". The last round runs with max_budget.
+    eta: int
+        Factor by which the budget grows and the number of combinations shrinks from round to round.
+    metric: str
+        Name of the metric that ranks the combinations for "successive_halving".
+    mode: str
+        "min" if lower values of metric are better, "max" if higher values are better.
+    metrics_file: str
+        Name of the JSON (or CSV) file with the metrics that the runner writes into its output folder.
+    """
+
+    strategy: str = "grid"
+    n_samples: Optional[int] = None
+    seed: Optional[int] = None
+    budget_parameter: Optional[str] = None
+    min_budget: Optional[int] = None
+    max_budget: Optional[int] = None
+    eta: int = 3
+    metric: Optional[str] = None
+    mode: str = "min"
+    metrics_file: str = "metrics.json"
+
+    @validator("strategy")
+    def strategy_is_supported(cls, v):
+        """
+        Validate if strategy is a supported search strategy.
+        """
+        strategies = [
+            "grid",
+            "random",
+            "latin_hypercube",
+            "sobol",
+            "successive_halving",
+        ]
+        if v not in strategies:
+            raise ValueError(
+                f'"{v}" is not a supported search strategy. Use one of {strategies}.'
+            )
+
+        return v
+
+    @validator("n_samples", always=True)
+    def n_samples_for_sampling_strategies(cls, v, values):
+        """
+        Validate if n_samples is set for all strategies but "grid".
+        """
+        strategy = values.get("strategy")
+        if strategy not in (None, "grid") and (v is None or v < 1):
+            raise ValueError(
+                f'n_samples must be a positive integer for the "{strategy}" strategy.'
+            )
+
+        return v
+
+    @validator("eta")
+    def eta_is_at_least_two(cls, v):
+        """
+        Validate if eta is at least 2.
+        """
+        if v < 2:
+            raise ValueError(f"eta must be at least 2, but is {v}.")
+
+        return v
+
+    @validator("metric", always=True)
+    def successive_halving_parameters_are_set(cls, v, values):
+        """
+        Validate if the budget and metric parameters are set for "successive_halving".
+        """
+        if values.get("strategy") != "successive_halving":
+            return v
+
+        for name in ("budget_parameter", "min_budget", "max_budget"):
+            if values.get(name) is None:
+                raise ValueError(
+                    f'{name} must be set for the "successive_halving" strategy.'
+                )
+        if v is None:
+            raise ValueError(
+                'metric must be set for the "successive_halving" strategy.'
+            )
+        if values["min_budget"] > values["max_budget"]:
+            raise ValueError("min_budget must not exceed max_budget.")
+
+        return v
+
+    @validator("mode")
+    def mode_is_min_or_max(cls, v):
+        """
+        Validate if mode is "min" or "max".
+        """
+        if v not in ("min", "max"):
+            raise ValueError(f'mode must be "min" or "max", but is "{v}".')
+
+        return v
+
+
+class EarlyStoppingModel(BaseModel):
+    """
+    pydantic BaseModel that handles the rule that stops a sweep early.
+
+    Parameters
+    ----------
+    metric: str
+        Name of the metric in the metrics file that is checked after each successful job.
+    threshold: float
+        Target value of the metric. The sweep is stopped as soon as one job reaches it.
+    mode: str
+        "min" if the target is reached at or below threshold, "max" if it is reached at or above threshold.
+    metrics_file: str
+        Name of the JSON (or CSV) file with the metrics that the runner writes into its output folder.
+    """
+
+    metric: str
+    threshold: float
+    mode: str = "min"
+    metrics_file: str = "metrics.json"
+
+    @validator("mode")
+    def mode_is_supported(cls, v):
+        """
+        Validate if mode is "min" or "max".
+        """
+        if v not in ("min", "max"):
+            raise ValueError(f'mode must be "min" or "max", but is "{v}".')
+
+        return v
+
+
+class RequeueModel(BaseModel):
+    """
+    pydantic BaseModel that handles the checkpointing and requeue of jobs that reach their run_time.
+
+    Parameters
+    ----------
+    signal: str
+        Name of the warning signal (without "SIG") that LSF sends before the run_time limit. Corresponds to the
+        bsub "-wa"-flag. The dispatcher forwards it to the runner, which saves a checkpoint.
+    warning_time: int
+        Minutes before the run_time limit at which the signal is sent. Corresponds to the bsub "-wt"-flag.
+    exit_code: int
+        Exit code with which the dispatcher makes LSF requeue a job array element. Corresponds to the bsub "-Q"-flag.
+    max_requeues: int
+        Maximum number of times a job is requeued, after that it fails.
+    """
+
+    signal: str = "USR2"
+    warning_time: int = 5
+    exit_code: int = 99
+    max_requeues: int = 10
+
+    @validator("signal")
+    def signal_exists(cls, v):
+        """
+        Validate if signal is the name of a signal.
+        """
+        if not isinstance(getattr(signal, f"SIG{v}", None), signal.Signals):
+            raise ValueError(f'"{v}" is not the name of a signal (e.g., "USR2").')
+
+        return v
+
+    @validator("warning_time")
+    def warning_time_is_positive(cls, v):
+        """
+        Validate if warning_time is at least 1.
+        """
+        if v < 1:
+            raise ValueError(f"warning_time must be at least 1, but is {v}.")
+
+        return v
+
+    @validator("exit_code")
+    def exit_code_is_valid(cls, v):
+        """
+        Validate if exit_code is a valid exit code that is not a success.
+        """
+        if not (1 <= v <= 255):
+            raise ValueError(f"exit_code must be between 1 and 255, but is {v}.")
+
+        return v
+
+    @validator("max_requeues")
+    def max_requeues_is_not_negative(cls, v):
+        """
+        Validate if max_requeues is not negative.
+        """
+        if v < 0:
+            raise ValueError(f"max_requeues must not be negative, but is {v}.")
+
+        return v
+
+
+# the job_parameters that are resource requests and can be overridden
+RESOURCE_PARAMETERS = (
+    "run_time",
+    "processor_cores",
+    "memory",
+    "scratch",
+    "gpu_type",
+    "ngpus",
+)
+
+
+class ResourceOverrideModel(BaseModel):
+    """
+    pydantic BaseModel that handles a rule of the resource_overrides.
+
+    Parameters
+    ----------
+    when: Dict[str, List[Any]]
+        Runner parameters and their values for which the rule applies. A job matches the rule if its value of
+        every listed parameter is one of the listed values.
+    job_parameters: Dict[str, Any]
+        The job_parameters that are overridden for the jobs that match the rule. Only the resource requests
+        (run_time, processor_cores, memory, scratch, gpu_type and ngpus) can be overridden.
+    """
+
+    when: Dict[str, List[Any]]
+    job_parameters: Dict[str, Any]
+
+    @validator("when")
+    def when_is_not_empty(cls, v):
+        """
+        Validate if the rule has at least one condition.
+        """
+        if len(v) == 0:
+            raise ValueError("when must contain at least one runner parameter.")
+
+        return v
+
+    @validator("job_parameters")
+    def only_resources_are_overridden(cls, v):
+        """
+        Validate if only resource requests are overridden.
+        """
+        for name in v:
+            if name not in RESOURCE_PARAMETERS:
+                raise ValueError(
+                    f'"{name}" cannot be overridden. Use one of {", ".join(RESOURCE_PARAMETERS)}.'
+                )
+
+        return v
+
+
+class StageModel(BaseModel):
+    """
+    pydantic BaseModel that handles a stage of the pipeline that runs after the job array.
+
+    Parameters
+    ----------
+    name: str
+        Name of the stage. Its jobs are named {job_prefix}_{name}.
+    runner: str
+        Path to the runner file of the stage.
+    mode: str
+        "one_to_one" (default) runs the runner for every job of the previous stage, with the same parameters and
+        output folder, as soon as the job array element of that job ended. "aggregate" runs the runner once after
+        the whole previous stage, with the arguments --output_base_dir, --job_prefix and --runner_params (the path
+        to the runner parameters of the sweep).
+    condition: str
+        The LSF dependency condition on the previous stage: "ended" (default for "one_to_one") or "done"
+        (default for "aggregate"), which requires that all jobs of the previous stage succeeded.
+    job_parameters: Dict[str, Any]
+        The resource requests (run_time, processor_cores, memory, scratch, gpu_type and ngpus) that differ from the
+        job_parameters of the job array.
+    """
+
+    name: str
+    runner: str
+    mode: str = "one_to_one"
+    condition: Optional[str] = None
+    job_parameters: Dict[str, Any] = {}
+
+    @validator("name")
+    def name_is_identifier(cls, v):
+        """
+        Validate if name only contains letters, digits and underscores.
+        """
+        if not v.isidentifier():
+            raise ValueError(
+                f'stage name "{v}" must only contain letters, digits and underscores.'
+            )
+
+        return v
+
+    @validator("runner")
+    def runner_exists(cls, v):
+        """
+        Validate if "runner" is an existing file or an executable.
+        """
+        if which(v) is None:
+            raise ValueError(f'"{v}" is not a file and not an executable.')
+
+        return v
+
+    @validator("mode")
+    def mode_is_supported(cls, v):
+        """
+        Validate if mode is "one_to_one" or "aggregate".
+        """
+        if v not in ("one_to_one", "aggregate"):
+            raise ValueError(f'mode must be "one_to_one" or "aggregate", but is "{v}".')
+
+        return v
+
+    @validator("condition", always=True)
+    def condition_is_supported(cls, v, values):
+        """
+        Validate if condition is "ended" or "done" and set the default of the mode.
+        """
+        if v is None:
+            return "ended" if values.get("mode") == "one_to_one" else "done"
+        elif v not in ("ended", "done"):
+            raise ValueError(f'condition must be "ended" or "done", but is "{v}".')
+
+        return v
+
+    @validator("job_parameters")
+    def only_resources_are_overridden(cls, v):
+        """
+        Validate if only resource requests are overridden.
+        """
+        for name in v:
+            if name not in RESOURCE_PARAMETERS:
+                raise ValueError(
+                    f'"{name}" cannot be overridden. Use one of {", ".join(RESOURCE_PARAMETERS)}.'
+                )
+
+        return v
+
+
+def _check_grid_values(
+    condition: Dict[str, List[Any]], runner_parameters: Optional[Dict[str, List[Any]]]
+):
+    """Check if the parameters and values of a grid constraint are in runner_parameters."""
+    if runner_parameters is None:
+        return
+
+    for name, condition_values in condition.items():
+        if name not in runner_parameters:
+            raise ValueError(f'"{name}" is not a runner parameter.')
+        for value in condition_values:
+            if value not in runner_parameters[name]:
+                raise ValueError(f'{value!r} is not a value of "{name}".')
+
+
 class ConfigModel(BaseModel):
     """
     pydantic BaseModel that handles the job_config.json.
 
     Parameters
     ----------
+    runner_type: str
+        How the runner is run. "script" (default) runs the runner file as a separate process,
+        "python_entrypoint" imports the runner given as "module:function" once per job array
+        element and calls the function with the dict of parameters of each job.
     runner: str
-        Path to the runner file.
+        Path to the runner file or, if runner_type is "python_entrypoint", the python entrypoint.
+    preload_modules: List[str]
+        Modules (e.g., "torch") that are imported once per job array element by a forkserver, which
+        forks a warm process for every job. If empty (default), the jobs are started without it.
     job_prefix: str
         Prefix that precedes all results folders and experiment specific files.
     output_base_dir: str
@@ -165,26 +651,111 @@ class ConfigModel(BaseModel):
         Dictionary of parameters for the job array command that are handled by the JobArrayModel.
     runner_parameters: Dict[str, List[Any]]
         Dictionary containing the parameters grid submitted to the runner.
+    runner_params_format: str
+        On-disk format of the runner parameters. "indexed" (default) writes one record per job,
+        "grid" only writes the values of each parameter axis and computes the parameters of each
+        job on the fly, which keeps the file size constant for very large grids. "compact" writes one
+        record per job, but stores the parameters shared by all jobs only once and every parameter value
+        only once per parameter.
+    runner_params_compression: str
+        Optional compression of the "compact" runner parameters, "gzip" or "zstd" (requires zstandard).
+    result_cache: Dict[str, Any]
+        Optional dictionary of parameters for the result cache that are handled by the ResultCacheModel.
+    exclude: List[Dict[str, List[Any]]]
+        Optional list of rules that exclude combinations of runner_parameters from the grid (e.g.,
+        {"optimizer": ["sgd"], "ngpus": [2, 4]}). A combination is excluded if its value of every listed parameter
+        is one of the listed values.
+    conditional_axes: Dict[str, Dict[str, List[Any]]]
+        Optional runner parameters that are only varied in the combinations that match a condition (e.g.,
+        {"lr": {"optimizer": ["adam"]}}), with the condition in the form of the exclude rules. The other
+        combinations only run with the first value of the parameter.
+    search: Dict[str, Any]
+        Optional dictionary of parameters for the search strategy that are handled by the SearchModel.
+    resource_overrides: List[Dict[str, Any]]
+        Optional list of rules that override the resource requests of job_parameters for the jobs whose
+        runner parameters match the rule (see ResourceOverrideModel). Later rules take precedence. The jobs
+        of every distinct combination of resource requests are submitted as a separate job array.
+    stages: List[Dict[str, Any]]
+        Optional list of pipeline stages (e.g., evaluation and aggregation) that are handled by the StageModel.
+        Each stage runs after the previous one (the first after the job array) and is submitted together
+        with the job array with LSF dependencies.
+    early_stopping: Dict[str, Any]
+        Optional dictionary of parameters for the rule that stops the sweep as soon as a job reached a target
+        metric, which are handled by the EarlyStoppingModel.
+    requeue: Dict[str, Any]
+        Optional dictionary of parameters for the checkpointing and requeue of jobs that reach their run_time, which
+        are handled by the RequeueModel.
+    data_staging: bool
+        If True, the dispatcher copies the data of each job into the node-local scratch ($TMPDIR) before it
+        runs the job. The copy is shared by the jobs on the same node. Requires a scratch request in
+        job_parameters.
     """
 
     job_prefix: str
+    runner_type: str = "script"
     runner: str
+    preload_modules: List[str] = []
     output_base_dir: str
     job_parameters: JobArrayModel
     runner_parameters: Dict[str, List[Any]]
+    exclude: List[Dict[str, List[Any]]] = []
+    conditional_axes: Dict[str, Dict[str, List[Any]]] = {}
+    runner_params_format: str = "indexed"
+    runner_params_compression: Optional[str] = None
+    result_cache: Optional[ResultCacheModel] = None
+    search: SearchModel = SearchModel()
+    resource_overrides: List[ResourceOverrideModel] = []
+    stages: List[StageModel] = []
+    early_stopping: Optional[EarlyStoppingModel] = None
+    requeue: Optional[RequeueModel] = None
+    data_staging: bool = False
+
+    @root_validator(pre=True)
+    def start_path_checks(cls, values):
+        """
+        Forget the file system checks of earlier validations before validating the config.
+        """
+        path_kind_cache.clear()
+
+        return values
+
+    @root_validator
+    def end_path_checks(cls, values):
+        """
+        Forget the file system checks of this validation, as the file system may change afterwards.
+        """
+        path_kind_cache.clear()
+
+        return values
 
     @validator("output_base_dir")
     def output_base_dir_is_dir(cls, v):
         """
         Validate if output_base_dir is an existing directory.
         """
-        if not os.path.isdir(v):
+        if path_kind_cache.kind(v) != DIR:
             raise ValueError(f'"{v}" is not a directory.')
         elif not v.endswith(os.path.sep):
             v += os.path.sep
 
         return v
 
+    @validator("job_parameters")
+    def pack_workers_supported_by_runner_type(cls, v, values):
+        """
+        Validate if the jobs of a pack are run one after the other for python entrypoint runners without forkserver.
+        """
+        if (
+            values.get("runner_type") == "python_entrypoint"
+            and not values.get("preload_modules")
+            and v.pack_workers > 1
+        ):
+            raise ValueError(
+                'pack_workers must be 1 if runner_type is "python_entrypoint" and no preload_modules are set.'
+            )
+
+        return v
+
     @validator("runner_parameters")
     def data_in_runner_parameters_and_file_or_path(cls, v):
         """
@@ -193,20 +764,228 @@ class ConfigModel(BaseModel):
         # check if runner_parameters contains data key
         assert "data" in v.keys()
 
-        # check if all paths in "data" are existing files or directories
+        # check if all paths in "data" are existing files or directories, all at once
+        kinds = path_kind_cache.kinds(v["data"])
         for i, f in enumerate(v["data"]):
-            if not (os.path.isfile(f) or os.path.isdir(f)):
+            if kinds[f] not in (FILE, DIR):
                 raise ValueError(f'"{f}" is not a file/directory.')
             else:
-                if os.path.isdir(f) and not f.endswith(os.path.sep):
+                if kinds[f] == DIR and not f.endswith(os.path.sep):
                     v["data"][i] = f + os.path.sep
         return v
 
+    @validator("exclude", each_item=True)
+    def exclude_rules_are_valid(cls, v, values):
+        """
+        Validate if the rules of exclude refer to values of the runner parameters.
+        """
+        if len(v) == 0:
+            raise ValueError(
+                "an exclude rule must contain at least one runner parameter."
+            )
+
+        _check_grid_values(v, values.get("runner_parameters"))
+
+        return v
+
+    @validator("conditional_axes")
+    def conditional_axes_are_valid(cls, v, values):
+        """
+        Validate if the conditional axes and their conditions refer to values of the runner parameters.
+        """
+        runner_parameters = values.get("runner_parameters")
+        for axis, condition in v.items():
+            if runner_parameters is not None and axis not in runner_parameters:
+                raise ValueError(f'"{axis}" is not a runner parameter.')
+            if len(condition) == 0:
+                raise ValueError(
+                    f'the condition of "{axis}" must contain at least one runner parameter.'
+                )
+            if axis in condition:
+                raise ValueError(f'"{axis}" cannot be a condition of itself.')
+
+            _check_grid_values(condition, runner_parameters)
+
+        return v
+
+    @validator("resource_overrides", each_item=True)
+    def resource_overrides_are_valid(cls, v, values):
+        """
+        Validate if the rules of resource_overrides refer to runner parameters and result in valid job_parameters.
+        """
+        runner_parameters = values.get("runner_parameters")
+        job_parameters = values.get("job_parameters")
+        if runner_parameters is not None:
+            for name in v.when:
+                if name not in runner_parameters:
+                    raise ValueError(f'"{name}" is not a runner parameter.')
+
+        if job_parameters is not None:
+            # validate (and coerce, e.g., run_time) the overridden job_parameters, the
+            # unset fields (e.g., gpu_type of CPU jobs) keep their defaults
+            overridden = JobArrayModel(
+                **{**job_parameters.dict(exclude_unset=True), **v.job_parameters}
+            )
+            v.job_parameters = {
+                name: getattr(overridden, name) for name in v.job_parameters
+            }
+
+        return v
+
+    @validator("early_stopping")
+    def early_stopping_supported_by_search(cls, v, values):
+        """
+        Validate if early stopping is not combined with successive_halving.
+        """
+        search = values.get("search")
+        if (
+            v is not None
+            and search is not None
+            and search.strategy == "successive_halving"
+        ):
+            raise ValueError("early_stopping is not supported with successive_halving.")
+
+        return v
+
+    @validator("requeue")
+    def requeue_supported_by_runner(cls, v, values):
+        """
+        Validate if the runner is a script and if the warning signal is sent before the run_time limit.
+        """
+        if v is None:
+            return v
+
+        if values.get("runner_type") != "script" or values.get("preload_modules"):
+            raise ValueError(
+                'requeue requires runner_type "script" without preload_modules.'
+            )
+        job_parameters = values.get("job_parameters")
+        if job_parameters is not None and v.warning_time >= job_parameters.run_time:
+            raise ValueError(
+                f"requeue.warning_time ({v.warning_time}) must be less than run_time ({job_parameters.run_time})."
+            )
+
+        return v
+
+    @validator("data_staging")
+    def scratch_requested_for_data_staging(cls, v, values):
+        """
+        Validate if scratch space is requested for the staged data.
+        """
+        job_parameters = values.get("job_parameters")
+        if v and job_parameters is not None and job_parameters.scratch <= 0:
+            raise ValueError(
+                "data_staging requires a scratch request in job_parameters."
+            )
+
+        return v
+
+    @validator("stages")
+    def stages_form_a_pipeline(cls, v, values):
+        """
+        Validate if the stage names are unique, one_to_one stages do not follow an aggregate stage and the stage job_parameters are valid.
+        """
+        names = [stage.name for stage in v]
+        if len(set(names)) != len(names):
+            raise ValueError("the names of the stages must be unique.")
+
+        for previous_stage, stage in zip(v, v[1:]):
+            if previous_stage.mode == "aggregate" and stage.mode == "one_to_one":
+                raise ValueError(
+                    f'the one_to_one stage "{stage.name}" cannot follow the aggregate stage "{previous_stage.name}".'
+                )
+
+        search = values.get("search")
+        if (
+            len(v) > 0
+            and search is not None
+            and search.strategy == "successive_halving"
+        ):
+            raise ValueError("stages are not supported with successive_halving.")
+
+        job_parameters = values.get("job_parameters")
+        if job_parameters is not None:
+            for stage in v:
+                # validate (and coerce, e.g., run_time) the job_parameters of the stage,
+                # the unset fields (e.g., gpu_type of CPU jobs) keep their defaults
+                overridden = JobArrayModel(
+                    **{
+                        **job_parameters.dict(exclude_unset=True),
+                        **stage.job_parameters,
+                    }
+                )
+                stage.job_parameters = {
+                    name: getattr(overridden, name) for name in stage.job_parameters
+                }
+
+        return v
+
+    @validator("runner_params_format")
+    def runner_params_format_is_supported(cls, v):
+        """
+        Validate if runner_params_format is a supported format.
+        """
+        if v not in ("indexed", "grid", "compact"):
+            raise ValueError(
+                f'"{v}" is not a supported runner_params_format. Use "indexed", "grid" or "compact".'
+            )
+
+        return v
+
+    @validator("runner_params_compression")
+    def runner_params_compression_is_supported(cls, v, values):
+        """
+        Validate if runner_params_compression is supported by the runner_params_format and installed.
+        """
+        if v not in ("gzip", "zstd"):
+            raise ValueError(
+                f'"{v}" is not a supported runner_params_compression. Use "gzip" or "zstd".'
+            )
+        elif values.get("runner_params_format") != "compact":
+            raise ValueError(
+                'runner_params_compression requires the runner_params_format "compact".'
+            )
+        elif v == "zstd" and module_file("zstandard") is None:
+            raise ValueError(
+                'the runner_params_compression "zstd" requires zstandard. Install it with "pip install zstandard".'
+            )
+
+        return v
+
+    @validator("preload_modules", each_item=True)
+    def preload_modules_exist(cls, v):
+        """
+        Validate if the modules to preload can be imported.
+        """
+        if module_file(v) is None:
+            raise ValueError(f'"{v}" is not an importable module.')
+
+        return v
+
+    @validator("runner_type")
+    def runner_type_is_supported(cls, v):
+        """
+        Validate if runner_type is a supported runner type.
+        """
+        if v not in ("script", "python_entrypoint"):
+            raise ValueError(
+                f'"{v}" is not a supported runner_type. Use "script" or "python_entrypoint".'
+            )
+
+        return v
+
     @validator("runner")
-    def runner_exists(cls, v):
+    def runner_exists(cls, v, values):
         """
-        Validate if "runner" is an existing file or an executable.
+        Validate if "runner" is an existing file or an executable, or an importable python entrypoint.
         """
+        if values.get("runner_type") == "python_entrypoint":
+            if entrypoint_file(v) is None:
+                raise ValueError(
+                    '"runner" is not an importable python entrypoint of the form "module:function".'
+                )
+            return v
+
         runner_file = which(v)
         if runner_file is None:
             raise ValueError('"runner" is not a file and not an executable.')